@@ -0,0 +1,307 @@
+"""Benchmarks for the hot paths of Git Event Manager
+
+Builds a synthetic bare repository served over a file:// remote, a clone of
+it and a synthetic events directory, then times ref cache refreshes, name
+generation, merge list rendering, event loading, full-text indexing and
+history search. Each
+run is appended to a history file and compared with the previous run that
+used the same parameters, so regressions show up as the code changes.
+
+Usage:
+    python benchmark.py --branches 2000 --tags 5000 --commits 1000 --events 20000
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from event_store import EventIndex
+from fetch_coordinator import FetchCoordinator
+from naming import build_base_name, next_available_name
+from workspace import Workspace
+
+DEFAULT_HISTORY = os.path.expanduser("~/git_branch_manager/benchmarks.jsonl")
+
+
+def run_git(args, cwd, stdin=None):
+    """Run a git command and return its output"""
+    result = subprocess.run(['git'] + args, cwd=cwd, input=stdin, capture_output=True, check=True)
+    return result.stdout.decode('utf-8', 'replace')
+
+
+def create_server_repo(path, commits, branches, tags, seed=0):
+    """Create a bare repository with a linear history, branches and tags
+
+    History is written with a single git fast-import stream so even large
+    repositories are created in seconds.
+    """
+    rng = random.Random(seed)
+    run_git(['init', '--quiet', '--bare', '-b', 'main', path], cwd=os.path.dirname(path))
+
+    base_time = int(time.time()) - commits * 3600
+    stream = []
+    for i in range(1, commits + 1):
+        message = f"Commit {i}\n".encode()
+        content = f"line {i}\n".encode()
+        stream.append(b"commit refs/heads/main\n")
+        stream.append(f"mark :{i}\n".encode())
+        stream.append(f"committer Bench <bench@example.com> {base_time + i * 3600} +0000\n".encode())
+        stream.append(f"data {len(message)}\n".encode() + message)
+        if i > 1:
+            stream.append(f"from :{i - 1}\n".encode())
+        stream.append(f"M 644 inline file_{i % 50}.txt\ndata {len(content)}\n".encode() + content)
+        stream.append(b"\n")
+
+    # Branches and tags point at random commits, with name patterns that
+    # exercise the '.N' suffix generation
+    today = datetime.now().strftime('%Y.%m.%d')
+    for i in range(branches):
+        kind = ('feature', 'bugfix', 'hotfix', 'release')[i % 4]
+        name = f"{kind}_{today}" + (f".{i // 4}" if i >= 4 else "")
+        stream.append(f"reset refs/heads/{name}\nfrom :{rng.randint(1, commits)}\n\n".encode())
+    for i in range(tags):
+        name = f"v{i // 100}.{(i // 10) % 10}.{i % 10}"
+        stream.append(f"reset refs/tags/{name}\nfrom :{rng.randint(1, commits)}\n\n".encode())
+
+    run_git(['fast-import', '--quiet'], cwd=path, stdin=b"".join(stream))
+
+
+def create_events(path, count, seed=0):
+    """Write a synthetic events directory with one JSON file per event"""
+    rng = random.Random(seed)
+    start = datetime.now() - timedelta(days=max(1, count // 20))
+    for i in range(count):
+        date = start + timedelta(minutes=i * 70 + rng.randint(0, 60))
+        date_dir = os.path.join(path, date.strftime('%Y-%m-%d'))
+        os.makedirs(date_dir, exist_ok=True)
+        merged = [{
+            'name': f"feature_{rng.randint(1, 500)}",
+            'commit_id': f"{rng.getrandbits(32):08x}",
+            'commit_message': f"Merge work item {rng.randint(1, 10000)}",
+            'commit_author': rng.choice(['alice', 'bob', 'carol', 'dave']),
+            'commit_date': date.strftime('%Y-%m-%d %H:%M:%S')
+        } for _ in range(rng.randint(0, 5))]
+        event = {
+            'title': f"Release {i}",
+            'date': date.strftime('%Y-%m-%d %H:%M:%S'),
+            'description': f"Synthetic event {i}",
+            'created_branch': f"release_{date.strftime('%Y.%m.%d')}",
+            'merged_branches': [info['name'] for info in merged],
+            'merged_branches_info': merged,
+            'created_tag': f"v{i // 100}.{(i // 10) % 10}.{i % 10}",
+            'notes': "",
+            'base_branch': rng.choice(['main', 'develop', 'release'])
+        }
+        file_path = os.path.join(date_dir, f"{date.strftime('%H%M%S')}_{i}.json")
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(event, f)
+
+
+def time_case(func, repeat):
+    """Run func repeat times and return timing statistics in seconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return {
+        'min': min(samples),
+        'median': statistics.median(samples),
+        'mean': statistics.mean(samples)
+    }
+
+
+def time_merge_list(fixture_home, work_path, events_path, repeat):
+    """Time rendering the real merge list, return None without a display"""
+    try:
+        import tkinter as tk
+        tk.Tk().destroy()
+    except Exception as e:
+        print(f"Skipping merge list rendering: {str(e)}")
+        return None
+
+    # Keep the application away from the user's own settings and events
+    saved = {name: os.environ.get(name) for name in ('HOME', 'GIT_EVENT_WATCH')}
+    os.environ['HOME'] = fixture_home
+    os.environ['GIT_EVENT_WATCH'] = '0'
+    app = None
+    try:
+        from main import GitEventManager
+        app = GitEventManager()
+        app.root.withdraw()
+        app.events_path.set(events_path)
+        app.repo_path.set(work_path)
+        app.init_repo()
+        return time_case(app.refresh_merge_items, repeat)
+    finally:
+        if app is not None:
+            app.root.destroy()
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def run_benchmarks(args):
+    """Build the fixtures and time every case"""
+    workdir = tempfile.mkdtemp(prefix="gem-bench-")
+    results = {}
+    try:
+        server_path = os.path.join(workdir, "server.git")
+        work_path = os.path.join(workdir, "work")
+        events_path = os.path.join(workdir, "events")
+        fixture_home = os.path.join(workdir, "home")
+        os.makedirs(fixture_home)
+
+        # Isolated git configuration with a user, so no dialog is shown
+        git_config = os.path.join(fixture_home, ".gitconfig")
+        with open(git_config, 'w', encoding='utf-8') as f:
+            f.write("[user]\n\tname = Bench\n\temail = bench@example.com\n")
+        os.environ['GIT_CONFIG_GLOBAL'] = git_config
+
+        print(f"Creating fixtures in {workdir}...")
+        create_server_repo(server_path, args.commits, args.branches, args.tags)
+        run_git(['clone', '--quiet', f"file://{server_path}", work_path], cwd=workdir)
+        create_events(events_path, args.events)
+
+        workspace = Workspace(FetchCoordinator(ttl=0))
+        context = workspace.open(work_path)
+
+        print("Timing cases...")
+        results['workspace refresh (forced)'] = time_case(
+            lambda: workspace.refresh(context, force=True), args.repeat)
+        workspace.fetch_coordinator.ttl = 3600
+        results['workspace refresh (cached)'] = time_case(
+            lambda: workspace.refresh(context), args.repeat)
+
+        snapshot = context.snapshot
+        today = datetime.now().strftime('%Y.%m.%d')
+
+        def generate_names():
+            # One keystroke worth of branch and tag name previews
+            for prefix in ('feature', 'bugfix', 'hotfix', 'release'):
+                base_name = build_base_name(prefix, today, "")
+                next_available_name(base_name, snapshot.all_branch_names())
+            next_available_name("v1.2.3", set(snapshot.tags))
+        results['name generation'] = time_case(generate_names, args.repeat)
+
+        rendering = time_merge_list(fixture_home, work_path, events_path, args.repeat)
+        if rendering:
+            results['merge list rendering'] = rendering
+
+        index = EventIndex()
+        results['load_all_events'] = time_case(lambda: index.load_all(events_path), args.repeat)
+        def build_text_index():
+            index.text_index = None
+            index.full_text()
+        results['full-text index build'] = time_case(build_text_index, args.repeat)
+        results['history search'] = time_case(
+            lambda: index.search("date", "release 1"), args.repeat)
+        commit_id = next((info['commit_id'] for event in index.events()
+                          for info in event.merged_branches_info), "")
+        results['commit id search'] = time_case(
+            lambda: index.search("date", commit_id[:7]), args.repeat)
+
+        workspace.handles.close_all()
+    finally:
+        if args.keep:
+            print(f"Fixtures kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def source_revision():
+    """Return the git revision of the benchmarked code, if available"""
+    try:
+        return run_git(['rev-parse', '--short', 'HEAD'],
+                       cwd=os.path.dirname(os.path.abspath(__file__))).strip()
+    except (subprocess.CalledProcessError, OSError):
+        return ""
+
+
+def load_history(path):
+    history = []
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    history.append(json.loads(line))
+    return history
+
+
+def compare(results, previous, threshold):
+    """Return (case, previous median, current median, change) rows and the regressions"""
+    rows = []
+    regressions = []
+    for case, stats in results.items():
+        before = previous['results'].get(case) if previous else None
+        if before:
+            change = (stats['median'] - before['median']) / before['median'] if before['median'] else 0.0
+            rows.append((case, before['median'], stats['median'], change))
+            if change > threshold:
+                regressions.append(case)
+        else:
+            rows.append((case, None, stats['median'], None))
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Git Event Manager hot paths")
+    parser.add_argument('--commits', type=int, default=500)
+    parser.add_argument('--branches', type=int, default=1000)
+    parser.add_argument('--tags', type=int, default=2000)
+    parser.add_argument('--events', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--history', default=DEFAULT_HISTORY,
+                        help="JSON lines file the results are appended to")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Relative slowdown of the median reported as a regression")
+    parser.add_argument('--fail-on-regression', action='store_true')
+    parser.add_argument('--keep', action='store_true', help="Keep the generated fixtures")
+    args = parser.parse_args()
+
+    params = {'commits': args.commits, 'branches': args.branches,
+              'tags': args.tags, 'events': args.events}
+    history = load_history(args.history)
+    results = run_benchmarks(args)
+
+    # Compare against the last run with the same parameters
+    previous = next((run for run in reversed(history) if run.get('params') == params), None)
+    rows, regressions = compare(results, previous, args.threshold)
+
+    print()
+    print(f"{'Case':<32}{'Previous (ms)':>15}{'Median (ms)':>15}{'Change':>10}")
+    for case, before, after, change in rows:
+        before_text = f"{before * 1000:.1f}" if before is not None else "-"
+        change_text = f"{change:+.0%}" if change is not None else "-"
+        print(f"{case:<32}{before_text:>15}{after * 1000:>15.1f}{change_text:>10}")
+
+    record = {
+        'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'revision': source_revision(),
+        'python': platform.python_version(),
+        'params': params,
+        'results': results
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+    with open(args.history, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record) + "\n")
+
+    if regressions:
+        print(f"\nRegressions over {args.threshold:.0%}: {', '.join(regressions)}")
+        if args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import json
+import os
+from datetime import datetime
+
+# Step states
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+def checkpoint_path(checkpoint_dir, repo_id):
+    """Return the checkpoint file of a repository"""
+    return os.path.join(checkpoint_dir, f"{repo_id}.json")
+
+
+class OperationCheckpoint:
+    """Progress of one execute_operations run, written after every step
+
+    Steps are dicts with a kind (create_branch, merge_branch, merge_tag,
+    create_tag, push_tag), a name, a status and the step's result. The
+    repository HEAD after the last completed step is recorded as well, so
+    a resume can check that nobody moved the repository in between.
+    """
+
+    def __init__(self, path, repo_path, steps):
+        self.path = path
+        self.repo_path = repo_path
+        self.steps = steps
+        self.created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.updated_at = self.created_at
+        self.head_sha = None
+        self.head_branch = None
+
+    @classmethod
+    def plan(cls, path, repo_path, steps):
+        """Start a checkpoint for new steps, each a dict with kind and name"""
+        for step in steps:
+            step.setdefault('status', PENDING)
+            step.setdefault('result', None)
+            step.setdefault('error', "")
+        return cls(path, repo_path, steps)
+
+    @classmethod
+    def load(cls, path):
+        """Return the checkpoint stored at path, or None if there is none"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        checkpoint = cls(path, data['repo_path'], data['steps'])
+        checkpoint.created_at = data.get('created_at', checkpoint.created_at)
+        checkpoint.updated_at = data.get('updated_at', checkpoint.updated_at)
+        checkpoint.head_sha = data.get('head_sha')
+        checkpoint.head_branch = data.get('head_branch')
+        return checkpoint
+
+    def save(self):
+        """Write the checkpoint atomically"""
+        self.updated_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        data = {
+            'repo_path': self.repo_path,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+            'head_sha': self.head_sha,
+            'head_branch': self.head_branch,
+            'steps': self.steps
+        }
+        with open(self.path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(self.path + ".tmp", self.path)
+
+    def discard(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def next_step(self):
+        """Return the index of the first incomplete step, or None"""
+        for index, step in enumerate(self.steps):
+            if step['status'] in (PENDING, FAILED):
+                return index
+        return None
+
+    @property
+    def complete(self):
+        return self.next_step() is None
+
+    def record_head(self, repo):
+        """Remember where the repository stands after a completed step"""
+        self.head_sha = repo.head.commit.hexsha
+        self.head_branch = None if repo.head.is_detached else repo.active_branch.name
+
+    def head_matches(self, repo):
+        """Check that the repository is still where the last completed step left it"""
+        if self.head_sha is None:
+            return True
+        branch = None if repo.head.is_detached else repo.active_branch.name
+        return repo.head.commit.hexsha == self.head_sha and branch == self.head_branch
+
+    def mark(self, index, status, repo=None, result=None, error=""):
+        """Record the outcome of a step and save the checkpoint"""
+        step = self.steps[index]
+        step['status'] = status
+        step['result'] = result
+        step['error'] = error
+        step['finished_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        if repo is not None and status == DONE:
+            self.record_head(repo)
+        self.save()
+
+    def results(self, *kinds):
+        """Return the results of the completed steps of the given kinds"""
+        return [step['result'] for step in self.steps
+                if step['kind'] in kinds and step['status'] == DONE]
+
+    def created(self, kind):
+        """Return the name the last completed create_branch or create_tag step created, or """""
+        names = [step['name'] for step in self.steps if step['kind'] == kind and step['status'] == DONE]
+        return names[-1] if names else ""
+
+    def describe_step(self, step):
+        labels = {
+            'create_branch': "Create branch",
+            'merge_branch': "Merge branch",
+            'merge_tag': "Merge tag",
+            'create_tag': "Create tag",
+            'push_tag': "Push tag"
+        }
+        return f"{labels.get(step['kind'], step['kind'])} '{step['name']}'"
+
+    def describe(self):
+        """Return one line per step with its status"""
+        lines = []
+        for index, step in enumerate(self.steps, 1):
+            line = f"{index}. [{step['status']}] {self.describe_step(step)}"
+            if step.get('error'):
+                line += f": {step['error']}"
+            lines.append(line)
+        return "\n".join(lines)
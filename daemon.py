@@ -0,0 +1,463 @@
+"""Long-lived daemon keeping repository caches warm between app runs
+
+The daemon keeps the ref snapshots, event indexes (with their full-text
+index) and commit metadata of the repositories it has seen. Filesystem
+watchers keep them current. The GUI and the command-line client talk to it
+over a local Unix socket with newline-delimited JSON:
+
+    {"id": 1, "method": "refs", "params": {"path": "/src/app"}}
+    {"id": 1, "result": {...}}            or    {"id": 1, "error": "..."}
+
+Repositories opened once are remembered and warmed again when the daemon
+starts, so the cold start is paid once per login rather than once per run.
+
+Usage:
+    python daemon.py serve [--repo PATH ...] [--events-path PATH]
+    python daemon.py ping | status | config | stop
+    python daemon.py refs PATH [--fetch]
+    python daemon.py events [PATH] [--query TEXT] [--date YYYY-MM-DD] [--branch NAME] [--limit N]
+    python daemon.py commit PATH REV
+"""
+import argparse
+import json
+import os
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Not on Windows, where the daemon is not started
+
+from event_archive import DEFAULT_EVENTS_PATH
+from event_store import EventIndex, SUMMARY_FIELDS, partition_path
+from fetch_coordinator import FetchCoordinator
+from fs_watcher import RepoWatcher
+from ref_snapshot import RefSnapshot
+from tracing import TracedGit
+from workspace import Workspace
+
+DEFAULT_SOCKET_PATH = (os.environ.get('GIT_EVENT_DAEMON_SOCKET') or
+                       os.path.expanduser("~/git_branch_manager/daemon.sock"))
+DEFAULT_STATE_PATH = os.path.expanduser("~/git_branch_manager/daemon_repos.json")
+
+
+class DaemonError(Exception):
+    """The daemon could not be reached or reported an error"""
+
+
+def event_summary(event):
+    """Return the summary fields of an event, without loading archived records"""
+    return {field: getattr(event, field, None) or default for field, default in SUMMARY_FIELDS.items()}
+
+
+class EventDaemon:
+    """Warm caches of the repositories used, served one request at a time per worker
+
+    Requests run on a small worker pool rather than on the connection
+    threads, so the per-thread repository handles (and their cat-file
+    processes) are reused across connections. Requests that need no
+    repository, such as ping, are answered on the connection thread, so
+    a busy pool never makes the daemon look dead.
+    """
+
+    def __init__(self, events_path=DEFAULT_EVENTS_PATH, state_path=DEFAULT_STATE_PATH,
+                 fetch_ttl=60, watch=True, max_commits=5000, max_workers=4):
+        self.events_path = events_path
+        self.state_path = state_path
+        self.watch = watch
+        self.max_commits = max_commits
+        self.workspace = Workspace(FetchCoordinator(ttl=fetch_ttl),
+                                   repo_id_cache=os.path.expanduser("~/git_branch_manager/repo_ids.json"))
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="daemon")
+        self.watchers = {}          # Repository path -> RepoWatcher
+        self.commits = OrderedDict()  # (common dir, sha) -> commit metadata
+        self.config = None
+        self.cross_repo_index = None
+        self.started_at = time.time()
+        self.requests = 0
+        self.stopping = threading.Event()
+        self._lock = threading.RLock()  # Event indexes and caches
+        self.methods = {
+            'ping': self.ping,
+            'status': self.status,
+            'open': self.open_repo,
+            'refs': self.refs,
+            'events': self.events,
+            'commit': self.commit,
+            'config': self.git_config,
+            'stop': self.stop
+        }
+        self.inline_methods = {'ping', 'status', 'stop'}
+
+    def handle(self, request):
+        """Answer one request dict with a response dict"""
+        request_id = request.get('id')
+        method = self.methods.get(request.get('method'))
+        if method is None:
+            return {'id': request_id, 'error': f"Unknown method: {request.get('method')}"}
+        self.requests += 1
+        params = request.get('params') or {}
+        try:
+            if request.get('method') in self.inline_methods:
+                result = method(**params)
+            else:
+                result = self.executor.submit(method, **params).result()
+            return {'id': request_id, 'result': result}
+        except Exception as e:
+            return {'id': request_id, 'error': str(e)}
+
+    def warm(self, paths):
+        """Open repositories ahead of the first request, skipping ones that are gone"""
+        for path in paths:
+            try:
+                self.executor.submit(self.context_for, path).result()
+                print(f"Warmed {path}")
+            except Exception as e:
+                print(f"Error warming {path}: {str(e)}")
+
+    def remembered_repos(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('repos', [])
+        except (OSError, ValueError):
+            return []
+
+    def remember(self):
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        with open(self.state_path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump({'repos': list(self.workspace.contexts)}, f, indent=2)
+        os.replace(self.state_path + ".tmp", self.state_path)
+
+    # Methods
+
+    def ping(self):
+        return {'pid': os.getpid(), 'uptime': time.time() - self.started_at,
+                'repos': len(self.workspace.contexts)}
+
+    def status(self):
+        repos = []
+        for path, context in list(self.workspace.contexts.items()):
+            snapshot = context.snapshot
+            with self._lock:
+                events = sum(1 for event in context.event_index.events())
+            repos.append({
+                'path': path,
+                'refs': len(snapshot.ref_shas) if snapshot else 0,
+                'snapshot_age': time.time() - snapshot.taken_at if snapshot else None,
+                'events': events,
+                'text_index': context.event_index.text_index is not None,
+                'watcher': self.watchers[path].backend_name if path in self.watchers else None,
+                'last_error': context.last_error
+            })
+        return {'pid': os.getpid(), 'uptime': time.time() - self.started_at,
+                'requests': self.requests, 'commits_cached': len(self.commits), 'repos': repos}
+
+    def open_repo(self, path):
+        """Open a repository for warming and describe what is cached"""
+        context = self.context_for(path)
+        return {'path': context.path, 'repo_id': context.repo_id, 'refs': len(context.snapshot.ref_shas)}
+
+    def context_for(self, path):
+        """Return a repository's context, loading its refs and events if they are not cached yet"""
+        context = self.workspace.open(path)
+        if context.snapshot is None:
+            with context.lock:
+                if context.snapshot is None:
+                    context.snapshot = RefSnapshot.capture(context.repo)
+        partition = partition_path(self.events_path, context.repo_id)
+        with self._lock:
+            if not context.event_index.covers(partition):
+                os.makedirs(partition, exist_ok=True)
+                context.event_index.load_all(partition)
+                context.event_index.full_text()
+            if self.watch and context.path not in self.watchers:
+                watcher = RepoWatcher(context.repo.git_dir, context.repo.common_dir, partition,
+                                      lambda invalidation: self.apply_invalidation(context, invalidation))
+                watcher.start()
+                self.watchers[context.path] = watcher
+                self.remember()
+        return context
+
+    def refs(self, path, fetch=False, force=False):
+        """Return a repository's ref snapshot, fetching its remote first if asked"""
+        context = self.context_for(path)
+        if fetch:
+            self.workspace.refresh(context, force=force)
+        return context.snapshot.to_dict()
+
+    def events(self, path=None, query="", date=None, branch=None, limit=200):
+        """Return event summaries of one repository, or of all if no path is given, newest first"""
+        if path:
+            index = self.context_for(path).event_index
+        else:
+            with self._lock:
+                if self.cross_repo_index is None:
+                    index = EventIndex()
+                    index.load_all(self.events_path)
+                    index.full_text()
+                    self.cross_repo_index = index
+                index = self.cross_repo_index
+        with self._lock:
+            events = [event for key, group in index.search("date", query or "") for event in group
+                      if (date is None or key == date) and
+                      (branch is None or (event.base_branch or "") == branch)]
+        # Groups are newest first and so are the events within them
+        return [event_summary(event) for event in events[:limit]]
+
+    def commit(self, path, rev):
+        """Return the metadata of a commit, cached by sha"""
+        context = self.context_for(path)
+        repo = context.repo
+        sha = repo.git.rev_parse('--verify', f"{rev}^{{commit}}")
+        key = (os.path.normpath(repo.common_dir), sha)
+        with self._lock:
+            info = self.commits.get(key)
+            if info is not None:
+                self.commits.move_to_end(key)
+                return info
+        commit = repo.commit(sha)
+        info = {
+            'sha': sha,
+            'message': commit.message.strip(),
+            'author': commit.author.name,
+            'author_email': commit.author.email,
+            'date': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(commit.committed_date)),
+            'parents': [parent.hexsha for parent in commit.parents]
+        }
+        with self._lock:
+            self.commits[key] = info
+            while len(self.commits) > self.max_commits:
+                self.commits.popitem(last=False)
+        return info
+
+    def git_config(self, refresh=False):
+        """Return the global git user name and email, cached until refresh is asked"""
+        with self._lock:
+            if self.config is None or refresh:
+                git_cmd = TracedGit()
+                self.config = {
+                    'user_name': git_cmd.config('--get', 'user.name', with_exceptions=False),
+                    'user_email': git_cmd.config('--get', 'user.email', with_exceptions=False)
+                }
+            return self.config
+
+    def stop(self):
+        self.stopping.set()
+        return {'stopping': True}
+
+    def apply_invalidation(self, context, invalidation):
+        """Update one repository's caches after its watcher saw changes, on the watcher thread"""
+        try:
+            with self._lock:
+                for index in (context.event_index, self.cross_repo_index):
+                    if index is None:
+                        continue
+                    if invalidation.full:
+                        index.load_all(index.root)
+                        continue
+                    for directory in invalidation.event_dirs:
+                        index.sync_directory(directory)
+                    for file_path in invalidation.event_files:
+                        index.load_file(file_path)
+            if invalidation.refs_changed and context.snapshot is not None:
+                with context.lock:
+                    if invalidation.full or invalidation.packed_refs:
+                        context.snapshot = RefSnapshot.capture(context.repo)
+                    else:
+                        context.snapshot = context.snapshot.updated(context.repo, invalidation.refs,
+                                                                    invalidation.head)
+        except Exception as e:
+            context.last_error = str(e)
+            print(f"Error applying invalidation for {context.path}: {str(e)}")
+
+    def close(self):
+        for watcher in self.watchers.values():
+            watcher.stop()
+        self.watchers.clear()
+        self.executor.shutdown(wait=False)
+        self.workspace.handles.close_all()
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        daemon = self.server.daemon
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                response = {'id': None, 'error': f"Invalid request: {str(e)}"}
+            else:
+                response = daemon.handle(request)
+            self.wfile.write(json.dumps(response).encode('utf-8') + b"\n")
+            self.wfile.flush()
+            if daemon.stopping.is_set():
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                return
+
+
+class _DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(socket_path=DEFAULT_SOCKET_PATH, events_path=DEFAULT_EVENTS_PATH, repos=(), watch=True):
+    """Run the daemon until it is asked to stop
+
+    The daemon holds an exclusive lock on <socket>.lock while it runs, so a
+    second one exits instead of removing the live socket; a socket file
+    found while holding the lock was left behind by a daemon that died.
+    """
+    os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+    lock_file = open(socket_path + ".lock", 'a')
+    if fcntl is not None:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            raise DaemonError(f"A daemon is already running on {socket_path}")
+    elif DaemonClient.running(socket_path):
+        lock_file.close()
+        raise DaemonError(f"A daemon is already listening on {socket_path}")
+    if os.path.exists(socket_path):
+        os.remove(socket_path)  # Left behind by a daemon that did not exit cleanly
+
+    daemon = EventDaemon(events_path, watch=watch)
+    server = _DaemonServer(socket_path, _RequestHandler)
+    server.daemon = daemon
+    os.chmod(socket_path, 0o600)
+    print(f"Listening on {socket_path}")
+    threading.Thread(target=daemon.warm, args=(list(repos) + daemon.remembered_repos(),),
+                     daemon=True).start()
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        daemon.close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        lock_file.close()  # Releases the lock
+
+
+class DaemonClient:
+    """Connection to a running daemon, safe to share between threads"""
+
+    def __init__(self, socket_path=DEFAULT_SOCKET_PATH, timeout=30.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._socket = None
+        self._file = None
+
+    @classmethod
+    def running(cls, socket_path=DEFAULT_SOCKET_PATH):
+        """Check whether a daemon answers on the socket"""
+        try:
+            cls(socket_path, timeout=2.0).call('ping')
+            return True
+        except DaemonError:
+            return False
+
+    @classmethod
+    def connect(cls, socket_path=DEFAULT_SOCKET_PATH, start=False):
+        """Return a client of the running daemon, starting one first if asked, or None"""
+        if not hasattr(socket, 'AF_UNIX'):
+            return None
+        if cls.running(socket_path):
+            return cls(socket_path)
+        if not start:
+            return None
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), 'serve', '--socket', socket_path],
+                         stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                         start_new_session=True)
+        for attempt in range(50):
+            time.sleep(0.1)
+            if cls.running(socket_path):
+                return cls(socket_path)
+        return None
+
+    def call(self, method, **params):
+        """Send one request and return its result, raising DaemonError on failure"""
+        with self._lock:
+            self._next_id += 1
+            request = {'id': self._next_id, 'method': method, 'params': params}
+            try:
+                if self._socket is None:
+                    self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                    self._socket.settimeout(self.timeout)
+                    self._socket.connect(self.socket_path)
+                    self._file = self._socket.makefile('rb')
+                self._socket.sendall(json.dumps(request).encode('utf-8') + b"\n")
+                line = self._file.readline()
+            except OSError as e:
+                self.close()
+                raise DaemonError(f"Daemon not reachable at {self.socket_path}: {str(e)}")
+            if not line:
+                self.close()
+                raise DaemonError("Daemon closed the connection")
+        response = json.loads(line)
+        if 'error' in response:
+            raise DaemonError(response['error'])
+        return response.get('result')
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+        if self._socket is not None:
+            self._socket.close()
+        self._socket = None
+        self._file = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Daemon keeping repository caches warm")
+    parser.add_argument('--socket', default=DEFAULT_SOCKET_PATH)
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve_parser = commands.add_parser('serve', help="Run the daemon")
+    serve_parser.add_argument('--repo', action='append', default=[], help="Repository to warm at start")
+    serve_parser.add_argument('--events-path', default=DEFAULT_EVENTS_PATH)
+    serve_parser.add_argument('--no-watch', action='store_true', help="Do not watch repositories for changes")
+    for name in ('ping', 'status', 'config', 'stop'):
+        commands.add_parser(name)
+    refs_parser = commands.add_parser('refs', help="Print a repository's refs")
+    refs_parser.add_argument('path')
+    refs_parser.add_argument('--fetch', action='store_true')
+    events_parser = commands.add_parser('events', help="Print events, of all repositories without a path")
+    events_parser.add_argument('path', nargs='?')
+    events_parser.add_argument('--query', default="")
+    events_parser.add_argument('--date')
+    events_parser.add_argument('--branch')
+    events_parser.add_argument('--limit', type=int, default=200)
+    commit_parser = commands.add_parser('commit', help="Print the metadata of a commit")
+    commit_parser.add_argument('path')
+    commit_parser.add_argument('rev')
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'serve':
+            serve(args.socket, args.events_path, args.repo, watch=not args.no_watch)
+            return
+        client = DaemonClient(args.socket)
+        if args.command == 'refs':
+            result = client.call('refs', path=os.path.abspath(args.path), fetch=args.fetch)
+        elif args.command == 'events':
+            result = client.call('events', path=os.path.abspath(args.path) if args.path else None,
+                                 query=args.query, date=args.date, branch=args.branch, limit=args.limit)
+        elif args.command == 'commit':
+            result = client.call('commit', path=os.path.abspath(args.path), rev=args.rev)
+        else:
+            result = client.call(args.command)
+    except DaemonError as e:
+        print(f"Error: {str(e)}")
+        sys.exit(1)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""Aggregate statistics over the event history
+
+Events are loaded once into columns (typed arrays) and every aggregate is
+a single pass over those columns, vectorized with NumPy when it is
+installed. Reports cover weekly activity, merges per release and the most
+merged source branches, and can be exported as CSV or JSON.
+"""
+import csv
+import json
+from array import array
+from collections import Counter
+from datetime import date, datetime
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+WEEKLY_COLUMNS = ('week', 'events', 'branches', 'tags', 'merges')
+RELEASE_COLUMNS = ('tag', 'date', 'repository', 'merges')
+MERGED_COLUMNS = ('source', 'merges', 'releases')
+
+
+def week_start(week):
+    """Return the Monday of a week number counted from 0001-01-01"""
+    return date.fromordinal(week * 7 + 1)
+
+
+def source_name(name):
+    """Normalize a merged item name so local and remote merges of a branch count together"""
+    return name.split(' (')[0]
+
+
+class EventColumns:
+    """The event history as parallel typed arrays, one entry per event
+
+    Dates are day ordinals (0 when unknown). Merged sources are interned
+    names, flattened into source_ids with the owning event in source_events.
+    """
+
+    def __init__(self):
+        self.days = array('q')
+        self.branch_cut = array('b')
+        self.tag_created = array('b')
+        self.merge_counts = array('q')
+        self.tags = []            # Created tag per event, "" if none
+        self.dates = []           # Date string per event
+        self.repos = []           # Repository name per event
+        self.source_ids = array('q')
+        self.source_events = array('q')
+        self.source_names = []
+
+    def __len__(self):
+        return len(self.days)
+
+    @classmethod
+    def from_events(cls, events):
+        """Build the columns in one pass over the events"""
+        columns = cls()
+        day_cache = {}
+        source_ids = {}
+        for position, event in enumerate(events):
+            event_date = event.date or ""
+            day_text = event_date[:10]
+            day = day_cache.get(day_text)
+            if day is None:
+                try:
+                    day = date.fromisoformat(day_text).toordinal()
+                except ValueError:
+                    day = 0
+                day_cache[day_text] = day
+            merged = event.merged_branches or []
+
+            columns.days.append(day)
+            columns.branch_cut.append(1 if event.created_branch else 0)
+            columns.tag_created.append(1 if event.created_tag else 0)
+            columns.merge_counts.append(len(merged))
+            columns.tags.append(event.created_tag or "")
+            columns.dates.append(event_date)
+            columns.repos.append(event.repo_name or "")
+            for name in merged:
+                name = source_name(name)
+                source_id = source_ids.get(name)
+                if source_id is None:
+                    source_id = source_ids[name] = len(columns.source_names)
+                    columns.source_names.append(name)
+                columns.source_ids.append(source_id)
+                columns.source_events.append(position)
+        return columns
+
+
+def _selection(columns, since_day):
+    """Return the positions of dated events on or after since_day"""
+    if numpy is not None:
+        days = numpy.frombuffer(columns.days, dtype=numpy.int64)
+        return numpy.nonzero(days >= max(since_day or 0, 1))[0]
+    lowest = max(since_day or 0, 1)
+    return [i for i, day in enumerate(columns.days) if day >= lowest]
+
+
+def weekly_counts(columns, since_day=None):
+    """Return one row per week with events, branches cut, tags created and merges"""
+    if not len(columns):
+        return []
+    selected = _selection(columns, since_day)
+    if numpy is not None:
+        days = numpy.frombuffer(columns.days, dtype=numpy.int64)[selected]
+        weeks, inverse = numpy.unique((days - 1) // 7, return_inverse=True)
+        events = numpy.bincount(inverse, minlength=len(weeks))
+        branches = numpy.bincount(inverse, numpy.frombuffer(columns.branch_cut, dtype=numpy.int8)[selected],
+                                  minlength=len(weeks))
+        tags = numpy.bincount(inverse, numpy.frombuffer(columns.tag_created, dtype=numpy.int8)[selected],
+                              minlength=len(weeks))
+        merges = numpy.bincount(inverse, numpy.frombuffer(columns.merge_counts, dtype=numpy.int64)[selected],
+                                minlength=len(weeks))
+        totals = zip(weeks.tolist(), events.tolist(), branches.tolist(), tags.tolist(), merges.tolist())
+    else:
+        weeks = {}
+        for i in selected:
+            entry = weeks.setdefault((columns.days[i] - 1) // 7, [0, 0, 0, 0])
+            entry[0] += 1
+            entry[1] += columns.branch_cut[i]
+            entry[2] += columns.tag_created[i]
+            entry[3] += columns.merge_counts[i]
+        totals = ((week,) + tuple(entry) for week, entry in sorted(weeks.items()))
+
+    return [{'week': week_start(int(week)).isoformat(), 'events': int(events),
+             'branches': int(branches), 'tags': int(tags), 'merges': int(merges)}
+            for week, events, branches, tags, merges in totals]
+
+
+def release_merges(columns, since_day=None):
+    """Return one row per created tag with the number of items merged for it, newest first"""
+    selected = _selection(columns, since_day)
+    if numpy is not None:
+        tagged = numpy.frombuffer(columns.tag_created, dtype=numpy.int8)[selected] == 1
+        positions = selected[tagged].tolist()
+    else:
+        positions = [i for i in selected if columns.tag_created[i]]
+    rows = [{'tag': columns.tags[i], 'date': columns.dates[i], 'repository': columns.repos[i],
+             'merges': int(columns.merge_counts[i])} for i in positions]
+    rows.sort(key=lambda row: row['date'], reverse=True)
+    return rows
+
+
+def most_merged(columns, since_day=None, limit=25):
+    """Return the most merged source branches and tags with their merge and release counts"""
+    if not columns.source_names:
+        return []
+    lowest = max(since_day or 0, 1)
+    if numpy is not None:
+        days = numpy.frombuffer(columns.days, dtype=numpy.int64)
+        events = numpy.frombuffer(columns.source_events, dtype=numpy.int64)
+        ids = numpy.frombuffer(columns.source_ids, dtype=numpy.int64)
+        keep = days[events] >= lowest
+        tagged = numpy.frombuffer(columns.tag_created, dtype=numpy.int8)[events] == 1
+        counts = numpy.bincount(ids[keep], minlength=len(columns.source_names))
+        releases = numpy.bincount(ids[keep & tagged], minlength=len(columns.source_names))
+        top = numpy.argsort(-counts, kind='stable')[:limit]
+        rows = [(int(i), int(counts[i]), int(releases[i])) for i in top.tolist() if counts[i]]
+    else:
+        counts = Counter()
+        releases = Counter()
+        for source_id, event in zip(columns.source_ids, columns.source_events):
+            if columns.days[event] >= lowest:
+                counts[source_id] += 1
+                if columns.tag_created[event]:
+                    releases[source_id] += 1
+        rows = [(i, count, releases[i]) for i, count in counts.most_common(limit)]
+    return [{'source': columns.source_names[i], 'merges': count, 'releases': release_count}
+            for i, count, release_count in rows]
+
+
+def build_report(columns, weeks=None, limit=25):
+    """Compute every aggregate, optionally only for the last number of weeks"""
+    since_day = None
+    if weeks:
+        since_day = date.today().toordinal() - weeks * 7 + 1
+    return {
+        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'weeks': weeks or None,
+        'events': len(columns),
+        'backend': "numpy" if numpy is not None else "array",
+        'weekly': weekly_counts(columns, since_day),
+        'releases': release_merges(columns, since_day),
+        'most_merged': most_merged(columns, since_day, limit)
+    }
+
+
+def export_json(report, file_path):
+    with open(file_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+def export_csv(rows, columns, file_path):
+    """Write one report table as CSV"""
+    with open(file_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
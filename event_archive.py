@@ -0,0 +1,329 @@
+"""Roll closed months of event history into compressed monthly archives
+
+Each directory holding date directories (the events root for events saved
+before partitioning, and every repository partition) gets an archive
+directory with one <YYYY-MM>.events.gz (or .xz) file per month and a JSON
+sidecar index of record offsets by date and base branch. The event JSON
+files of archived months are removed afterwards.
+
+Events saved before partitioning can be moved into one repository's
+partition with migrate_legacy, archived ones are unpacked into event
+files there and archived again by the next compaction.
+
+Usage:
+    python event_archive.py [--events-path PATH] [--before YYYY-MM] [--format gz|xz]
+"""
+import argparse
+import gzip
+import json
+import lzma
+import os
+import re
+from datetime import datetime
+
+from event_store import (ARCHIVE_DIR, ARCHIVE_INDEX_SUFFIX, PARTITIONS_DIR, SUMMARY_FIELDS,
+                         decompress_record, partition_path, read_archive_index)
+
+DEFAULT_EVENTS_PATH = os.path.expanduser("~/git_branch_manager/git_events")
+DATE_DIR_PATTERN = re.compile(r'^(\d{4}-\d{2})-\d{2}$')
+
+# Written below the partitions once legacy events were moved or the move declined
+LEGACY_MARKER = ".legacy_checked"
+
+
+class CompactionResult:
+    """Archives written by one compaction run"""
+
+    def __init__(self):
+        self.archives = []     # (archive path, events added, total events)
+        self.removed_files = 0
+        self.errors = []
+
+    def describe(self):
+        added = sum(entry[1] for entry in self.archives)
+        text = f"Archived {added} events into {len(self.archives)} monthly archives"
+        if self.errors:
+            text += f", {len(self.errors)} errors"
+        return text
+
+
+def compress_record(data, compression):
+    if compression == "xz":
+        return lzma.compress(data)
+    return gzip.compress(data, mtime=0)
+
+
+def archive_paths(directory, month, compression):
+    """Return the archive and sidecar index paths of one month"""
+    archive_dir = os.path.join(directory, ARCHIVE_DIR)
+    return (os.path.join(archive_dir, f"{month}.events.{compression}"),
+            os.path.join(archive_dir, f"{month}{ARCHIVE_INDEX_SUFFIX}"))
+
+
+def find_closed_months(events_path, before):
+    """Return {(directory, month): [date directories]} for months older than before"""
+    months = {}
+    for root, dirs, files in os.walk(events_path):
+        if os.path.basename(root) == ARCHIVE_DIR:
+            dirs[:] = []
+            continue
+        for name in dirs:
+            match = DATE_DIR_PATTERN.match(name)
+            if match and match.group(1) < before:
+                months.setdefault((root, match.group(1)), []).append(os.path.join(root, name))
+    return months
+
+
+def read_existing_records(index_path):
+    """Return (file name, raw JSON bytes) pairs already archived for a month"""
+    if not os.path.exists(index_path):
+        return []
+    index = read_archive_index(index_path)
+    archive_path = os.path.join(os.path.dirname(index_path), index['archive'])
+    records = []
+    with open(archive_path, 'rb') as f:
+        for record in index['records']:
+            f.seek(record['offset'])
+            data = decompress_record(f.read(record['length']), index['compression'])
+            records.append((record['file'], data))
+    return records
+
+
+def write_month(directory, month, date_dirs, compression):
+    """Archive the event files of one month and return (archive path, added, total, files)"""
+    archive_path, index_path = archive_paths(directory, month, compression)
+    previous_archive = None
+    if os.path.exists(index_path):
+        previous_archive = os.path.join(os.path.dirname(index_path),
+                                        read_archive_index(index_path)['archive'])
+    records = dict(read_existing_records(index_path))
+    archived = len(records)
+
+    source_files = []
+    for date_dir in sorted(date_dirs):
+        for name in sorted(os.listdir(date_dir)):
+            if not name.endswith('.json'):
+                continue
+            file_path = os.path.join(date_dir, name)
+            with open(file_path, 'rb') as f:
+                data = f.read()
+            json.loads(data)  # Refuse to archive files that do not parse
+            # Keyed by relative path, so an interrupted run can be repeated safely
+            records[os.path.relpath(file_path, directory).replace(os.sep, '/')] = data
+            source_files.append(file_path)
+
+    entries = []
+    for file_name, data in records.items():
+        event_data = json.loads(data)
+        entries.append((event_data.get('date') or "", file_name, data, event_data))
+    entries.sort(key=lambda entry: (entry[0], entry[1]))
+
+    os.makedirs(os.path.dirname(archive_path), exist_ok=True)
+    index = {
+        'version': 1,
+        'month': month,
+        'archive': os.path.basename(archive_path),
+        'compression': compression,
+        'records': [],
+        'by_date': {},
+        'by_branch': {}
+    }
+    offset = 0
+    with open(archive_path + ".tmp", 'wb') as f:
+        for position, (date, file_name, data, event_data) in enumerate(entries):
+            compressed = compress_record(data, compression)
+            f.write(compressed)
+            record = {'file': file_name, 'offset': offset, 'length': len(compressed)}
+            for field, default in SUMMARY_FIELDS.items():
+                record[field] = event_data.get(field) or default
+            index['records'].append(record)
+            index['by_date'].setdefault(date.split()[0] if date else "", []).append(position)
+            index['by_branch'].setdefault(record['base_branch'], []).append(position)
+            offset += len(compressed)
+    with open(index_path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+
+    # The archive is in place before the index points at it, and both
+    # before any source file is removed
+    os.replace(archive_path + ".tmp", archive_path)
+    os.replace(index_path + ".tmp", index_path)
+    if previous_archive and previous_archive != archive_path and os.path.exists(previous_archive):
+        os.remove(previous_archive)  # Recompressed with the other format
+    return archive_path, len(records) - archived, len(records), source_files
+
+
+def compact(events_path, before=None, compression="gz"):
+    """Roll every closed month below events_path into compressed archives
+
+    Months older than before (YYYY-MM, default: the current month) are
+    archived. Archiving a month again merges new event files into its
+    existing archive.
+    """
+    if compression not in ("gz", "xz"):
+        raise ValueError(f"Unsupported compression: {compression}")
+    before = before or datetime.now().strftime('%Y-%m')
+    result = CompactionResult()
+
+    for (directory, month), date_dirs in sorted(find_closed_months(events_path, before).items()):
+        try:
+            archive_path, added, total, source_files = write_month(
+                directory, month, date_dirs, compression)
+        except (OSError, ValueError, KeyError) as e:
+            result.errors.append(f"{directory} {month}: {str(e)}")
+            continue
+        result.archives.append((archive_path, added, total))
+
+        for file_path in source_files:
+            try:
+                os.remove(file_path)
+                result.removed_files += 1
+            except OSError as e:
+                result.errors.append(f"{file_path}: {str(e)}")
+        for date_dir in date_dirs:
+            try:
+                os.rmdir(date_dir)
+            except OSError:
+                pass  # Not empty, e.g. other files were added meanwhile
+    return result
+
+
+class MigrationResult:
+    """Events moved by one legacy migration"""
+
+    def __init__(self, partition):
+        self.partition = partition
+        self.moved = 0
+        self.errors = []
+
+    def describe(self):
+        text = f"Moved {self.moved} events saved before partitioning into {self.partition}"
+        if self.errors:
+            text += f", {len(self.errors)} errors"
+        return text
+
+
+def legacy_event_count(events_path):
+    """Count the events stored in the events root, saved before partitioning"""
+    count = 0
+    for name in os.listdir(events_path) if os.path.isdir(events_path) else []:
+        path = os.path.join(events_path, name)
+        if DATE_DIR_PATTERN.match(name) and os.path.isdir(path):
+            count += sum(1 for file in os.listdir(path) if file.endswith('.json'))
+    archive_dir = os.path.join(events_path, ARCHIVE_DIR)
+    if os.path.isdir(archive_dir):
+        for name in os.listdir(archive_dir):
+            if name.endswith(ARCHIVE_INDEX_SUFFIX):
+                try:
+                    count += len(read_archive_index(os.path.join(archive_dir, name))['records'])
+                except (OSError, ValueError, KeyError):
+                    continue
+    return count
+
+
+def legacy_checked(events_path):
+    return os.path.exists(os.path.join(events_path, PARTITIONS_DIR, LEGACY_MARKER))
+
+
+def mark_legacy_checked(events_path):
+    directory = os.path.join(events_path, PARTITIONS_DIR)
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LEGACY_MARKER), 'w', encoding='utf-8') as f:
+        f.write(datetime.now().strftime('%Y-%m-%d %H:%M:%S') + "\n")
+
+
+def write_migrated(partition, relative_path, data, repo_id, repo_name):
+    """Write one legacy event into a partition, recording the repository it now belongs to
+
+    An identical event already there, e.g. from an interrupted run, is not
+    written again.
+    """
+    event_data = json.loads(data)
+    event_data['repo_id'] = event_data.get('repo_id') or repo_id
+    event_data['repo_name'] = event_data.get('repo_name') or repo_name
+    target = os.path.join(partition, relative_path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    base, extension = os.path.splitext(target)
+    number = 1
+    while os.path.exists(target):
+        with open(target, 'r', encoding='utf-8') as f:
+            if json.load(f) == event_data:
+                return
+        target = f"{base}-{number}{extension}"
+        number += 1
+    with open(target + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(event_data, f, ensure_ascii=False, indent=2)
+    os.replace(target + ".tmp", target)
+
+
+def migrate_legacy(events_path, repo_id, repo_name=""):
+    """Move the events saved before partitioning into one repository's partition
+
+    Event files keep their date directory, archived months are unpacked
+    into event files. Sources are removed once written, so an interrupted
+    migration can be run again.
+    """
+    partition = partition_path(events_path, repo_id)
+    result = MigrationResult(partition)
+    for name in sorted(os.listdir(events_path)):
+        date_dir = os.path.join(events_path, name)
+        if not (DATE_DIR_PATTERN.match(name) and os.path.isdir(date_dir)):
+            continue
+        for file in sorted(os.listdir(date_dir)):
+            if not file.endswith('.json'):
+                continue
+            file_path = os.path.join(date_dir, file)
+            try:
+                with open(file_path, 'rb') as f:
+                    write_migrated(partition, os.path.join(name, file), f.read(), repo_id, repo_name)
+                os.remove(file_path)
+                result.moved += 1
+            except (OSError, ValueError) as e:
+                result.errors.append(f"{file_path}: {str(e)}")
+        try:
+            os.rmdir(date_dir)
+        except OSError:
+            pass  # Not empty, e.g. a file failed to move
+
+    archive_dir = os.path.join(events_path, ARCHIVE_DIR)
+    for name in sorted(os.listdir(archive_dir)) if os.path.isdir(archive_dir) else []:
+        if not name.endswith(ARCHIVE_INDEX_SUFFIX):
+            continue
+        index_path = os.path.join(archive_dir, name)
+        try:
+            index = read_archive_index(index_path)
+            archive_path = os.path.join(archive_dir, index['archive'])
+            with open(archive_path, 'rb') as f:
+                for record in index['records']:
+                    f.seek(record['offset'])
+                    data = decompress_record(f.read(record['length']), index.get('compression', "gz"))
+                    write_migrated(partition, record['file'], data, repo_id, repo_name)
+                    result.moved += 1
+            # The index goes first, so the events are never listed twice
+            os.remove(index_path)
+            os.remove(archive_path)
+        except (OSError, ValueError, KeyError) as e:
+            result.errors.append(f"{index_path}: {str(e)}")
+    try:
+        os.rmdir(archive_dir)
+    except OSError:
+        pass
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact old event history into monthly archives")
+    parser.add_argument('--events-path', default=DEFAULT_EVENTS_PATH)
+    parser.add_argument('--before', help="Archive months before YYYY-MM (default: the current month)")
+    parser.add_argument('--format', choices=("gz", "xz"), default="gz")
+    args = parser.parse_args()
+
+    result = compact(args.events_path, args.before, args.format)
+    for archive_path, added, total in result.archives:
+        print(f"{archive_path}: +{added} events ({total} total)")
+    for error in result.errors:
+        print(f"Error: {error}")
+    print(result.describe())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""Event history stored in the managed repository and shared through git
+
+Optional backend for sharing a repository's events without copying JSON
+files: the events of its partition are committed as blobs to
+refs/event-log/events, one tree path per event (<YYYY-MM-DD>/<file>.json,
+the same relative paths the partition and its monthly archives use) plus
+the commit table. Syncing is one fetch and one push of that ref, so only
+new events travel, delta-compressed.
+
+Events are only ever added, so concurrent appends are merged as the
+union of both trees. An event path with different contents on both sides
+keeps the local version and adds the other as <file>.<blob id>.json, and
+the commit tables are merged by commit sha.
+
+Usage:
+    python event_log.py --repo PATH [--events-path PATH] [--remote NAME] [export|import|sync]
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+from io import BytesIO
+
+import git
+from git import GitCommandError, IndexFile
+from git.index.typ import BaseIndexEntry
+from gitdb import IStream
+
+from event_archive import DEFAULT_EVENTS_PATH, DATE_DIR_PATTERN, read_existing_records
+from event_store import (ARCHIVE_DIR, ARCHIVE_INDEX_SUFFIX, COMMITS_FILE, CommitTable,
+                         partition_path, repo_identity)
+
+EVENT_LOG_REF = "refs/event-log/events"
+# Remote event logs are fetched to refs/event-log-remotes/<remote>/events
+TRACKING_PREFIX = "refs/event-log-remotes"
+EVENT_PATH_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}/[^/]+\.json$')
+BLOB_MODE = 0o100644
+NULL_SHA = "0" * 40
+
+
+def blob_sha(data):
+    """Return the git object id of a blob with the given contents"""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def conflict_path(path, sha):
+    """Return the path an event is kept at when another event has its path"""
+    return f"{path[:-len('.json')]}.{sha[:8]}.json"
+
+
+def place(path, sha, occupied):
+    """Return where an event with the given blob goes among occupied paths, None if it is there already"""
+    if path not in occupied:
+        return path
+    if occupied[path] == sha:
+        return None
+    alternative = conflict_path(path, sha)
+    return alternative if alternative not in occupied else None
+
+
+def local_event_files(directory):
+    """Return {tree path: contents} of the loose and archived events of a partition"""
+    files = {}
+    if not os.path.isdir(directory):
+        return files
+    for name in sorted(os.listdir(directory)):
+        date_dir = os.path.join(directory, name)
+        if not (DATE_DIR_PATTERN.match(name) and os.path.isdir(date_dir)):
+            continue
+        for file_name in sorted(os.listdir(date_dir)):
+            if not file_name.endswith('.json'):
+                continue
+            with open(os.path.join(date_dir, file_name), 'rb') as f:
+                files[f"{name}/{file_name}"] = f.read()
+    archive_dir = os.path.join(directory, ARCHIVE_DIR)
+    if os.path.isdir(archive_dir):
+        for name in sorted(os.listdir(archive_dir)):
+            if not name.endswith(ARCHIVE_INDEX_SUFFIX):
+                continue
+            # Loose files win over archived copies of the same event
+            for path, data in read_existing_records(os.path.join(archive_dir, name)):
+                files.setdefault(path, data)
+    return files
+
+
+def parse_commits(data):
+    """Parse a commit table blob into sha -> metadata"""
+    commits = {}
+    for line in data.decode('utf-8').splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        commits[record.pop('sha')] = record
+    return commits
+
+
+def format_commits(commits):
+    """Serialize a commit table sorted by sha, so equal tables are equal blobs"""
+    return "".join(json.dumps(dict(commits[sha], sha=sha), ensure_ascii=False, sort_keys=True) + "\n"
+                   for sha in sorted(commits)).encode('utf-8')
+
+
+class SyncResult:
+    """What one export, import or sync of the event log did"""
+
+    def __init__(self, remote_name=""):
+        self.remote_name = remote_name
+        self.exported = 0      # Local events committed to the log
+        self.imported = 0      # Events written to the partition from the log
+        self.commits_imported = 0
+        self.fetched = False
+        self.merged = False
+        self.pushed = False
+        self.conflicts = []    # Event paths that differed, the remote copy was kept next to it
+
+    def describe(self):
+        text = f"Event log: {self.exported} events exported, {self.imported} imported"
+        if self.remote_name:
+            if not self.fetched:
+                text += f", no event log on {self.remote_name} yet"
+            if self.merged:
+                text += f", merged with {self.remote_name}"
+            if self.pushed:
+                text += f", pushed to {self.remote_name}"
+        if self.conflicts:
+            text += f", {len(self.conflicts)} conflicting events kept twice"
+        return text
+
+
+class EventLog:
+    """The event log ref of one repository"""
+
+    def __init__(self, repo, ref=EVENT_LOG_REF):
+        self.repo = repo
+        self.ref = ref
+
+    def resolve(self, ref):
+        """Return the commit sha a ref points to, None if it does not exist"""
+        try:
+            return self.repo.git.rev_parse('--verify', '-q', f"{ref}^{{commit}}")
+        except GitCommandError:
+            return None
+
+    def head(self):
+        return self.resolve(self.ref)
+
+    def tracking_ref(self, remote_name):
+        return f"{TRACKING_PREFIX}/{remote_name}/{self.ref.rsplit('/', 1)[-1]}"
+
+    def entries(self, sha):
+        """Return {tree path: blob sha} of an event log commit"""
+        if sha is None:
+            return {}
+        return {item.path: item.hexsha for item in self.repo.commit(sha).tree.traverse()
+                if item.type == 'blob'}
+
+    def read(self, sha):
+        return self.repo.odb.stream(bytes.fromhex(sha)).read()
+
+    def write_blob(self, data):
+        return self.repo.odb.store(IStream('blob', len(data), BytesIO(data))).binsha
+
+    def commit(self, parent, parents, changes, message):
+        """Commit changed paths on top of parent's tree and move the ref from parent to the new commit
+
+        changes maps tree paths to contents (bytes) or existing blob shas
+        (hex strings). Fails if the ref moved meanwhile.
+        """
+        # An index on a path that does not exist starts empty and is never
+        # written, the repository's own index is not touched
+        index = IndexFile(self.repo, os.path.join(self.repo.git_dir, "event-log.index"))
+        items = []
+        if parent is not None:
+            items.extend(BaseIndexEntry((item.mode, item.binsha, 0, item.path))
+                         for item in self.repo.commit(parent).tree.traverse() if item.type == 'blob')
+        for path, content in sorted(changes.items()):
+            binsha = bytes.fromhex(content) if isinstance(content, str) else self.write_blob(content)
+            items.append(BaseIndexEntry((BLOB_MODE, binsha, 0, path)))
+        index.add(items, write=False)
+        tree = index.write_tree()
+        commit = git.Commit.create_from_tree(self.repo, tree, message,
+                                             parent_commits=[self.repo.commit(sha) for sha in parents],
+                                             head=False)
+        self.repo.git.update_ref('-m', f"event-log: {message}", self.ref, commit.hexsha, parent or NULL_SHA)
+        return commit.hexsha
+
+    def export(self, directory, result=None):
+        """Commit the partition's events and commits missing from the log, return the log head"""
+        result = result or SyncResult()
+        head = self.head()
+        entries = self.entries(head)
+        logged = set(entries.values())
+        changes = {}
+        for path, data in local_event_files(directory).items():
+            sha = blob_sha(data)
+            if sha in logged:
+                continue
+            target = place(path, sha, entries)
+            if target is not None:
+                changes[target] = data
+                logged.add(sha)
+        result.exported = len(changes)
+        commits = CommitTable(directory).records()
+        if commits:
+            if COMMITS_FILE in entries:
+                commits = dict(parse_commits(self.read(entries[COMMITS_FILE])), **commits)
+            data = format_commits(commits)
+            if entries.get(COMMITS_FILE) != blob_sha(data):
+                changes[COMMITS_FILE] = data
+        if not changes:
+            return head
+        return self.commit(head, [head] if head else [], changes, f"Add {result.exported} events")
+
+    def import_events(self, directory, result=None):
+        """Write the events of the log missing from the partition, and merge its commit table"""
+        result = result or SyncResult()
+        entries = self.entries(self.head())
+        present = {path: blob_sha(data) for path, data in local_event_files(directory).items()}
+        local = set(present.values())
+        for path, sha in sorted(entries.items()):
+            if sha in local or not EVENT_PATH_PATTERN.match(path):
+                continue
+            target = place(path, sha, present)
+            if target is None:
+                continue
+            present[target] = sha
+            local.add(sha)
+            file_path = os.path.join(directory, *target.split('/'))
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            # Written aside and renamed, so the watcher never loads half a file
+            with open(file_path + ".tmp", 'wb') as f:
+                f.write(self.read(sha))
+            os.replace(file_path + ".tmp", file_path)
+            result.imported += 1
+        if COMMITS_FILE in entries:
+            result.commits_imported = CommitTable(directory).update(parse_commits(self.read(entries[COMMITS_FILE])))
+        return result
+
+    def merge(self, ours, theirs, result):
+        """Merge another event log commit into the local log, return the new head"""
+        if ours is None:
+            self.repo.git.update_ref('-m', "event-log: initial fetch", self.ref, theirs, NULL_SHA)
+            return theirs
+        if ours == theirs or self.repo.is_ancestor(theirs, ours):
+            return ours
+        if self.repo.is_ancestor(ours, theirs):
+            self.repo.git.update_ref('-m', "event-log: fast-forward", self.ref, theirs, ours)
+            return theirs
+
+        # Union of both sides' events, an event is identified by its contents
+        our_entries = self.entries(ours)
+        occupied = dict(our_entries)
+        logged = set(our_entries.values())
+        changes = {}
+        for path, sha in sorted(self.entries(theirs).items()):
+            if path == COMMITS_FILE:
+                if our_entries.get(path, sha) != sha:
+                    commits = dict(parse_commits(self.read(sha)), **parse_commits(self.read(our_entries[path])))
+                    changes[path] = format_commits(commits)
+                else:
+                    changes[path] = sha
+                continue
+            if sha in logged:
+                continue
+            target = place(path, sha, occupied)
+            if target is None:
+                continue
+            if target != path:
+                # Both sides wrote this path differently, keep both events
+                result.conflicts.append(path)
+            changes[target] = sha
+            occupied[target] = sha
+            logged.add(sha)
+        result.merged = True
+        return self.commit(ours, [ours, theirs], changes, f"Merge event log of {result.remote_name or theirs[:8]}")
+
+    def fetch(self, remote_name):
+        """Fetch the remote's event log, return its sha or None if the remote has none"""
+        tracking = self.tracking_ref(remote_name)
+        try:
+            self.repo.git.fetch(remote_name, f"+{self.ref}:{tracking}")
+        except GitCommandError as e:
+            if "couldn't find remote ref" in str(e).lower():
+                return None
+            raise
+        return self.resolve(tracking)
+
+    def sync(self, directory, remote_name, attempts=3):
+        """Export local events, merge the remote's log, push the result and import what is new
+
+        A push rejected because someone else pushed meanwhile is retried
+        after fetching and merging again.
+        """
+        result = SyncResult(remote_name)
+        local = self.export(directory, result)
+        for attempt in range(attempts):
+            remote = self.fetch(remote_name)
+            result.fetched = remote is not None
+            if remote is not None:
+                local = self.merge(local, remote, result)
+            if local is None or local == remote:
+                break
+            try:
+                self.repo.git.push(remote_name, f"{local}:{self.ref}")
+                result.pushed = True
+                break
+            except GitCommandError:
+                if attempt == attempts - 1:
+                    raise
+        self.import_events(directory, result)
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Share event history through a ref of the managed repository")
+    parser.add_argument('action', nargs='?', choices=("export", "import", "sync"), default="sync")
+    parser.add_argument('--repo', default=os.getcwd())
+    parser.add_argument('--events-path', default=DEFAULT_EVENTS_PATH)
+    parser.add_argument('--remote', default="origin")
+    args = parser.parse_args()
+
+    repo = git.Repo(args.repo)
+    directory = partition_path(args.events_path, repo_identity(
+        repo, os.path.expanduser("~/git_branch_manager/repo_ids.json")))
+    log = EventLog(repo)
+    if args.action == "export":
+        result = SyncResult()
+        log.export(directory, result)
+    elif args.action == "import":
+        result = log.import_events(directory)
+    else:
+        result = log.sync(directory, args.remote)
+    print(result.describe())
+    for path in result.conflicts:
+        print(f"Conflict: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,540 @@
+import gzip
+import hashlib
+import json
+import lzma
+import os
+import threading
+
+from text_index import FullTextIndex, event_search_text, query_words
+
+# Events of each repository are stored below events_path/repos/<repo id>
+PARTITIONS_DIR = "repos"
+
+# Closed months are rolled up into <dir>/archive/<YYYY-MM>.events.<gz|xz>,
+# with a JSON sidecar index named <YYYY-MM>.events.idx
+ARCHIVE_DIR = "archive"
+ARCHIVE_INDEX_SUFFIX = ".events.idx"
+
+# Commit metadata of merged refs is stored once per partition in
+# <dir>/commits.jsonl, keyed by sha, and events refer to it by sha
+COMMITS_FILE = "commits.jsonl"
+COMMIT_FIELDS = ('commit_message', 'commit_author', 'commit_date')
+
+# Event fields kept in the sidecar index with their defaults, enough to
+# list, search and analyze events
+SUMMARY_FIELDS = {
+    'title': "", 'date': "", 'description': "", 'created_branch': "", 'created_tag': "",
+    'base_branch': "", 'repo_id': "", 'repo_name': "", 'merged_branches': []
+}
+
+
+class GitEvent:
+    def __init__(self):
+        self.title = ""
+        self.date = ""
+        self.description = ""
+        self.created_branch = ""
+        self.merged_branches = []
+        self.merged_branches_info = []
+        self.created_tag = ""
+        self.notes = ""
+        self.base_branch = ""
+        self.repo_id = ""
+        self.repo_name = ""
+
+
+_repo_id_lock = threading.Lock()
+
+
+def repo_identity(repo, cache_path=None):
+    """Return a stable id for a repository, shared by all its clones
+
+    The id is the repository's root commit. Repositories without commits
+    fall back to a hash of the remote URL, then of the path. Root commit
+    lookups walk the whole history, so results are cached by git directory.
+    """
+    key = os.path.normpath(repo.common_dir)
+    cache = {}
+    if cache_path:
+        with _repo_id_lock:
+            try:
+                with open(cache_path, 'r', encoding='utf-8') as f:
+                    cache = json.load(f)
+            except (OSError, ValueError):
+                cache = {}
+        if key in cache:
+            return cache[key]
+
+    repo_id = ""
+    try:
+        roots = repo.git.rev_list('--max-parents=0', 'HEAD').split()
+        if roots:
+            repo_id = sorted(roots)[0][:16]
+    except Exception:
+        pass
+    if not repo_id:
+        try:
+            source = repo.remote().url
+        except ValueError:
+            source = key
+        repo_id = "h" + hashlib.sha1(source.encode('utf-8')).hexdigest()[:15]
+
+    if cache_path:
+        with _repo_id_lock:
+            cache[key] = repo_id
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(cache_path, 'w', encoding='utf-8') as f:
+                json.dump(cache, f, indent=2)
+    return repo_id
+
+
+def partition_path(events_path, repo_id):
+    """Return the directory holding the events of one repository"""
+    return os.path.join(events_path, PARTITIONS_DIR, repo_id)
+
+
+def read_event_file(file_path):
+    """Read one event JSON file into a GitEvent"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        event_data = json.load(f)
+
+    event = GitEvent()
+    for key, value in event_data.items():
+        setattr(event, key, value)
+    return event
+
+
+def decompress_record(data, compression):
+    """Decompress one archived record"""
+    if compression == "xz":
+        return lzma.decompress(data)
+    return gzip.decompress(data)
+
+
+def read_archive_index(index_path):
+    """Read the sidecar index of a monthly archive"""
+    with open(index_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def read_archive_record(archive_path, offset, length, compression="gz"):
+    """Read one event from an archive without unpacking the rest of the month
+
+    Every record is compressed as its own gzip member or xz stream, so it
+    can be decompressed from its offset alone.
+    """
+    with open(archive_path, 'rb') as f:
+        f.seek(offset)
+        data = f.read(length)
+    event = GitEvent()
+    for key, value in json.loads(decompress_record(data, compression)).items():
+        setattr(event, key, value)
+    return event
+
+
+class ArchivedEvent:
+    """An event stored in a monthly archive
+
+    Listing and searching only need the summary fields from the sidecar
+    index. Any other field reads the full record from the archive on
+    first access.
+    """
+
+    def __init__(self, archive_path, compression, record):
+        self.archive_path = archive_path
+        self.compression = compression
+        self.offset = record['offset']
+        self.length = record['length']
+        for field, default in SUMMARY_FIELDS.items():
+            # Archives written before a field was summarized load it lazily
+            if field in record:
+                setattr(self, field, record[field] or default)
+        self._full = None
+
+    def load(self):
+        """Return the complete GitEvent"""
+        if self._full is None:
+            self._full = read_archive_record(self.archive_path, self.offset,
+                                             self.length, self.compression)
+        return self._full
+
+    def __getattr__(self, name):
+        # Only called for fields missing from the summary
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.load(), name)
+
+
+def read_archived_events(events):
+    """Return (archived event, full GitEvent) pairs, reading each archive file once"""
+    by_archive = {}
+    for event in events:
+        by_archive.setdefault((event.archive_path, event.compression), []).append(event)
+    for (archive_path, compression), archived in by_archive.items():
+        with open(archive_path, 'rb') as f:
+            data = f.read()
+        for event in archived:
+            full = GitEvent()
+            record = decompress_record(data[event.offset:event.offset + event.length], compression)
+            for key, value in json.loads(record).items():
+                setattr(full, key, value)
+            yield event, full
+
+
+def load_archive_events(index_path, date=None, branch=None):
+    """Return the ArchivedEvents of an archive, optionally only one date or base branch"""
+    index = read_archive_index(index_path)
+    archive_path = os.path.join(os.path.dirname(index_path), index['archive'])
+    records = index['records']
+    if date is not None:
+        positions = index['by_date'].get(date, [])
+    elif branch is not None:
+        positions = index['by_branch'].get(branch, [])
+    else:
+        positions = range(len(records))
+    return [ArchivedEvent(archive_path, index['compression'], records[i]) for i in positions]
+
+
+class CommitTable:
+    """Commit metadata of one partition, stored once per commit sha
+
+    Events used to embed message, author and date of every merged ref, so
+    the commits of a release branch were repeated across many events. Now
+    merge info refers to the commit by sha, and the table is an append-only
+    file of JSON lines, read on the first lookup and reread when another
+    process appended to it. Merge info of older events still embeds the
+    metadata and is returned as is.
+    """
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, COMMITS_FILE)
+        self._lock = threading.Lock()
+        self._commits = None
+        self._mtime = None
+
+    def _load(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if self._commits is not None and mtime == self._mtime:
+            return self._commits
+        commits = {}
+        if mtime is not None:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # Line cut short by an interrupted write
+                    commits[record.pop('sha')] = record
+        self._commits = commits
+        self._mtime = mtime
+        return commits
+
+    def get(self, sha):
+        """Return the metadata of a commit, None if it is not in the table"""
+        with self._lock:
+            return self._load().get(sha)
+
+    def records(self):
+        """Return every commit in the table, sha -> metadata"""
+        with self._lock:
+            return dict(self._load())
+
+    def update(self, records):
+        """Add commits of another table, e.g. one synced from a remote, return how many were new"""
+        with self._lock:
+            commits = self._load()
+            lines = []
+            for sha, metadata in records.items():
+                if sha not in commits:
+                    commits[sha] = metadata
+                    lines.append(json.dumps(dict(metadata, sha=sha), ensure_ascii=False) + "\n")
+            self._append(lines)
+        return len(lines)
+
+    def store(self, merged_info):
+        """Add the commits of full merge info to the table, return the merge info referring to them"""
+        references = []
+        with self._lock:
+            commits = self._load()
+            lines = []
+            for info in merged_info or []:
+                sha = info.get('commit')
+                if not sha:
+                    # Merge info recorded without the full sha keeps its metadata
+                    references.append(dict(info))
+                    continue
+                metadata = {field: info.get(field, "") for field in COMMIT_FIELDS}
+                if sha not in commits:
+                    commits[sha] = metadata
+                    lines.append(json.dumps(dict(metadata, sha=sha), ensure_ascii=False) + "\n")
+                references.append({key: value for key, value in info.items() if key not in COMMIT_FIELDS})
+            self._append(lines)
+        return references
+
+    def _append(self, lines):
+        if not lines:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # One write per batch in append mode, concurrent writers do not interleave lines
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write("".join(lines))
+        # The cached commits include these lines, our own write does not invalidate them
+        self._mtime = os.stat(self.path).st_mtime_ns
+
+    def resolve(self, merged_info):
+        """Return merge info with the commit metadata filled in from the table"""
+        resolved = []
+        for info in merged_info or []:
+            if all(field in info for field in COMMIT_FIELDS) or not info.get('commit'):
+                resolved.append(info)
+                continue
+            metadata = self.get(info['commit']) or {field: "(unknown)" for field in COMMIT_FIELDS}
+            resolved.append(dict(info, **metadata))
+        return resolved
+
+
+class EventIndex:
+    """Events organized by date and by base branch, updatable file by file
+
+    The by_date and by_branch dicts are updated in place, so references
+    held by the UI stay valid across reloads.
+    """
+
+    def __init__(self):
+        self.root = None     # Directory the index covers
+        self.by_date = {}    # Date -> events
+        self.by_branch = {}  # Base branch -> events
+        self.files = {}      # File path -> (mtime, event)
+        self.archives = {}   # Archive index path -> (mtime, events)
+        self.version = 0     # Incremented on every change, for derived caches
+        self.text_index = None  # Full-text index, built on the first text search
+        self._sorted_groups = {}  # View type -> (version, groups sorted for display)
+
+    def clear(self):
+        self.version += 1
+        self.text_index = None
+        self.root = None
+        self.by_date.clear()
+        self.by_branch.clear()
+        self.files.clear()
+        self.archives.clear()
+
+    def covers(self, path):
+        """Check whether a path lies below the indexed directory"""
+        if self.root is None:
+            return False
+        path = os.path.normpath(path)
+        return path == self.root or path.startswith(self.root + os.sep)
+
+    def load_all(self, events_path):
+        """Load every event file and monthly archive below the events path"""
+        self.clear()
+        self.root = os.path.normpath(events_path)
+        for root, dirs, files in os.walk(events_path):
+            for file in files:
+                if file.endswith(('.json', ARCHIVE_INDEX_SUFFIX)):
+                    file_path = os.path.join(root, file)
+                    try:
+                        self.load_file(file_path)
+                    except (OSError, ValueError) as e:
+                        print(f"Error loading event file {file_path}: {str(e)}")
+
+    def load_file(self, file_path):
+        """Add or reload a single event file
+
+        Returns False if the file no longer exists or lies outside the index.
+        """
+        if not self.covers(file_path):
+            return False
+        if file_path.endswith(ARCHIVE_INDEX_SUFFIX):
+            return self.load_archive(file_path)
+        try:
+            mtime = os.stat(file_path).st_mtime_ns
+        except FileNotFoundError:
+            self.remove_file(file_path)
+            return False
+
+        known = self.files.get(file_path)
+        if known and known[0] == mtime:
+            return True
+        if known:
+            self._unlink(known[1])
+
+        event = read_event_file(file_path)
+        self.files[file_path] = (mtime, event)
+        self._link(event)
+        return True
+
+    def load_archive(self, index_path):
+        """Add or reload the events of a monthly archive from its sidecar index"""
+        try:
+            mtime = os.stat(index_path).st_mtime_ns
+        except FileNotFoundError:
+            self.remove_file(index_path)
+            return False
+
+        known = self.archives.get(index_path)
+        if known and known[0] == mtime:
+            return True
+        if known:
+            for event in known[1]:
+                self._unlink(event)
+
+        events = load_archive_events(index_path)
+        self.archives[index_path] = (mtime, events)
+        for event in events:
+            self._link(event)
+        if self.text_index is not None:
+            self._index_archived(events)
+        return True
+
+    def remove_file(self, file_path):
+        """Drop the event of a deleted file, or the events of a deleted archive"""
+        known = self.files.pop(file_path, None)
+        if known:
+            self._unlink(known[1])
+        archived = self.archives.pop(file_path, None)
+        if archived:
+            for event in archived[1]:
+                self._unlink(event)
+
+    def sync_directory(self, directory):
+        """Bring the events of one directory up to date with the filesystem"""
+        if not self.covers(directory):
+            return
+        prefix = os.path.join(directory, '')
+        for file_path in [p for p in list(self.files) + list(self.archives) if p.startswith(prefix)]:
+            if not os.path.exists(file_path):
+                self.remove_file(file_path)
+        for root, dirs, files in os.walk(directory):
+            for file in files:
+                if file.endswith(('.json', ARCHIVE_INDEX_SUFFIX)):
+                    self.load_file(os.path.join(root, file))
+
+    def events(self):
+        """Iterate over every indexed event, loose files and archived"""
+        for mtime, event in self.files.values():
+            yield event
+        for mtime, events in self.archives.values():
+            yield from events
+
+    def full_text(self):
+        """Return the full-text index over every event field, building it on first use
+
+        Once built it is kept up to date as event files and archives are
+        loaded and removed.
+        """
+        if self.text_index is None:
+            self.install_full_text(self.full_text_builder()())
+        return self.text_index
+
+    def full_text_builder(self):
+        """Return a function building the full-text index of the current events
+
+        The function may run in a worker thread. Its result is installed
+        with install_full_text on the thread that owns the index.
+        """
+        loose = [event for mtime, event in self.files.values()]
+        archived = [event for mtime, events in self.archives.values() for event in events]
+
+        def build():
+            text_index = FullTextIndex()
+            text_index.add_many((event, event_search_text(event)) for event in loose)
+            # Archived events are indexed from their full records, which are
+            # then dropped again so the archive stays out of memory
+            text_index.add_many((event, event_search_text(full))
+                                for event, full in read_archived_events(archived))
+            return text_index
+        return build
+
+    def install_full_text(self, text_index):
+        """Install a built full-text index, catching up with changes made meanwhile"""
+        current = {id(event): event for event in self.events()}
+        for doc in text_index.documents():
+            if id(doc) not in current:
+                text_index.remove(doc)
+        missing = [event for event in current.values() if event not in text_index]
+        text_index.add_many((event, event_search_text(event))
+                            for event in missing if not isinstance(event, ArchivedEvent))
+        text_index.add_many((event, event_search_text(full))
+                            for event, full in read_archived_events(
+                                [event for event in missing if isinstance(event, ArchivedEvent)]))
+        self.text_index = text_index
+
+    def _index_archived(self, events):
+        self.text_index.add_many((event, event_search_text(full))
+                                 for event, full in read_archived_events(events))
+
+    def _scan(self, search_text):
+        """Match events without the full-text index, archived ones by their summary only"""
+        words = query_words(search_text)
+        if not words:
+            return None
+        matches = []
+        for event in self.events():
+            if isinstance(event, ArchivedEvent):
+                text = " ".join(str(value) for key, value in vars(event).items()
+                                if key in SUMMARY_FIELDS and value)
+            else:
+                text = event_search_text(event)
+            text = text.lower()
+            if all(word in text for word in words):
+                matches.append(event)
+        return matches
+
+    def search(self, view_type, search_text):
+        """Return (group key, matching events) pairs for the history view
+
+        An event matches when every word of the search text is part of one
+        of its fields, including merged commit ids, messages and authors.
+        Until the full-text index is built, events are scanned instead.
+        Groups are ordered newest first and events within a group by date,
+        newest first. Every group is returned, even without matches.
+        """
+        matches = None
+        if search_text.strip():
+            if self.text_index is not None:
+                matches = self.text_index.search(search_text)
+            else:
+                matches = self._scan(search_text)
+        if matches is not None:
+            matches = set(map(id, matches))
+
+        # Sorting is repeated only after the index changed, not per keystroke
+        cached = self._sorted_groups.get(view_type)
+        if cached is None or cached[0] != self.version:
+            data = self.by_date if view_type == "date" else self.by_branch
+            groups = [(key, sorted(data[key], key=lambda x: x.date, reverse=True))
+                      for key in sorted(data.keys(), reverse=True)]
+            cached = self._sorted_groups[view_type] = (self.version, groups)
+
+        if matches is None:
+            return [(key, list(events)) for key, events in cached[1]]
+        return [(key, [event for event in events if id(event) in matches])
+                for key, events in cached[1]]
+
+    def _link(self, event):
+        self.version += 1
+        if self.text_index is not None and not isinstance(event, ArchivedEvent):
+            self.text_index.add(event, event_search_text(event))
+        # Organize by date
+        date = event.date.split()[0] if event.date else ""
+        self.by_date.setdefault(date, []).append(event)
+
+        # Organize by branch
+        self.by_branch.setdefault(event.base_branch or "", []).append(event)
+
+    def _unlink(self, event):
+        self.version += 1
+        if self.text_index is not None:
+            self.text_index.remove(event)
+        for index, key in ((self.by_date, event.date.split()[0] if event.date else ""),
+                           (self.by_branch, event.base_branch or "")):
+            events = index.get(key)
+            if events and event in events:
+                events.remove(event)
+                if not events:
+                    del index[key]
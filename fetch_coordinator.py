@@ -0,0 +1,173 @@
+import threading
+import time
+
+from git_supervisor import supervisor
+
+
+class FetchResult:
+    """Outcome of a coordinated fetch"""
+
+    # Possible sources of a fetch result
+    CACHE = "cache"          # Last fetch is still within the TTL, nothing was contacted
+    UNCHANGED = "unchanged"  # Remote advertised the same refs, download skipped
+    NETWORK = "network"      # Objects and refs were fetched from the remote
+
+    def __init__(self, remote_name, source, age=0.0, changed_refs=0, shared=False):
+        self.remote_name = remote_name
+        self.source = source
+        self.age = age
+        self.changed_refs = changed_refs
+        self.shared = shared
+
+    @property
+    def from_network(self):
+        return self.source == self.NETWORK
+
+    def describe(self):
+        """Describe where the refresh came from, for the operation log"""
+        if self.source == self.CACHE:
+            message = f"Remote '{self.remote_name}' served from cache (fetched {self.age:.0f}s ago)"
+        elif self.source == self.UNCHANGED:
+            message = f"Remote '{self.remote_name}' unchanged upstream, fetch skipped"
+        else:
+            message = f"Remote '{self.remote_name}' fetched from network ({self.changed_refs} refs changed)"
+        if self.shared:
+            message += " [shared with concurrent refresh]"
+        return message
+
+
+class _PendingFetch:
+    """Fetch currently in flight, awaited by concurrent callers"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class FetchCoordinator:
+    """Deduplicate and rate limit fetches per repository remote
+
+    Every remote keeps the time of its last fetch and the ref hashes it
+    advertised. Within the TTL a fetch request is answered from cache, and
+    after it a cheap ls-remote decides whether a real fetch is needed.
+    Concurrent requests for the same remote share a single fetch. A fetch
+    with tags also serves requests without them, but not the reverse.
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._state = {}     # (repo dir, remote name, tags) -> {'fetched_at', 'advertised'}
+        self._inflight = {}  # (repo dir, remote name, tags) -> _PendingFetch
+
+    def fetch(self, repo, remote_name=None, force=False, progress=None, tags=True, background=False):
+        """Fetch branches and tags of a remote unless the cached state is still fresh
+
+        progress, a RemoteProgress, receives git's progress output of a network fetch.
+        Without tags only the remote's branches are fetched, into refs/remotes/<remote>.
+        A background fetch neither writes FETCH_HEAD nor runs auto gc, so it
+        cannot clobber a foreground fetch's FETCH_HEAD or take gc's lock.
+        force skips both the cache and the advertised refs check.
+        """
+        remote = repo.remote(remote_name) if remote_name else repo.remote()
+        key = (repo.working_dir, remote.name, tags)
+        # A fetch with tags also brought the branches a fetch without them asks for
+        serving = [key] if tags else [key, (repo.working_dir, remote.name, True)]
+
+        with self._lock:
+            state = self._state.get(key)
+            if not force:
+                for candidate in serving:
+                    fresh = self._state.get(candidate)
+                    age = time.time() - fresh['fetched_at'] if fresh else None
+                    if age is not None and age < self.ttl:
+                        return FetchResult(remote.name, FetchResult.CACHE, age=age)
+
+            pending = next((self._inflight[candidate] for candidate in serving
+                            if candidate in self._inflight), None)
+            leader = pending is None
+            if leader:
+                pending = _PendingFetch()
+                self._inflight[key] = pending
+
+        # Another caller is already fetching this remote, wait for its result
+        if not leader:
+            pending.done.wait()
+            if pending.error:
+                raise pending.error
+            result = pending.result
+            return FetchResult(result.remote_name, result.source, result.age,
+                               result.changed_refs, shared=True)
+
+        try:
+            pending.result = self._fetch_remote(repo, remote.name, state, progress, tags, background,
+                                                force)
+            return pending.result
+        except Exception as e:
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            pending.done.set()
+
+    def _fetch_remote(self, repo, remote_name, state, progress=None, tags=True, background=False,
+                      force=False):
+        """Compare advertised refs with the recorded ones and fetch only on change, or if forced"""
+        key = (repo.working_dir, remote_name, tags)
+        options = ['--tags' if tags else '--no-tags']
+        if background:
+            options += ['--no-write-fetch-head', '--no-auto-gc']
+        try:
+            advertised = self.advertised_refs(repo, remote_name, tags)
+        except Exception as e:
+            print(f"Error listing remote refs for {remote_name}: {str(e)}")
+            advertised = None
+
+        if not force and advertised is not None and state and state['advertised'] == advertised:
+            source = FetchResult.UNCHANGED
+            changed = 0
+        else:
+            if progress is not None:
+                progress.remote_name = remote_name
+                with supervisor.reporting(progress):
+                    repo.git.fetch('--progress', *options, remote_name)
+            else:
+                repo.git.fetch(*options, remote_name)
+            source = FetchResult.NETWORK
+            previous = state['advertised'] if state and state['advertised'] else {}
+            current = advertised or {}
+            # Refs added, removed or moved, a moved ref counts once
+            changed = sum(1 for ref in set(current) | set(previous) if current.get(ref) != previous.get(ref))
+
+        with self._lock:
+            self._state[key] = {'fetched_at': time.time(), 'advertised': advertised}
+        return FetchResult(remote_name, source, changed_refs=changed)
+
+    def advertised_refs(self, repo, remote_name, tags=True):
+        """Return the branch and, with tags, tag hashes the remote currently advertises"""
+        output = repo.git.ls_remote('--heads', *(['--tags'] if tags else []), remote_name)
+        refs = {}
+        for line in output.splitlines():
+            if '\t' in line:
+                sha, ref = line.split('\t', 1)
+                refs[ref] = sha
+        return refs
+
+    def invalidate(self, repo=None, remote_name=None):
+        """Forget cached fetch state so the next request goes to the remote"""
+        with self._lock:
+            for key in list(self._state):
+                if repo is not None and key[0] != repo.working_dir:
+                    continue
+                if remote_name is not None and key[1] != remote_name:
+                    continue
+                del self._state[key]
+
+    def last_fetch(self, repo, remote_name):
+        """Return the time of the last fetch of a remote, with or without tags, or None"""
+        with self._lock:
+            times = [state['fetched_at'] for key, state in self._state.items()
+                     if key[:2] == (repo.working_dir, remote_name)]
+        return max(times) if times else None
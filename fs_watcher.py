@@ -0,0 +1,310 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from event_store import ARCHIVE_INDEX_SUFFIX
+
+# inotify event masks (see inotify(7))
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF)
+EVENT_HEADER = struct.Struct('iIII')
+
+
+class Invalidation:
+    """Changes collected by the watcher during one debounce period"""
+
+    def __init__(self):
+        self.refs = set()          # Full names of changed loose refs
+        self.packed_refs = False   # packed-refs was rewritten, all refs may have changed
+        self.head = False          # HEAD moved to another branch or commit
+        self.event_files = set()   # Event JSON files and archive indexes added, changed or removed
+        self.event_dirs = set()    # Event directories to resynchronize
+        self.full = False          # Watch state was lost, everything must be reloaded
+
+    def is_empty(self):
+        return not (self.refs or self.packed_refs or self.head or
+                    self.event_files or self.event_dirs or self.full)
+
+    @property
+    def refs_changed(self):
+        return bool(self.refs or self.packed_refs or self.head or self.full)
+
+    @property
+    def events_changed(self):
+        return bool(self.event_files or self.event_dirs or self.full)
+
+    def describe(self):
+        parts = []
+        if self.full:
+            parts.append("full reload")
+        if self.head:
+            parts.append("HEAD")
+        if self.packed_refs:
+            parts.append("packed-refs")
+        if self.refs:
+            parts.append(f"{len(self.refs)} refs")
+        if self.event_files or self.event_dirs:
+            parts.append(f"{len(self.event_files) + len(self.event_dirs)} event paths")
+        return ", ".join(parts)
+
+
+class _InotifyBackend:
+    """Recursive directory watches through the Linux inotify API"""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library('c')
+        if not sys.platform.startswith('linux') or not libc_name:
+            raise OSError("inotify is not available on this platform")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}  # Watch descriptor -> directory
+
+    def add_tree(self, directory):
+        """Watch a directory and all of its subdirectories"""
+        for root, dirs, files in os.walk(directory):
+            self.add_dir(root)
+
+    def add_dir(self, directory):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd >= 0:
+            self.watches[wd] = directory
+
+    def read(self, timeout):
+        """Wait for events and return a list of (path, is_dir, overflow)"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        changes = []
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                changes.append((None, False, True))
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            directory = self.watches.get(wd)
+            if directory is None:
+                continue
+            path = os.path.join(directory, os.fsdecode(name)) if name else directory
+            is_dir = bool(mask & IN_ISDIR)
+            if is_dir and mask & (IN_CREATE | IN_MOVED_TO):
+                self.add_tree(path)
+            changes.append((path, is_dir, False))
+        return changes
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _PollingBackend:
+    """Directory mtime polling for platforms without inotify
+
+    Only directories are stat'ed on each pass. Files are listed again only
+    when their directory's mtime changed, which is what git's lockfile
+    renames and new event files do.
+    """
+
+    def __init__(self, interval=2.0):
+        self.interval = interval
+        self.dirs = {}  # Directory -> (mtime, {file name: mtime})
+        self._last_scan = time.monotonic()
+
+    def add_tree(self, directory):
+        for root, dirs, files in os.walk(directory):
+            self.add_dir(root)
+
+    def add_dir(self, directory):
+        try:
+            self.dirs[directory] = (os.stat(directory).st_mtime_ns, self._list(directory))
+        except OSError:
+            pass
+
+    def _list(self, directory):
+        entries = {}
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.is_file(follow_symlinks=False):
+                    entries[entry.name] = entry.stat(follow_symlinks=False).st_mtime_ns
+        return entries
+
+    def _mtime(self, path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def read(self, timeout):
+        time.sleep(timeout)
+        if time.monotonic() - self._last_scan < self.interval:
+            return []
+        self._last_scan = time.monotonic()
+
+        changes = []
+        for directory, (mtime, entries) in list(self.dirs.items()):
+            current = self._mtime(directory)
+            if current is None:
+                del self.dirs[directory]
+                changes.append((directory, True, False))
+                continue
+            if current == mtime:
+                continue
+            try:
+                new_entries = self._list(directory)
+            except OSError:
+                continue
+            self.dirs[directory] = (current, new_entries)
+            for name in set(entries) | set(new_entries):
+                if entries.get(name) != new_entries.get(name):
+                    changes.append((os.path.join(directory, name), False, False))
+            # Pick up new subdirectories
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False) and entry.path not in self.dirs:
+                        self.add_tree(entry.path)
+                        changes.append((entry.path, True, False))
+        return changes
+
+    def close(self):
+        self.dirs.clear()
+
+
+class RepoWatcher:
+    """Watch a repository's refs and the events directory for changes
+
+    Changes are collected for a short debounce period and then passed to
+    the callback as one Invalidation, on the watcher thread.
+    """
+
+    def __init__(self, git_dir, common_dir, events_path, callback, debounce=0.5,
+                 use_inotify=True, poll_interval=2.0):
+        self.git_dir = os.path.normpath(git_dir)
+        self.common_dir = os.path.normpath(common_dir)
+        self.refs_dir = os.path.join(self.common_dir, 'refs')
+        self.events_path = os.path.normpath(events_path)
+        self.callback = callback
+        self.debounce = debounce
+        self.use_inotify = use_inotify
+        self.poll_interval = poll_interval
+        self.backend = None
+        self._pending = Invalidation()
+        self._last_change = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def backend_name(self):
+        return "inotify" if isinstance(self.backend, _InotifyBackend) else "polling"
+
+    def start(self):
+        """Set up the watches and start the watcher thread"""
+        self.backend = None
+        if self.use_inotify:
+            try:
+                self.backend = _InotifyBackend()
+            except (OSError, AttributeError) as e:
+                print(f"inotify unavailable, falling back to polling: {str(e)}")
+        if self.backend is None:
+            self.backend = _PollingBackend(self.poll_interval)
+
+        # HEAD and packed-refs are replaced through lockfile renames, so the
+        # directories containing them are watched rather than the files
+        self.backend.add_dir(self.git_dir)
+        if self.common_dir != self.git_dir:
+            self.backend.add_dir(self.common_dir)
+        if os.path.isdir(self.refs_dir):
+            self.backend.add_tree(self.refs_dir)
+        if os.path.isdir(self.events_path):
+            self.backend.add_tree(self.events_path)
+
+        self._thread = threading.Thread(target=self._run, name="RepoWatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the watcher thread and release the watches"""
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        if self.backend:
+            self.backend.close()
+            self.backend = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                changes = self.backend.read(0.1)
+            except (OSError, ValueError) as e:
+                if self._stop.is_set():
+                    break
+                print(f"Error reading watch events: {str(e)}")
+                changes = [(None, False, True)]
+            for path, is_dir, overflow in changes:
+                self._classify(path, is_dir, overflow)
+                self._last_change = time.monotonic()
+
+            # Flush once no change arrived for the debounce period
+            if not self._pending.is_empty() and time.monotonic() - self._last_change >= self.debounce:
+                invalidation, self._pending = self._pending, Invalidation()
+                try:
+                    self.callback(invalidation)
+                except Exception as e:
+                    print(f"Error handling invalidation: {str(e)}")
+
+    def _classify(self, path, is_dir, overflow):
+        """Turn a changed path into a targeted invalidation"""
+        pending = self._pending
+        if overflow or path is None:
+            pending.full = True
+            return
+
+        name = os.path.basename(path)
+        if name.endswith('.lock'):
+            return
+
+        if path == os.path.join(self.git_dir, 'HEAD'):
+            pending.head = True
+        elif path == os.path.join(self.common_dir, 'packed-refs'):
+            pending.packed_refs = True
+        elif path.startswith(self.refs_dir + os.sep):
+            if is_dir:
+                # A whole ref directory appeared or disappeared
+                pending.packed_refs = True
+            else:
+                relative = os.path.relpath(path, self.common_dir)
+                pending.refs.add(relative.replace(os.sep, '/'))
+        elif path == self.events_path or path.startswith(self.events_path + os.sep):
+            if is_dir:
+                pending.event_dirs.add(path)
+            elif name.endswith(('.json', ARCHIVE_INDEX_SUFFIX)):
+                pending.event_files.add(path)
@@ -0,0 +1,366 @@
+"""Supervised git subprocesses with per-operation timeouts and cancellation
+
+Every git command started through TracedGit runs in its own process group
+and is waited for by polling, so an operation can be cancelled from the
+Cancel button or time out. Cancelling terminates the whole process group
+(git and its ssh, remote helper and pack-objects children), and kills it
+if it does not exit within the grace period.
+"""
+import os
+import re
+import signal
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+
+from git.compat import safe_decode
+from git.exc import GitCommandError
+from git.util import remove_password_if_present
+
+# Seconds before an operation is cancelled, by operation or git subcommand name
+DEFAULT_TIMEOUTS = {
+    'fetch': 300,
+    'ls-remote': 60,
+    'push': 300,
+    'merge': 600,
+    'checkout': 120
+}
+
+# GitPython's persistent cat-file processes outlive single operations
+PERSISTENT_OPTIONS = ('--batch', '--batch-check')
+
+
+class OperationCancelled(Exception):
+    """A supervised git operation was cancelled and its processes terminated"""
+
+
+class OperationTimedOut(OperationCancelled):
+    """A supervised git operation ran past its timeout"""
+
+
+def parse_timeouts(text):
+    """Parse 'fetch=120,push=60' into a timeout dict, ignoring malformed entries"""
+    timeouts = {}
+    for item in (text or "").split(','):
+        name, _, value = item.partition('=')
+        try:
+            timeouts[name.strip()] = float(value)
+        except ValueError:
+            continue
+    return timeouts
+
+
+def subcommand(command):
+    """Return the git subcommand of a command list, skipping -c options"""
+    words = [str(c) for c in command[1:]]
+    while len(words) > 1 and words[0] == '-c':
+        words = words[2:]
+    return words[0] if words else ""
+
+
+def terminate_group(proc, sig=signal.SIGTERM):
+    """Send a signal to the process group of a git process started in its own session"""
+    if proc.poll() is not None:
+        return
+    try:
+        if os.name == 'posix':
+            os.killpg(proc.pid, sig)
+        elif sig == signal.SIGTERM:
+            proc.terminate()
+        else:
+            proc.kill()
+    except (ProcessLookupError, PermissionError):
+        pass  # Exited meanwhile
+
+
+def held_lock_files(pid):
+    """Return the paths of the *.lock files a process has open, empty where /proc is not available"""
+    fd_dir = f"/proc/{pid}/fd"
+    try:
+        fds = os.listdir(fd_dir)
+    except OSError:
+        return set()
+    paths = set()
+    for fd in fds:
+        try:
+            path = os.readlink(os.path.join(fd_dir, fd))
+        except OSError:
+            continue  # Closed meanwhile
+        if path.endswith('.lock'):
+            paths.add(path)
+    return paths
+
+
+class _ProgressReader:
+    """Reads a process's output in threads, passing stderr lines to a RemoteProgress as they arrive
+
+    git separates progress updates with carriage returns, so lines end at
+    either a carriage return or a newline.
+    """
+
+    def __init__(self, proc, progress):
+        self.proc = proc
+        self.stdout = []
+        self.stderr = []
+        self._threads = [
+            threading.Thread(target=self._read, args=(proc.stdout, self.stdout, None), daemon=True),
+            threading.Thread(target=self._read, args=(proc.stderr, self.stderr,
+                                                      progress.new_message_handler()), daemon=True)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _read(self, stream, chunks, handler):
+        if stream is None:
+            return
+        pending = b""
+        while True:
+            data = stream.read1(65536)
+            if not data:
+                break
+            chunks.append(data)
+            if handler is not None:
+                *lines, pending = re.split(rb'[\r\n]', pending + data)
+                for line in lines:
+                    self._handle(handler, line)
+        if handler is not None:
+            self._handle(handler, pending)
+
+    def _handle(self, handler, line):
+        if not line:
+            return
+        try:
+            handler(line.decode('utf-8', 'replace'))
+        except Exception as e:
+            print(f"Error handling progress line: {str(e)}")
+
+    def communicate(self, timeout=None):
+        self.proc.wait(timeout)
+        for thread in self._threads:
+            thread.join()
+        return b"".join(self.stdout), b"".join(self.stderr)
+
+
+class SupervisedOperation:
+    """One cancellable unit of work and the git processes it is running"""
+
+    def __init__(self, name, timeout=None):
+        self.name = name
+        self.timeout = timeout
+        self.started_at = time.monotonic()
+        self.reason = None         # "cancelled" or "timed out"
+        self.cancelled_at = None
+        self.held_locks = set()    # Lock files open in its processes when they were terminated
+        self._lock = threading.Lock()
+        self._processes = set()
+
+    @property
+    def cancelled(self):
+        return self.reason is not None
+
+    def expired(self):
+        return self.timeout is not None and time.monotonic() - self.started_at > self.timeout
+
+    def cancel(self, reason="cancelled"):
+        """Stop the operation and terminate the process groups of its git commands"""
+        with self._lock:
+            if self.reason is None:
+                self.reason = reason
+                self.cancelled_at = time.monotonic()
+            processes = list(self._processes)
+        for proc in processes:
+            self.terminate(proc)
+
+    def terminate(self, proc, sig=signal.SIGTERM):
+        """Terminate a process group, recording the lock files git held at that moment"""
+        if proc.poll() is None:
+            locks = held_lock_files(proc.pid)
+            with self._lock:
+                self.held_locks.update(locks)
+        terminate_group(proc, sig)
+
+    def add(self, proc):
+        with self._lock:
+            self._processes.add(proc)
+            cancelled = self.reason is not None
+        if cancelled:
+            self.terminate(proc)
+
+    def discard(self, proc):
+        with self._lock:
+            self._processes.discard(proc)
+
+    def error(self, detail=""):
+        exception = OperationTimedOut if self.reason == "timed out" else OperationCancelled
+        message = f"Operation '{self.name}' {self.reason}"
+        if self.reason == "timed out":
+            message += f" after {self.timeout:g}s"
+        return exception(f"{message}: {detail}" if detail else message)
+
+
+class GitSupervisor:
+    """Runs git commands under the calling thread's current operation
+
+    Commands outside an explicit operation get an implicit one named after
+    their subcommand, so fetch, push and merge always have a timeout.
+    wait_hook is called on the main thread while it waits for git, e.g. to
+    keep processing Tk events so the Cancel button can be clicked.
+    """
+
+    def __init__(self, timeouts=None, grace=3.0, poll_interval=0.05):
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        self.timeouts.update(timeouts or {})
+        self.grace = grace
+        self.poll_interval = poll_interval
+        self.wait_hook = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._active = set()
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def current(self):
+        """Return the calling thread's innermost operation, or None"""
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def operation(self, name, timeout=None):
+        """Run the enclosed git commands as one operation, cancelled together"""
+        operation = SupervisedOperation(name, timeout if timeout is not None else self.timeouts.get(name))
+        stack = self._stack()
+        stack.append(operation)
+        with self._lock:
+            self._active.add(operation)
+        try:
+            yield operation
+        finally:
+            stack.pop()
+            with self._lock:
+                self._active.discard(operation)
+
+    @contextmanager
+    def reporting(self, progress):
+        """Stream the progress lines of the enclosed git commands to a RemoteProgress"""
+        if progress is None:
+            yield
+            return
+        previous = getattr(self._local, 'progress', None)
+        self._local.progress = progress
+        try:
+            yield
+        finally:
+            self._local.progress = previous
+
+    def active_operations(self):
+        with self._lock:
+            return list(self._active)
+
+    def cancel_all(self, reason="cancelled"):
+        """Cancel every running operation of every thread, return how many there were"""
+        operations = self.active_operations()
+        for operation in operations:
+            operation.cancel(reason)
+        return len(operations)
+
+    def execute(self, execute, command, args, kwargs):
+        """Run a git command through Git.execute, supervised unless it streams or persists"""
+        if (args or kwargs.get('output_stream') is not None or not isinstance(command, (list, tuple))):
+            return execute(command, *args, **kwargs)
+        if kwargs.get('as_process'):
+            # The caller reads the process itself, only make it cancellable
+            process = execute(command, **kwargs)
+            operation = self.current()
+            if operation is not None and not any(option in command for option in PERSISTENT_OPTIONS):
+                operation.add(process.proc)
+            return process
+
+        if self.current() is None:
+            name = subcommand(command)
+            with self.operation(name, self.timeouts.get(name)):
+                return self._run(execute, command, kwargs)
+        return self._run(execute, command, kwargs)
+
+    def _run(self, execute, command, kwargs):
+        kwargs = dict(kwargs)
+        with_extended_output = kwargs.pop('with_extended_output', False)
+        with_exceptions = kwargs.pop('with_exceptions', True)
+        strip_newline = kwargs.pop('strip_newline_in_stdout', True)
+        stdout_as_string = kwargs.pop('stdout_as_string', True)
+        kwargs.pop('kill_after_timeout', None)
+        if os.name == 'posix':
+            # Own process group, so git's children are terminated with it
+            kwargs['start_new_session'] = True
+
+        operations = list(self._stack())
+        operation = operations[-1]
+        for outer in operations:
+            if outer.cancelled:
+                # Do not start further commands of a cancelled operation
+                operation.cancel(outer.reason)
+                raise operation.error(" ".join(remove_password_if_present(command)))
+        progress = getattr(self._local, 'progress', None)
+        process = execute(command, as_process=True, **kwargs)
+        proc = process.proc
+        operation.add(proc)
+        if progress is not None and not kwargs.get('universal_newlines'):
+            communicate = _ProgressReader(proc, progress).communicate
+        else:
+            communicate = proc.communicate
+        try:
+            stdout, stderr = self._wait(proc, operations, communicate)
+        finally:
+            operation.discard(proc)
+            for stream in (proc.stdout, proc.stderr):
+                if stream is not None:
+                    stream.close()
+
+        if operation.cancelled:
+            raise operation.error(" ".join(remove_password_if_present(command)))
+        status = proc.returncode
+        stdout = stdout if stdout is not None else b""
+        stderr = stderr if stderr is not None else b""
+        newline = "\n" if isinstance(stdout, str) else b"\n"
+        if strip_newline and stdout.endswith(newline):
+            stdout = stdout[:-1]
+        if stderr.endswith("\n" if isinstance(stderr, str) else b"\n"):
+            stderr = stderr[:-1]
+        if with_exceptions and status != 0:
+            raise GitCommandError(remove_password_if_present(command), status, stderr, stdout)
+        if isinstance(stdout, bytes) and stdout_as_string:
+            stdout = safe_decode(stdout)
+        if with_extended_output:
+            return status, stdout, safe_decode(stderr)
+        return stdout
+
+    def _wait(self, proc, operations, communicate):
+        """Collect a process's output, cancelling it on timeout and killing it after the grace period"""
+        operation = operations[-1]
+        on_main_thread = threading.current_thread() is threading.main_thread()
+        while True:
+            try:
+                return communicate(timeout=self.poll_interval)
+            except subprocess.TimeoutExpired:
+                pass
+            for outer in operations:
+                if outer.cancelled:
+                    operation.cancel(outer.reason)
+                elif outer.expired():
+                    outer.cancel("timed out")
+                    operation.cancel("timed out")
+            if operation.cancelled and time.monotonic() - operation.cancelled_at > self.grace:
+                operation.terminate(proc, signal.SIGKILL if os.name == 'posix' else signal.SIGTERM)
+            if on_main_thread and self.wait_hook is not None:
+                try:
+                    self.wait_hook()
+                except Exception as e:
+                    print(f"Error in wait hook: {str(e)}")
+
+
+# Process wide supervisor used by TracedGit
+supervisor = GitSupervisor(parse_timeouts(os.environ.get('GIT_EVENT_TIMEOUTS')))
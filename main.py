@@ -3,24 +3,54 @@ from tkinter import ttk, messagebox, filedialog
 import git
 import os
 from datetime import datetime
-import re
 import queue
 import json
+import functools
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
-class GitEvent:
-    def __init__(self):
-        self.title = ""
-        self.date = ""
-        self.description = ""
-        self.created_branch = ""
-        self.merged_branches = []
-        self.merged_branches_info = []
-        self.created_tag = ""
-        self.notes = ""
-        self.base_branch = ""
+import pipeline
+from event_store import GitEvent, EventIndex, CommitTable, partition_path
+from event_archive import compact, legacy_checked, legacy_event_count, mark_legacy_checked, migrate_legacy
+from event_log import EventLog
+from event_analytics import (EventColumns, build_report, export_csv, export_json,
+                             WEEKLY_COLUMNS, RELEASE_COLUMNS, MERGED_COLUMNS)
+from memory_diagnostics import MemoryProfiler, MemoryReport, widget_counts, variable_counts, repo_counts, format_bytes
+from sampling_profiler import SamplingProfiler
+from merge_analysis import MergeAnalyzer
+from sort_keys import SORT_MODES
+from daemon import DaemonClient, DaemonError
+from checkpoint import OperationCheckpoint, checkpoint_path, PENDING, DONE, FAILED, SKIPPED
+from fetch_coordinator import FetchCoordinator
+from git_supervisor import supervisor, OperationCancelled
+from fs_watcher import RepoWatcher
+from tracing import tracer, TracedGit
+from transfer_progress import TransferProgress
+from naming import build_base_name, next_available_name
+from observable import Store
+from ref_snapshot import RefSnapshot
+from scheduler import TaskGraph, SKIPPED as TASK_SKIPPED
+from workspace import Workspace, PipelineSpec
+
+# Lines kept in the operation log and status widgets, older lines are dropped
+MAX_TEXT_LINES = 5000
 
 class GitEventManager:
     def __init__(self):
+        # Memory profiling from startup, GIT_EVENT_TRACEMALLOC=<frames> (off by default)
+        self.memory_profiler = MemoryProfiler()
+        tracemalloc_frames = int(os.environ.get('GIT_EVENT_TRACEMALLOC', '0') or 0)
+        if tracemalloc_frames > 0:
+            self.memory_profiler.start(tracemalloc_frames)
+        
+        # Stack sampling of all threads, GIT_EVENT_PROFILE=<collapsed stack file> starts it (off by default)
+        profile_path = os.environ.get('GIT_EVENT_PROFILE') or None
+        self.sampling_profiler = SamplingProfiler(
+            interval=int(os.environ.get('GIT_EVENT_PROFILE_INTERVAL', '10')) / 1000, output_path=profile_path)
+        if profile_path:
+            self.sampling_profiler.start()
+        
         print("Initializing GUI...")
         self.root = tk.Tk()
         print("GUI initialized successfully")
@@ -41,8 +71,13 @@ class GitEventManager:
         
         # Initialize event storage related variables
         self.current_event_file = None
-        self.events_by_date = {}  # Events organized by date
-        self.events_by_branch = {}  # Events organized by branch
+        self.event_index = EventIndex()  # Events of the active repository's partition
+        self.events_by_date = self.event_index.by_date  # Events organized by date
+        self.events_by_branch = self.event_index.by_branch  # Events organized by branch
+        self.cross_repo_index = None  # Events of all repositories, loaded on demand
+        # Event index -> (version, EventColumns), dropped with the index
+        self.analytics_columns = weakref.WeakKeyDictionary()
+        self.commit_tables = {}  # Partition path -> CommitTable of merged commits
         
         # Initialize operation count
         self.operation_count = 0
@@ -59,11 +94,20 @@ class GitEventManager:
         self.tag_date_suffix = tk.StringVar(value=datetime.now().strftime('%Y.%m.%d'))
         self.final_tag_name = tk.StringVar()
         
+        self.base_search_var = tk.StringVar()
+        self.merge_search_var = tk.StringVar()
+        
         self.event_title = tk.StringVar()
         self.event_description = tk.StringVar()
         self.event_notes = tk.StringVar()
         
         self.merge_vars = {'branch': {}, 'tag': {}}
+        # Read-only unless GIT_EVENT_WRITE_COMMIT_GRAPH=1 lets it write a missing commit-graph
+        self.merge_analyzer = MergeAnalyzer(
+            write_commit_graph=os.environ.get('GIT_EVENT_WRITE_COMMIT_GRAPH', '0') == '1')
+        self.merge_analysis_for = None  # Snapshot the last analysis was started for
+        self.hide_merged = tk.BooleanVar(value=False)
+        self.ref_sort_mode = tk.StringVar(value="version")  # One of sort_keys.SORT_MODES
         self.events = []
         
         # Add cache variables
@@ -71,6 +115,51 @@ class GitEventManager:
         self.cached_tags = []      # Cache all tags
         self.cached_remote_branches = []  # Cache remote branches
         
+        # Fetch coordinator, skips refetching within the TTL (seconds)
+        self.fetch_ttl = tk.IntVar(value=int(os.environ.get('GIT_EVENT_FETCH_TTL', '60')))
+        self.fetch_coordinator = FetchCoordinator(ttl=self.fetch_ttl.get())
+        self.fetch_ttl.trace_add("write", self.update_fetch_ttl)
+        
+        # Open repositories, each with its own ref snapshot and event scope
+        self.workspace = Workspace(self.fetch_coordinator,
+                                   repo_id_cache=os.path.expanduser("~/git_branch_manager/repo_ids.json"),
+                                   worktree_pool_size=int(os.environ.get('GIT_EVENT_WORKTREE_POOL', '2')),
+                                   remote_fetch_workers=int(os.environ.get('GIT_EVENT_REMOTE_FETCH_WORKERS', '4')))
+        # Remotes of the active repository, checked ones are refreshed
+        self.remote_vars = {}
+        # Run workspace pipelines in app-managed worktrees instead of the user's checkout
+        self.use_worktrees = tk.BooleanVar(value=os.environ.get('GIT_EVENT_WORKTREES', '0') == '1')
+        self.checkpoint_dir = os.path.expanduser("~/git_branch_manager/checkpoints")
+        
+        # Daemon keeping ref snapshots and the git config warm between runs, used
+        # when it is running (GIT_EVENT_DAEMON=start starts one, 0 ignores it)
+        daemon_mode = os.environ.get('GIT_EVENT_DAEMON', '1')
+        self.daemon = DaemonClient.connect(start=daemon_mode == 'start') if daemon_mode != '0' else None
+        self.repo_context = None
+        self.ref_snapshot = None
+        self.current_base_branch = None
+        self.last_merged_info = None
+        # Names the last run created; the name previews move on once they exist
+        self.created_branch = ""
+        self.created_tag = ""
+        
+        # Fetch or push whose progress is shown, see cancellable
+        self.transfer_progress = None
+        self.operation_active = False  # A main-thread operation is pumping Tk events, see cancel_enabled
+        
+        # Worker threads for operations that must not block the UI
+        self.background_executor = ThreadPoolExecutor(max_workers=2)
+        # Worker threads for the independent tasks of execute_operations, and the last run's graph
+        self.step_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('GIT_EVENT_STEP_WORKERS', '4')),
+                                                thread_name_prefix="step")
+        self.last_schedule = None
+        
+        # Filesystem watcher invalidating ref and event caches, results are
+        # handed from the watcher thread to the Tk thread through a queue
+        self.watch_enabled = tk.BooleanVar(value=os.environ.get('GIT_EVENT_WATCH', '1') != '0')
+        self.repo_watcher = None
+        self.invalidation_queue = queue.Queue()
+        
         # Add operation control variables
         self.enable_branch_creation = tk.BooleanVar(value=False)
         self.enable_merge = tk.BooleanVar(value=False)
@@ -81,8 +170,13 @@ class GitEventManager:
         self.merge_controls = []
         self.tag_controls = []
         
+        # Name previews and list filters are derived from the variables
+        # above and recomputed once per Tk frame, see setup_view_state
+        self.store = Store(self.root.after_idle)
+        
         print("Starting UI setup...")
         self.setup_ui()
+        self.setup_view_state()
         print("UI setup completed")
         
         # Check and set Git user information
@@ -90,6 +184,9 @@ class GitEventManager:
         
         # Load all event files
         self.load_all_events()
+        
+        # Start applying watcher invalidations
+        self.root.after(200, self.process_invalidations)
 
     def select_repo_path(self):
         """Select repository path"""
@@ -103,6 +200,7 @@ class GitEventManager:
             self.log_operation(f"Selected repository path: {path}")
             self.update_status("Repository path selected", success=True)
 
+    @tracer.traced()
     def init_repo(self):
         """Initialize or update Git repository"""
         try:
@@ -111,18 +209,30 @@ class GitEventManager:
                 self.update_status("Please select a repository path", success=False)
                 return
             
-            self.repo = git.Repo(self.repo_path.get())
+            context = self.workspace.open(self.repo_path.get())
+            self.activate_repo_context(context)
+            self.start_repo_watcher()
             print("Git repository initialized successfully")
             
-            # Initialize all information to cache
-            self.refresh_repo_cache()
+            if context.snapshot is None:
+                data = self.daemon_call('refs', path=context.path)
+                if data is not None:
+                    # Warm refs kept current by the daemon's watcher, Refresh fetches
+                    context.snapshot = RefSnapshot.from_dict(data)
+                    self.log_operation(f"Loaded refs of {context.name} from the daemon")
+                    self.apply_ref_snapshot(context.snapshot)
+                else:
+                    # Initialize all information to cache
+                    self.refresh_repo_cache()
+            else:
+                # Repository already open in the workspace, reuse its snapshot
+                self.log_operation(f"Reusing cached refs of {context.name}")
+                self.apply_ref_snapshot(context.snapshot)
             
-            # Update all related displays
-            self.update_current_branch_labels()
-            self.refresh_merge_items()
-            self.update_base_items()
             self.log_operation("Repository initialized successfully")
             self.update_status("Repository loaded successfully")
+            if not legacy_checked(self.events_path.get()):
+                self.migrate_legacy_events()
         except Exception as e:
             error_msg = str(e)
             print(f"Error initializing repository: {error_msg}")
@@ -130,43 +240,309 @@ class GitEventManager:
             self.update_status("Failed to initialize repository", success=False)
             messagebox.showerror("Error", f"Failed to initialize repository: {error_msg}")
 
+    def activate_repo_context(self, context):
+        """Make a workspace repository the active one, swapping event scopes"""
+        switched = self.repo_context is not context
+        if self.repo_context is not None and switched:
+            for key in self.repo_context.event_scope:
+                self.repo_context.event_scope[key] = getattr(self, key)
+            # Close the previous repository's handle to stop its helper processes
+            self.workspace.handles.release(self.repo_context.path, current_thread_only=True)
+        
+        self.repo_context = context
+        self.repo = context.repo
+        for key, value in context.event_scope.items():
+            setattr(self, key, value)
+        self.repo_path.set(context.path)
+        self.update_remotes_menu()
+        
+        # Load only this repository's event partition
+        partition = self.event_partition_path()
+        os.makedirs(partition, exist_ok=True)
+        if not context.event_index.covers(partition):
+            context.event_index.load_all(partition)
+            self.build_text_index(context.event_index)
+        self.event_index = context.event_index
+        self.events_by_date = self.event_index.by_date
+        self.events_by_branch = self.event_index.by_branch
+
+        # Offer to resume operations left unfinished in this repository
+        checkpoint = self.update_resume_state()
+        if checkpoint and switched:
+            self.log_operation(f"Unfinished operations found in {context.name}, use Resume to continue",
+                               checkpoint.describe())
+
+    def commit_table(self, repo_id):
+        """Return the commit table of a repository's event partition"""
+        partition = partition_path(self.events_path.get(), repo_id)
+        table = self.commit_tables.get(partition)
+        if table is None:
+            table = self.commit_tables[partition] = CommitTable(partition)
+        return table
+
+    def event_partition_path(self):
+        """Return the event directory of the active repository"""
+        return partition_path(self.events_path.get(), self.repo_context.repo_id)
+
+    def apply_ref_snapshot(self, snapshot, update_ui=True):
+        """Load a ref snapshot into the caches and optionally refresh the displays"""
+        previous = self.ref_snapshot
+        self.ref_snapshot = snapshot
+        self.cached_branches = list(snapshot.branches)
+        self.cached_remote_branches = list(snapshot.remote_branches)
+        self.cached_tags = list(snapshot.tags)
+        
+        if update_ui:
+            # Lists and name previews follow on the next flush of the view state
+            self.view_state['refs'].set(snapshot)
+            self.update_current_branch_labels()
+            self.start_merge_analysis()
+        elif previous is None or previous.head_sha != snapshot.head_sha:
+            # HEAD moved without ref names changing, e.g. an external commit
+            self.start_merge_analysis()
+
+    def start_repo_watcher(self, *args):
+        """(Re)start the filesystem watcher for the active repository"""
+        if self.repo_watcher:
+            self.repo_watcher.stop()
+            self.repo_watcher = None
+        
+        if not self.watch_enabled.get() or self.repo_context is None:
+            return
+        
+        try:
+            self.repo_watcher = RepoWatcher(self.repo.git_dir, self.repo.common_dir,
+                                            self.event_partition_path(), self.invalidation_queue.put)
+            self.repo_watcher.start()
+            self.log_operation(f"Watching repository for changes ({self.repo_watcher.backend_name})")
+        except Exception as e:
+            self.repo_watcher = None
+            self.log_operation(f"Error starting repository watcher: {str(e)}")
+
+    def process_invalidations(self):
+        """Apply invalidations queued by the watcher, on the Tk thread, once no operation is running"""
+        try:
+            while not self.operation_active:
+                invalidation = self.invalidation_queue.get_nowait()
+                with tracer.span("watcher invalidation", "app", change=invalidation.describe()):
+                    self.apply_invalidation(invalidation)
+        except queue.Empty:
+            pass
+        except Exception as e:
+            print(f"Error applying invalidation: {str(e)}")
+        self.root.after(200, self.process_invalidations)
+
+    @tracer.traced()
+    def apply_invalidation(self, invalidation):
+        """Refresh only the cached refs and events that changed on disk"""
+        # Update event indexes
+        if invalidation.full:
+            self.load_all_events()
+        else:
+            for index in (self.event_index, self.cross_repo_index):
+                if index is None:
+                    continue
+                for directory in invalidation.event_dirs:
+                    index.sync_directory(directory)
+                for file_path in invalidation.event_files:
+                    index.load_file(file_path)
+        
+        # Update ref snapshot
+        context = self.repo_context
+        if not invalidation.refs_changed or context is None or context.snapshot is None:
+            return
+        old = context.snapshot
+        if invalidation.full or invalidation.packed_refs:
+            new = RefSnapshot.capture(self.repo)
+        else:
+            new = old.updated(self.repo, invalidation.refs, invalidation.head)
+        context.snapshot = new
+        
+        # Only rebuild the lists if ref names changed, not just their commits
+        names_changed = ((old.current_branch, old.branches, old.remote_branches, old.tags) !=
+                         (new.current_branch, new.branches, new.remote_branches, new.tags))
+        self.apply_ref_snapshot(new, update_ui=names_changed)
+        if not names_changed:
+            self.update_current_branch_labels()
+
+    def refresh_local_refs(self, update_ui=False):
+        """Re-read local refs after an operation, without fetching"""
+        self.workspace.refresh(self.repo_context, fetch=False)
+        self.apply_ref_snapshot(self.repo_context.snapshot, update_ui=update_ui)
+
+    @tracer.traced()
     def refresh_repo_cache(self):
         """Refresh repository cache information"""
         try:
-            # Get remote repository information
-            remote = self.repo.remote()
-            remote.fetch()
-            self.repo.git.fetch('--tags')
+            # Other remotes are fetched meanwhile in the background, each applied when it arrives
+            self.start_remote_fetches()
             
-            # Update branch cache
-            current = self.repo.active_branch.name
-            self.cached_branches = [branch.name for branch in self.repo.heads if branch.name != current]
-            
-            # Update remote branch cache
-            self.cached_remote_branches = []
-            for ref in remote.refs:
-                if ref.name == f"{remote.name}/HEAD":
-                    continue
-                branch_name = ref.name.split('/', 1)[1]
-                if branch_name not in self.cached_branches and branch_name != current:
-                    self.cached_remote_branches.append(branch_name)
+            # Fetch the default remote and read all refs into a new snapshot
+            progress = TransferProgress("fetch")
+            with self.cancellable("fetch", progress):
+                result = self.workspace.refresh(self.repo_context, progress=progress)
+            if result:
+                self.log_operation(result.describe())
             
-            # Update tag cache
-            self.cached_tags = [tag.name for tag in self.repo.tags]
-            
-            # Update UI display
-            self.update_current_branch_labels()
-            self.refresh_merge_items()
-            self.update_base_items()
+            # Update caches and UI display
+            self.apply_ref_snapshot(self.repo_context.snapshot)
             
             self.log_operation("Repository cache refreshed")
             self.update_status("Repository cache refreshed successfully")
             
+        except OperationCancelled as e:
+            self.log_operation(f"Repository refresh stopped: {str(e)}")
+            self.update_status("Repository refresh cancelled", success=False)
         except Exception as e:
             error_msg = str(e)
             self.log_operation(f"Error refreshing repository cache: {error_msg}")
             self.update_status("Failed to refresh repository cache", success=False)
 
+    def start_remote_fetches(self, force=False):
+        """Fetch the active repository's other checked remotes in the background"""
+        context = self.repo_context
+        for remote_name, future in self.workspace.fetch_other_remotes(context, force).items():
+            self.watch_remote_fetch(context, remote_name, future)
+
+    def watch_remote_fetch(self, context, remote_name, future):
+        """Log a background remote fetch when it finishes and show the refs it brought"""
+        def check_done():
+            if not future.done() or self.operation_active:
+                self.root.after(200, check_done)
+                return
+            try:
+                result = future.result()
+            except Exception as e:
+                self.log_operation(f"Error fetching remote {remote_name} of {context.name}: {str(e)}")
+                return
+            self.log_operation(result.describe())
+            if result.from_network and context is self.repo_context:
+                self.refresh_local_refs(update_ui=True)
+        
+        self.root.after(200, check_done)
+
+    def update_remotes_menu(self):
+        """List the active repository's remotes in the Remotes menu, checked ones are refreshed"""
+        self.remotes_menu.delete(0, tk.END)
+        self.remote_vars = {}
+        context = self.repo_context
+        for remote in self.repo.remotes:
+            variable = tk.BooleanVar(value=remote.name not in context.skipped_remotes)
+            self.remote_vars[remote.name] = variable
+            self.remotes_menu.add_checkbutton(label=remote.name, variable=variable,
+                                              command=functools.partial(self.toggle_remote, remote.name))
+        if not self.repo.remotes:
+            self.remotes_menu.add_command(label="No remotes", state='disabled')
+
+    def toggle_remote(self, remote_name):
+        """Include a remote in refreshes or leave it out"""
+        if self.remote_vars[remote_name].get():
+            self.repo_context.skipped_remotes.discard(remote_name)
+        else:
+            self.repo_context.skipped_remotes.add(remote_name)
+            self.log_operation(f"Remote {remote_name} is no longer refreshed, its cached branches stay listed")
+
+    def fetch_remote(self, force=False):
+        """Fetch the remote through the coordinator and log where the result came from"""
+        progress = TransferProgress("fetch")
+        with self.cancellable("fetch", progress):
+            result = self.fetch_coordinator.fetch(self.repo, force=force, progress=progress)
+        self.log_operation(result.describe())
+        return result
+
+    @contextmanager
+    def cancellable(self, name, progress=None):
+        """Run an operation's git commands under the supervisor, with the Cancel button enabled
+
+        Tk events keep being processed while git runs, with the grab on the
+        Cancel button so no other action can start meanwhile. Yields the
+        SupervisedOperation. A transfer's
+        progress is shown while it runs and its throughput logged afterwards.
+        """
+        if progress is not None:
+            previous_progress = self.transfer_progress
+            self.transfer_progress = progress
+        try:
+            with self.cancel_enabled(), supervisor.operation(name) as operation:
+                yield operation
+        finally:
+            if progress is not None:
+                progress.finish()
+                self.transfer_progress = previous_progress
+                self.show_transfer_progress(previous_progress)
+                if progress.phases:
+                    self.log_operation("Transfer finished", progress.summary())
+
+    @contextmanager
+    def cancel_enabled(self):
+        """Enable the Cancel button and keep Tk events processed while git runs, unless already done
+
+        Watcher invalidations and background completions are deferred
+        meanwhile, so they never run nested inside the operation's steps.
+        The active repository's lock is held throughout, an operation is
+        refused while a workspace pipeline works in the same repository.
+        """
+        outermost = supervisor.wait_hook is None
+        context = self.repo_context if outermost else None
+        if context is not None and not context.lock.acquire(blocking=False):
+            raise RuntimeError(f"A workspace operation is running in {context.name}, "
+                               "try again when it has finished")
+        if outermost:
+            self.operation_active = True
+            self.cancel_button.configure(state='normal')
+            try:
+                self.cancel_button.grab_set()
+            except tk.TclError:
+                pass  # Not viewable, e.g. the window is minimized
+            supervisor.wait_hook = self.wait_for_git
+        try:
+            yield
+        finally:
+            if outermost:
+                supervisor.wait_hook = None
+                self.operation_active = False
+                self.cancel_button.grab_release()
+                self.cancel_button.configure(state='disabled')
+                if context is not None:
+                    context.lock.release()
+
+    def wait_for_git(self):
+        """Keep the UI responsive and the transfer display current while git runs"""
+        if self.transfer_progress is not None:
+            self.show_transfer_progress(self.transfer_progress)
+        self.root.update()
+
+    def show_transfer_progress(self, progress):
+        """Show the current phase of a transfer, or clear the display if progress is None"""
+        if progress is None:
+            self.transfer_label.config(text="")
+            self.transfer_bar.stop()
+            self.transfer_bar.configure(mode='determinate', value=0)
+            return
+        text, percent = progress.current()
+        self.transfer_label.config(text=text)
+        if percent is None:
+            # Unknown total, e.g. while connecting or counting
+            self.transfer_bar.configure(mode='indeterminate')
+            self.transfer_bar.step(2)
+        else:
+            self.transfer_bar.configure(mode='determinate', value=percent)
+
+    def cancel_operations(self):
+        """Terminate the running git operations"""
+        count = supervisor.cancel_all()
+        if count:
+            self.log_operation(f"Cancelling {count} running git operation(s)...")
+            self.update_status("Cancelling...", success=False)
+
+    def update_fetch_ttl(self, *args):
+        """Apply a changed fetch TTL to the coordinator"""
+        try:
+            self.fetch_coordinator.ttl = max(0, self.fetch_ttl.get())
+        except tk.TclError:
+            # Ignore partially typed values
+            pass
+
     def create_log_widgets(self):
         """Create log and status text widgets"""
         # Create log text widget
@@ -195,9 +571,7 @@ class GitEventManager:
     def refresh_branch_name(self):
         """Manually refresh branch name"""
         try:
-            remote = self.repo.remote()
             self.log_operation("Fetching remote branches...")
-            remote.fetch()
             self.update_branch_name(force_check=True)
             self.update_current_branch_labels()
             self.log_operation("Refreshed branch name")
@@ -207,57 +581,134 @@ class GitEventManager:
             self.log_operation(f"Error refreshing branch name: {error_msg}")
             self.update_status("Failed to refresh branch name", success=False)
 
-    def refresh_merge_items(self):
-        """Refresh merge project list (using cache)"""
+    def ordered_refs(self, kind):
+        """Return (list entry, full ref) pairs of the branches or tags in the chosen sort order"""
+        snapshot = self.view_state['refs'].get()
+        if snapshot is None:
+            return []
         try:
-            # Clear existing checkboxes
-            for widget in self.merge_inner_frame.winfo_children():
-                widget.destroy()
-            
-            # Get branches
-            current = self.repo.active_branch.name
-            
-            # Use cached branch information
-            all_branches = sorted(set(self.cached_branches + self.cached_remote_branches))
-            
-            # Recreate checkboxes
-            row = 0
-            if all_branches:
-                ttk.Label(self.merge_inner_frame, text="Branches:").grid(
-                    row=row, column=0, sticky='w', padx=5, pady=2)
-                row += 1
-                for branch in all_branches:
-                    self.merge_vars['branch'][branch] = tk.BooleanVar()
-                    display_name = f"{branch} (remote)" if branch in self.cached_remote_branches else branch
-                    ttk.Checkbutton(self.merge_inner_frame, text=display_name, 
-                                  variable=self.merge_vars['branch'][branch]).grid(
-                        row=row, column=0, sticky='w', padx=20, pady=2)
-                    row += 1
-            
-            if self.cached_tags:
-                ttk.Label(self.merge_inner_frame, text="Tags:").grid(
-                    row=row, column=0, sticky='w', padx=5, pady=2)
-                row += 1
-                for tag in sorted(self.cached_tags):
-                    self.merge_vars['tag'][tag] = tk.BooleanVar()
-                    ttk.Checkbutton(self.merge_inner_frame, text=tag, 
-                                  variable=self.merge_vars['tag'][tag]).grid(
-                        row=row, column=0, sticky='w', padx=20, pady=2)
+            refs = snapshot.ordered(kind, self.view_state['ref_sort_mode'].get(), self.repo)
+        except Exception as e:
+            # Committer dates could not be read, fall back to version order
+            self.log_operation(f"Error sorting {kind}: {str(e)}")
+            refs = snapshot.ordered(kind, "version")
+        return [(snapshot.display_name(ref), ref) for ref in refs]
+
+    def merge_ref_status(self, ref):
+        """Return (merged, (ahead, behind)) of a full ref name, (None, None) if not analyzed"""
+        analysis = self.view_state['merge_analysis'].get()
+        if (analysis is None or self.ref_snapshot is None or
+                analysis.head_sha != self.ref_snapshot.head_sha):
+            return None, None
+        return analysis.is_merged(ref), analysis.counts_for(ref)
+
+    def add_merge_row(self, frame, row, kind, key, text, ref):
+        """Add one merge candidate with its ahead/behind columns, unless it is hidden"""
+        merged, counts = self.merge_ref_status(ref)
+        if merged and self.view_state['hide_merged'].get():
+            return False
+        if key not in self.merge_vars[kind]:
+            self.merge_vars[kind][key] = tk.BooleanVar()
+        if merged:
+            # Merging a ref already contained in HEAD only adds an empty merge commit
+            self.merge_vars[kind][key].set(False)
+            text = f"{text} (merged)"
+        checkbox = ttk.Checkbutton(frame, text=text, variable=self.merge_vars[kind][key],
+                                   state='disabled' if merged else 'normal')
+        checkbox.grid(row=row, column=0, sticky='w', padx=(20, 5), pady=2)
+        if counts:
+            ahead, behind = counts
+            ttk.Label(frame, text=f"↑{ahead}").grid(row=row, column=1, sticky='e', padx=5)
+            ttk.Label(frame, text=f"↓{behind}" if behind is not None else "").grid(
+                row=row, column=2, sticky='e', padx=5)
+        if kind == 'branch':
+            self.branch_checkbuttons[key] = checkbox
+        else:
+            self.tag_checkbuttons[key] = checkbox
+        return True
+
+    def prune_merge_vars(self):
+        """Drop the selection variables of refs that no longer exist"""
+        current = {'branch': {name for name, ref in self.ordered_refs("branches")},
+                   'tag': {name for name, ref in self.ordered_refs("tags")}}
+        for kind, variables in self.merge_vars.items():
+            for key in [key for key in variables if key not in current[kind]]:
+                del variables[key]
+
+    def add_merge_header(self, frame):
+        ttk.Label(frame, text="Ahead").grid(row=0, column=1, sticky='e', padx=5)
+        ttk.Label(frame, text="Behind").grid(row=0, column=2, sticky='e', padx=5)
+        frame.columnconfigure(0, weight=1)
+
+    @tracer.traced("update_merge_items")
+    def render_merge_items(self):
+        """Update display of merge items"""
+        search_text = self.view_state['merge_search_var'].get().lower()
+        
+        # Clear internal frame
+        for widget in self.merge_inner_frame.winfo_children():
+            widget.destroy()
+        self.branch_checkbuttons.clear()
+        self.tag_checkbuttons.clear()
+        self.prune_merge_vars()
+        
+        # Create branch area
+        branch_frame = ttk.LabelFrame(self.merge_inner_frame, text="Branches")
+        branch_frame.pack(fill=tk.X, expand=True, padx=5, pady=5)
+        self.add_merge_header(branch_frame)
+        
+        # Display branches
+        row = 1
+        for branch, ref in self.ordered_refs("branches"):
+            if search_text in branch.lower():
+                if self.add_merge_row(branch_frame, row, 'branch', branch, branch, ref):
                     row += 1
+        
+        # Create tag area
+        if self.cached_tags:
+            tag_frame = ttk.LabelFrame(self.merge_inner_frame, text="Tags")
+            tag_frame.pack(fill=tk.X, expand=True, padx=5, pady=5)
+            self.add_merge_header(tag_frame)
             
-            # Update canvas scroll region
+            row = 1
+            for tag, ref in self.ordered_refs("tags"):
+                if search_text in tag.lower():
+                    if self.add_merge_row(tag_frame, row, 'tag', tag, tag, ref):
+                        row += 1
+        
+        # Update canvas scroll region
+        with tracer.span("update_idletasks", "tk"):
             self.merge_inner_frame.update_idletasks()
-            self.merge_canvas.configure(scrollregion=self.merge_canvas.bbox('all'))
-            
-        except Exception as e:
-            error_msg = str(e)
-            self.log_operation(f"Error refreshing merge items: {error_msg}")
-            self.update_status(f"Failed to refresh merge items: {error_msg}", success=False)
+        self.merge_canvas.configure(scrollregion=self.merge_canvas.bbox("all"))
+
+    def start_merge_analysis(self):
+        """Analyze merged state and ahead/behind counts of the snapshot's refs in the background"""
+        snapshot = self.ref_snapshot
+        if snapshot is None or self.repo_context is None or self.merge_analysis_for is snapshot:
+            return
+        self.merge_analysis_for = snapshot
+        path = self.repo_context.path
+        
+        def analyze():
+            # Worker threads use their own repository handle
+            return self.merge_analyzer.analyze(self.workspace.handles.get(path), snapshot)
+        
+        def on_done(future):
+            try:
+                analysis = future.result()
+            except Exception as e:
+                self.log_operation(f"Error analyzing merge candidates: {str(e)}")
+                return
+            if self.ref_snapshot is not snapshot:
+                return  # Superseded by a newer snapshot
+            self.view_state['merge_analysis'].set(analysis)
+        
+        self.run_in_background(analyze, on_done)
+
     def refresh_tag_name(self):
         """Refresh tag name"""
         try:
             self.log_operation("Fetching remote tags...")
-            self.repo.git.fetch('--tags')
             self.update_tag_name(force_check=True)
             self.update_current_branch_labels()
             self.log_operation("Refreshed tag name")
@@ -267,124 +718,67 @@ class GitEventManager:
             self.log_operation(f"Error refreshing tag name: {error_msg}")
             self.update_status("Failed to refresh tag name", success=False)
 
-    def update_branch_name(self, *args):
-        """Update final branch name"""
+    def setup_view_state(self):
+        """Derive name previews and list filters from the inputs, recomputed at most once per Tk frame"""
+        store = self.store
+        state = self.view_state = {name: store.variable(getattr(self, name), name) for name in (
+            'branch_prefix', 'branch_date_suffix', 'branch_custom_suffix',
+            'tag_prefix', 'tag_date_suffix', 'tag_custom_suffix',
+            'base_type', 'base_search_var', 'merge_search_var', 'ref_sort_mode', 'hide_merged')}
+        state['refs'] = store.value(self.ref_snapshot, "refs")
+        state['merge_analysis'] = store.value(None, "merge analysis")
+        state['branch_name'] = store.derived(self.derive_branch_name, "branch name")
+        state['tag_name'] = store.derived(self.derive_tag_name, "tag name")
+        
+        store.effect(lambda: self.final_branch_name.set(state['branch_name'].get()), "branch name preview")
+        store.effect(lambda: self.final_tag_name.set(state['tag_name'].get()), "tag name preview")
+        store.effect(self.update_base_items, "base item filter")
+        store.effect(self.render_merge_items, "merge item filter")
+
+    def derive_branch_name(self):
+        """Return the final branch name, with a number suffix if the name already exists"""
+        state = self.view_state
         try:
-            # If the domain is disabled and not the initial call, return
-            if not self.enable_branch_creation.get() and args:
-                return
-            
-            prefix = self.branch_prefix.get()
-            custom = self.branch_custom_suffix.get()
-            date = self.branch_date_suffix.get()
-            
-            # Build base branch name
-            if prefix == 'custom':
-                if not custom:
-                    self.final_branch_name.set('')
-                    return
-                base_name = custom
-            else:
-                base_name = f"{prefix}_{date}"
-                if custom:
-                    base_name = f"{base_name}_{custom}"
-            
-            # Get all branches (including remote branches)
-            all_branches = [branch.name for branch in self.repo.heads]
-            remote_branches = [ref.name.split('/')[-1] for ref in self.repo.remote().refs 
-                             if not ref.name.endswith('/HEAD')]
-            existing_branches = list(set(all_branches + remote_branches))
-            
-            # If the name already exists, add a number suffix
-            if base_name in existing_branches:
-                # Find all similar branch names
-                pattern = re.compile(f"^{re.escape(base_name)}(\\.\\d+)?$")
-                similar_branches = [b for b in existing_branches if pattern.match(b)]
-                
-                if similar_branches:
-                    # Find the largest number
-                    max_number = 0
-                    for branch in similar_branches:
-                        if branch == base_name:
-                            max_number = max(max_number, 0)
-                        else:
-                            try:
-                                suffix = branch.split('.')[-1]
-                                if suffix.isdigit():
-                                    max_number = max(max_number, int(suffix))
-                            except (IndexError, ValueError):
-                                continue
-                    
-                    # Use the next number
-                    final_name = f"{base_name}.{max_number + 1}"
-                else:
-                    final_name = f"{base_name}.1"
-            else:
-                final_name = base_name
-            
-            self.final_branch_name.set(final_name)
-            
+            base_name = build_base_name(state['branch_prefix'].get(), state['branch_date_suffix'].get(),
+                                        state['branch_custom_suffix'].get())
+            if not base_name:
+                return ''
+            # Existing names include remote branches
+            snapshot = state['refs'].get()
+            existing_branches = snapshot.all_branch_names() if snapshot else set()
+            return next_available_name(base_name, existing_branches)
         except Exception as e:
             print(f"Error updating branch name: {str(e)}")
-            self.final_branch_name.set('')
+            return ''
 
-    def update_tag_name(self, *args, force_check=False):
-        """Update final tag name"""
+    def derive_tag_name(self):
+        """Return the final tag name, with a number suffix if the tag already exists"""
+        state = self.view_state
         try:
-            prefix = self.tag_prefix.get()
-            custom = self.tag_custom_suffix.get()
-            date = self.tag_date_suffix.get()
-            
-            # Build base tag name
-            if prefix == 'custom':
-                if not custom:
-                    self.final_tag_name.set('')
-                return
-                base_name = custom
-            else:
-                base_name = f"{prefix}_{date}"
-                if custom:
-                    base_name = f"{base_name}_{custom}"
-            
-            # If it's a forced check, re-fetch remote information
-            if force_check:
-                self.repo.git.fetch('--tags')
-            
-            # Get all tags
-            existing_tags = [tag.name for tag in self.repo.tags]
-            
-            # If the name already exists, add a number suffix
-            if base_name in existing_tags:
-                # Find all similar tag names
-                pattern = re.compile(f"^{re.escape(base_name)}(\\.\\d+)?$")
-                similar_tags = [t for t in existing_tags if pattern.match(t)]
-                
-                if similar_tags:
-                    # Find the largest number
-                    max_number = 0
-                    for tag in similar_tags:
-                        if tag == base_name:
-                            max_number = max(max_number, 0)
-                        else:
-                            try:
-                                suffix = tag.split('.')[-1]
-                                if suffix.isdigit():
-                                    max_number = max(max_number, int(suffix))
-                            except (IndexError, ValueError):
-                                continue
-                    
-                    # Use the next number
-                    final_name = f"{base_name}.{max_number + 1}"
-                else:
-                    final_name = f"{base_name}.1"
-            else:
-                final_name = base_name
-            
-            self.final_tag_name.set(final_name)
-                
+            base_name = build_base_name(state['tag_prefix'].get(), state['tag_date_suffix'].get(),
+                                        state['tag_custom_suffix'].get())
+            if not base_name:
+                return ''
+            snapshot = state['refs'].get()
+            existing_tags = set(snapshot.tags) if snapshot else set()
+            return next_available_name(base_name, existing_tags)
         except Exception as e:
             print(f"Error updating tag name: {str(e)}")
-            self.final_tag_name.set('')
+            return ''
+
+    def update_branch_name(self, force_check=False):
+        """Update final branch name now, optionally re-fetching remote branches first"""
+        if force_check:
+            self.fetch_remote(force=True)
+            self.refresh_local_refs(update_ui=True)
+        self.store.flush()
+
+    def update_tag_name(self, force_check=False):
+        """Update final tag name now, optionally re-fetching remote tags first"""
+        if force_check:
+            self.fetch_remote(force=True)
+            self.refresh_local_refs(update_ui=True)
+        self.store.flush()
 
     def log_operation(self, message, details=""):
         """Record operation log"""
@@ -399,6 +793,7 @@ class GitEventManager:
             
             # Insert log message into log text widget
             self.log_text.insert(tk.END, log_message)
+            self.trim_text(self.log_text)
             
             # Scroll to the bottom
             self.log_text.see(tk.END)
@@ -409,6 +804,12 @@ class GitEventManager:
         except Exception as e:
             print(f"Error logging operation: {str(e)}")
 
+    def trim_text(self, widget, max_lines=MAX_TEXT_LINES):
+        """Drop the oldest lines of a text widget beyond max_lines"""
+        excess = int(widget.index('end-1c').split('.')[0]) - max_lines
+        if excess > 0:
+            widget.delete('1.0', f'{excess + 1}.0')
+
     def update_status(self, message, success=True):
         """Update status bar"""
         try:
@@ -423,6 +824,7 @@ class GitEventManager:
             
             # Insert status message into status text widget
             self.status_text.insert(tk.END, status_message)
+            self.trim_text(self.status_text)
             
             # Scroll to the bottom
             self.status_text.see(tk.END)
@@ -441,25 +843,48 @@ class GitEventManager:
         self.root.resizable(True, True)
         self.root.minsize(800, 600)
         
-        # 2. Create main layout (left and right panes)
+        # 2. Create menu bar
+        self.create_menu()
+        
+        # 3. Create main layout (left and right panes)
         main_paned = ttk.PanedWindow(self.root, orient=tk.HORIZONTAL)
         main_paned.pack(fill=tk.BOTH, expand=True)
         
-        # 3. First create right panel (contains log and status text widgets)
+        # 4. First create right panel (contains log and status text widgets)
         right_panel = self.create_right_panel(main_paned)
         
-        # 4. Create left panel
+        # 5. Create left panel
         left_panel = self.create_left_panel(main_paned)
         self.create_events_path_section(left_panel)
         
-        # 5. Add left and right panels to the main split window
+        # 6. Add left and right panels to the main split window
         main_paned.add(left_panel)
         main_paned.add(right_panel)
         
-        # 6. Set split position (left 70%, right 30%)
+        # 7. Set split position (left 70%, right 30%)
         self.root.update()
         main_paned.sashpos(0, int(self.root.winfo_width() * 0.7))
 
+    def create_menu(self):
+        """Create menu bar"""
+        menubar = tk.Menu(self.root)
+        
+        # Tools menu
+        self.tools_menu = tk.Menu(menubar, tearoff=0)
+        self.tools_menu.add_command(label="Event Analytics...", command=self.show_event_analytics)
+        self.tools_menu.add_command(label="Compact Event History...", command=self.compact_event_history)
+        self.tools_menu.add_command(label="Move Legacy Events...", command=self.migrate_legacy_events)
+        self.tools_menu.add_command(label="Sync Event History", command=self.sync_event_history)
+        self.tools_menu.add_command(label="Run Batch...", command=self.run_batch_file)
+        self.tools_menu.add_command(label="Diagnostics...", command=self.show_diagnostics)
+        self.profiling = tk.BooleanVar(value=self.sampling_profiler.running)
+        self.tools_menu.add_checkbutton(label="Sampling Profiler", variable=self.profiling,
+                                        command=self.toggle_sampling_profiler)
+        self.tools_menu.add_command(label="Save Profile...", command=self.save_profile)
+        menubar.add_cascade(label="Tools", menu=self.tools_menu)
+        
+        self.root.config(menu=menubar)
+
     def create_left_panel(self, parent):
         """Create left panel"""
         # 1. Create left container
@@ -518,6 +943,22 @@ class GitEventManager:
         refresh_btn = ttk.Button(inner_frame, text="↻", width=3, command=self.refresh_repo_cache)
         refresh_btn.pack(side=tk.RIGHT, padx=(0, 5))
         
+        # Remotes to refresh
+        remotes_btn = ttk.Menubutton(inner_frame, text="Remotes")
+        self.remotes_menu = tk.Menu(remotes_btn, tearoff=0)
+        remotes_btn.configure(menu=self.remotes_menu)
+        remotes_btn.pack(side=tk.RIGHT, padx=(0, 5))
+        
+        # Filesystem watcher toggle
+        ttk.Checkbutton(inner_frame, text="Watch", variable=self.watch_enabled,
+                        command=self.start_repo_watcher).pack(side=tk.RIGHT, padx=(0, 5))
+        
+        # Fetch cache TTL
+        ttl_spinbox = ttk.Spinbox(inner_frame, from_=0, to=3600, increment=30, width=5,
+                                  textvariable=self.fetch_ttl)
+        ttl_spinbox.pack(side=tk.RIGHT, padx=(0, 5))
+        ttk.Label(inner_frame, text="Fetch TTL (s):").pack(side=tk.RIGHT)
+        
         # Browse button
         select_path_btn = ttk.Button(inner_frame, text="Browse", command=self.select_repo_path)
         select_path_btn.pack(side=tk.RIGHT)
@@ -533,6 +974,9 @@ class GitEventManager:
         
         history_btn = ttk.Button(toolbar, text="View History", command=self.show_event_history)
         history_btn.pack(side=tk.RIGHT, padx=5)
+        
+        workspace_btn = ttk.Button(toolbar, text="Workspace", command=self.show_workspace)
+        workspace_btn.pack(side=tk.RIGHT, padx=5)
 
     def create_right_panel(self, parent):
         """Create right panel"""
@@ -639,20 +1083,17 @@ class GitEventManager:
         # All domains created, update state
         self.update_sections_state()
 
+    @tracer.traced()
     def update_base_items(self, *args):
         """Update base item list"""
         try:
-            search_text = self.base_search_var.get().lower()
+            search_text = self.view_state['base_search_var'].get().lower()
             self.base_items_listbox.delete(0, tk.END)
             
-            if self.base_type.get() == "branch":
-                local_branches = self.cached_branches
-                remote_branches = [f"{branch} (remote)" for branch in self.cached_remote_branches]
-                items = sorted(set(local_branches + remote_branches))
-            else:
-                items = sorted(self.cached_tags)
+            # Lists come pre-ordered from the ref snapshot
+            kind = "branches" if self.view_state['base_type'].get() == "branch" else "tags"
             
-            for item in items:
+            for item, ref in self.ordered_refs(kind):
                 if search_text in item.lower():
                     self.base_items_listbox.insert(tk.END, item)
                 
@@ -665,212 +1106,109 @@ class GitEventManager:
             self.log_operation(f"Error updating base items: {str(e)}")
             self.update_status("Failed to update base items", success=False)
 
-    def create_branch(self):
+    def selected_base_item(self):
+        """Return the base item for a new branch, the current branch if none is selected"""
+        selections = self.base_items_listbox.curselection()
+        if not selections:
+            # If no base item is selected, but there's a generated branch name, use the current branch as the base
+            current_branch = self.repo.active_branch.name
+            self.log_operation(f"No base item selected, using current branch: {current_branch}")
+            return current_branch
+        # Branches of the default remote by name, of other remotes as <remote>/<branch>
+        return pipeline.base_revision(self.repo, self.base_items_listbox.get(selections[0]))
+
+    @tracer.traced()
+    def create_branch(self, base_item, new_branch_name):
         """Create new branch"""
-        try:
-            # Get new branch name
-            new_branch_name = self.final_branch_name.get()
-            if not new_branch_name:
-                messagebox.showerror("Error", "Branch name cannot be empty")
-                return
-            
-            # Get base item (from Listbox, get selected item)
-            selections = self.base_items_listbox.curselection()
-            if not selections:
-                # If no base item is selected, but there's a generated branch name, use the current branch as the base
-                current_branch = self.repo.active_branch.name
-                base_item = current_branch
-                self.log_operation(f"No base item selected, using current branch: {current_branch}")
-            else:
-                base_item = self.base_items_listbox.get(selections[0])
-                # If it's a remote branch, remove "(remote)" suffix
-                if "(remote)" in base_item:
-                    base_item = base_item.split(" (remote)")[0]
-            
-            # Save base branch name for later use
-            self.current_base_branch = base_item
-            
-            # Record operation
-            self.log_operation(f"Creating new branch: {new_branch_name}", 
-                             f"Base {self.base_type.get()}: {base_item}")
-            
-            # Check out base item
-            if self.base_type.get() == "branch":
-                self.repo.git.checkout(base_item)
-            else:
-                self.repo.git.checkout(base_item)
-            
-            # Create new branch
-            self.repo.git.checkout('-b', new_branch_name)
-            
-            # Update status
-            self.update_status(f"Created new branch: {new_branch_name}")
-            
-            # Update base item list
-            self.update_base_items()
-            
-            # Update current branch display
-            self.update_current_branch_labels()
-            
-            # Show success message
-            messagebox.showinfo("Success", f"Branch '{new_branch_name}' created successfully")
-            
-            # Update Push area display after branch creation is successful
-            self.update_push_labels()
-            
-        except Exception as e:
-            error_msg = str(e)
-            self.log_operation(f"Error creating branch: {error_msg}")
-            self.update_status(f"Failed to create branch: {error_msg}", success=False)
-            messagebox.showerror("Error", f"Failed to create branch: {error_msg}")
+        # Save base branch name for later use
+        self.current_base_branch = base_item
+        
+        # A resumed run may find the branch already created
+        if self.repo.active_branch.name == new_branch_name:
+            self.log_operation(f"Branch {new_branch_name} already created")
+            return
+        
+        # Record operation
+        self.log_operation(f"Creating new branch: {new_branch_name}", 
+                         f"Base {self.base_type.get()}: {base_item}")
+        
+        # Check out base item and create new branch
+        pipeline.create_branch(self.repo, base_item, new_branch_name)
+        
+        # Update status
+        self.update_status(f"Created new branch: {new_branch_name}")
 
-    def merge_branches(self):
-        """Merge selected branches and tags"""
-        try:
-            # Get selected branches and tags
-            selected_branches = [branch for branch, var in self.merge_vars['branch'].items() 
-                               if var.get()]
-            selected_tags = [tag for tag, var in self.merge_vars['tag'].items() 
-                           if var.get()]
-            
-            if not selected_branches and not selected_tags:
-                messagebox.showwarning("Warning", "Please select at least one branch or tag")
-                return
-            
-            # Record operation
-            self.log_operation("Starting merge operation", 
-                             f"Selected branches: {selected_branches}\n"
-                             f"Selected tags: {selected_tags}")
-            
-            merged_info = []  # Store merge information
-            
-            # Merge branches
-            for branch in selected_branches:
-                try:
-                    self.log_operation(f"Merging branch: {branch}")
-                    
-                    # Get the latest commit information of the branch
-                    if '(remote)' in branch:
-                        branch_name = branch.split(' (remote)')[0]
-                        commit = self.repo.remote().refs[branch_name].commit
-                    else:
-                        commit = self.repo.heads[branch].commit
-                    
-                    # Record branch information
-                    branch_info = {
-                        'name': branch,
-                        'commit_id': commit.hexsha[:8],  # Only take the first 8 digits
-                        'commit_message': commit.message.strip(),
-                        'commit_author': commit.author.name,
-                        'commit_date': datetime.fromtimestamp(commit.committed_date).strftime('%Y-%m-%d %H:%M:%S')
-                    }
-                    
-                    # Execute merge
-                    self.repo.git.merge(branch, '--no-ff')
-                    merged_info.append(branch_info)
-                    
-                    self.update_status(f"Merged branch: {branch}")
-                    
-                except Exception as e:
-                    error_msg = str(e)
-                    self.log_operation(f"Error merging branch {branch}: {error_msg}")
-                    self.update_status(f"Failed to merge branch {branch}", success=False)
-                    if messagebox.askyesno("Error", 
-                                         f"Failed to merge branch {branch}. Continue with remaining items?"):
-                        self.repo.git.merge('--abort')
-                        continue
-                    else:
-                        self.repo.git.merge('--abort')
-                        return
-            
-            # Merge tags
-            for tag in selected_tags:
-                try:
-                    self.log_operation(f"Merging tag: {tag}")
-                    
-                    # Get commit information of the tag
-                    tag_obj = self.repo.tags[tag]
-                    commit = tag_obj.commit
-                    
-                    # Record tag information
-                    tag_info = {
-                        'name': f"tag:{tag}",
-                        'commit_id': commit.hexsha[:8],
-                        'commit_message': commit.message.strip(),
-                        'commit_author': commit.author.name,
-                        'commit_date': datetime.fromtimestamp(commit.committed_date).strftime('%Y-%m-%d %H:%M:%S')
-                    }
-                    
-                    # Execute merge
-                    self.repo.git.merge(tag, '--no-ff')
-                    merged_info.append(tag_info)
-                    
-                    self.update_status(f"Merged tag: {tag}")
-                    
-                except Exception as e:
-                    error_msg = str(e)
-                    self.log_operation(f"Error merging tag {tag}: {error_msg}")
-                    self.update_status(f"Failed to merge tag {tag}", success=False)
-                    if messagebox.askyesno("Error", 
-                                         f"Failed to merge tag {tag}. Continue with remaining items?"):
-                        self.repo.git.merge('--abort')
-                        continue
-                    else:
-                        self.repo.git.merge('--abort')
-                        return
-            
-            # Refresh merge project list
-            self.refresh_merge_items()
-            
-            # Return merge information
-            return merged_info
-            
-        except Exception as e:
-            error_msg = str(e)
-            self.log_operation(f"Error during merge operation: {error_msg}")
-            self.update_status("Merge operation failed", success=False)
-            messagebox.showerror("Error", f"Merge operation failed: {error_msg}")
-            return None
+    @tracer.traced()
+    def merge_item(self, name, is_tag=False, info=None):
+        """Merge one branch or tag and return its merge information, collected already if info is given"""
+        kind = "tag" if is_tag else "branch"
+        self.log_operation(f"Merging {kind}: {name}")
+        
+        # Execute merge and record its information, a failed merge is aborted
+        info = pipeline.merge_ref(self.repo, name, is_tag=is_tag, info=info)
+        
+        self.update_status(f"Merged {kind}: {name}")
+        return info
 
-    def create_tag(self):
+    @tracer.traced()
+    def create_tag(self, new_tag_name):
         """Create new tag"""
-        try:
-            # Get new tag name
-            new_tag_name = self.final_tag_name.get()
-            if not new_tag_name:
-                messagebox.showerror("Error", "Tag name cannot be empty")
-                return
-            
-            # Record operation
-            self.log_operation(f"Creating new tag: {new_tag_name}")
-            
-            # Create new tag
-            self.repo.create_tag(new_tag_name)
-            
-            # Push tag to remote
-            self.repo.remote().push(new_tag_name)
-            
-            # Update status
-            self.update_status(f"Created new tag: {new_tag_name}")
-            
-            # Refresh merge project list
-            self.refresh_merge_items()
-            
-            # Show success message
-            messagebox.showinfo("Success", f"Tag '{new_tag_name}' created successfully")
-            
-            # Update Push area display
-            self.update_push_labels()
-            
-        except Exception as e:
-            error_msg = str(e)
-            self.log_operation(f"Error creating tag: {error_msg}")
-            self.update_status(f"Failed to create tag: {error_msg}", success=False)
-            messagebox.showerror("Error", f"Failed to create tag: {error_msg}")
+        # A resumed run may find the tag already created on HEAD
+        if new_tag_name in self.repo.tags and self.repo.tags[new_tag_name].commit == self.repo.head.commit:
+            self.log_operation(f"Tag {new_tag_name} already created")
+            return
+        
+        # Record operation
+        self.log_operation(f"Creating new tag: {new_tag_name}")
+        pipeline.create_tag(self.repo, new_tag_name, push=False)
+        self.update_status(f"Created new tag: {new_tag_name}")
+
+    @tracer.traced()
+    def push_tag(self, tag_name, remote_object=None):
+        """Push a created tag to the remote, remote_object is where the pre-flight check found it there"""
+        pipeline.check_tag_push(self.repo, tag_name, remote_object)
+        self.log_operation(f"Pushing tag: {tag_name}")
+        progress = TransferProgress("push", self.repo.remote().name)
+        with self.cancellable("push", progress):
+            pipeline.push_tag(self.repo, tag_name, progress)
+        self.update_status(f"Pushed tag: {tag_name}")
+
+    def toggle_sampling_profiler(self):
+        """Start or stop sampling the stacks of all threads"""
+        profiler = self.sampling_profiler
+        if self.profiling.get():
+            profiler.start()
+            self.log_operation(f"Sampling profiler started ({profiler.interval * 1000:.0f} ms interval)")
+        else:
+            profiler.stop()
+            details = f"Written to {profiler.output_path}" if profiler.output_path else ""
+            self.log_operation(profiler.describe(), details)
+        self.update_status(profiler.describe())
+
+    def save_profile(self):
+        """Save the sampled stacks in collapsed format for flame graph tools"""
+        profiler = self.sampling_profiler
+        if not profiler.samples:
+            messagebox.showinfo("Sampling Profiler",
+                                "No samples yet, turn on Tools > Sampling Profiler and repeat the slow action")
+            return
+        path = filedialog.asksaveasfilename(title="Save Profile",
+                                            defaultextension=".folded",
+                                            initialfile=f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}.folded",
+                                            filetypes=[("Collapsed stacks", "*.folded *.txt")])
+        if path:
+            try:
+                profiler.write(path)
+                self.log_operation(f"Saved profile: {path}", profiler.describe())
+            except OSError as e:
+                self.log_operation(f"Error saving profile: {str(e)}")
+                messagebox.showerror("Error", f"Failed to save profile: {str(e)}")
 
     def run(self):
         """Run the application"""
         self.root.mainloop()
+        # Write the profile of the whole session, if one is being written
+        self.sampling_profiler.stop()
 
     def save_current_event(self):
         """Save current event"""
@@ -883,20 +1221,25 @@ class GitEventManager:
             event.title = self.event_title.get()
             event.date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             event.description = self.event_description.get()
-            event.created_branch = self.final_branch_name.get()
-            event.created_tag = self.final_tag_name.get()
+            event.created_branch = self.created_branch
+            event.created_tag = self.created_tag
             event.notes = self.event_notes.get()
             
             # Use the saved base branch name
-            event.base_branch = getattr(self, 'current_base_branch', self.repo.active_branch.name)
+            event.base_branch = self.current_base_branch or self.repo.active_branch.name
             
-            # Use merge information saved during operation execution
-            if hasattr(self, 'last_merged_info') and self.last_merged_info:
-                event.merged_branches_info = self.last_merged_info
+            # Record repository identity
+            event.repo_id = self.repo_context.repo_id
+            event.repo_name = self.repo_context.name
+            
+            # Use merge information saved during operation execution,
+            # its commit metadata goes to the partition's commit table
+            if self.last_merged_info:
+                event.merged_branches_info = self.commit_table(event.repo_id).store(self.last_merged_info)
                 event.merged_branches = [info['name'] for info in self.last_merged_info]
             
-            # Create date directory
-            date_dir = os.path.join(self.events_path.get(), 
+            # Create date directory in the repository's partition
+            date_dir = os.path.join(self.event_partition_path(), 
                                    datetime.now().strftime('%Y-%m-%d'))
             os.makedirs(date_dir, exist_ok=True)
             
@@ -913,7 +1256,9 @@ class GitEventManager:
                 json.dump(event.__dict__, f, ensure_ascii=False, indent=2)
             
             # Update event cache
-            self.load_all_events()
+            self.event_index.load_file(file_path)
+            if self.cross_repo_index:
+                self.cross_repo_index.load_file(file_path)
             
             # Show success message
             messagebox.showinfo("Success", "Event saved successfully")
@@ -931,41 +1276,154 @@ class GitEventManager:
             self.update_status("Failed to save event", success=False)
             messagebox.showerror("Error", f"Failed to save event: {error_msg}")
 
+    @tracer.traced()
     def load_all_events(self):
         """Load all event files"""
         try:
-            self.events_by_date = {}
-            self.events_by_branch = {}
-            
-            # Iterate over event directories
-            for root, dirs, files in os.walk(self.events_path.get()):
-                for file in files:
-                    if file.endswith('.json'):
-                        file_path = os.path.join(root, file)
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            event_data = json.load(f)
-                            
-                            # Create event object
-                            event = GitEvent()
-                            for key, value in event_data.items():
-                                setattr(event, key, value)
-                            
-                            # Organize by date
-                            date = event.date.split()[0]
-                            if date not in self.events_by_date:
-                                self.events_by_date[date] = []
-                            self.events_by_date[date].append(event)
-                            
-                            # Organize by branch
-                            branch = event.base_branch
-                            if branch not in self.events_by_branch:
-                                self.events_by_branch[branch] = []
-                            self.events_by_branch[branch].append(event)
+            # Iterate over the active repository's event directories,
+            # organizing events by date and by branch
+            if self.repo_context is None:
+                self.event_index.clear()
+            else:
+                self.event_index.load_all(self.event_partition_path())
+                self.build_text_index(self.event_index)
+            self.cross_repo_index = None
             
         except Exception as e:
             self.log_operation(f"Error loading events: {str(e)}")
             self.update_status("Failed to load events", success=False)
 
+    def reload_event_partitions(self):
+        """Drop the event indexes of all open repositories and reload the active one"""
+        for context in self.workspace.contexts.values():
+            context.event_index.clear()
+        if self.repo_context:
+            self.activate_repo_context(self.repo_context)
+        self.load_all_events()
+
+    def compact_event_history(self):
+        """Roll closed months of event history into compressed monthly archives"""
+        events_path = self.events_path.get()
+        if not messagebox.askyesno("Confirm",
+                                   "Archive the events of all months before the current one?\n\n"
+                                   "The event files of those months are replaced by one "
+                                   "compressed archive per month."):
+            return
+        self.log_operation(f"Compacting event history in {events_path}...")
+        
+        def on_done(future):
+            try:
+                result = future.result()
+            except Exception as e:
+                self.log_operation("Event history compaction failed", str(e))
+                messagebox.showerror("Error", f"Failed to compact event history: {str(e)}")
+                return
+            details = "\n".join(f"{path}: +{added} events ({total} total)"
+                                for path, added, total in result.archives)
+            if result.errors:
+                details += "\nErrors:\n" + "\n".join(result.errors)
+            self.log_operation(result.describe(), details)
+            self.update_status(result.describe(), success=not result.errors)
+            self.reload_event_partitions()
+        
+        self.run_in_background(lambda: compact(events_path), on_done)
+
+    def migrate_legacy_events(self):
+        """Offer to move the events saved before partitioning into the active repository's partition
+
+        Offered once, on the first repository opened, and from the Tools menu.
+        """
+        events_path = self.events_path.get()
+        if self.repo_context is None:
+            messagebox.showwarning("Warning", "Please select a repository first")
+            return
+        count = legacy_event_count(events_path)
+        if not count:
+            mark_legacy_checked(events_path)
+            return
+        context = self.repo_context
+        if not messagebox.askyesno("Legacy Events",
+                                   f"{count} events were saved before events were stored per "
+                                   f"repository and only show in 'All Repositories'.\n\n"
+                                   f"Move them into the events of {context.name}?"):
+            mark_legacy_checked(events_path)
+            self.log_operation("Legacy events left in place, use Tools > Move Legacy Events to move them")
+            return
+        repo_id = context.repo_id
+        self.log_operation(f"Moving {count} legacy events into {context.name}...")
+        
+        def on_done(future):
+            try:
+                result = future.result()
+            except Exception as e:
+                self.log_operation("Moving legacy events failed", str(e))
+                messagebox.showerror("Error", f"Failed to move legacy events: {str(e)}")
+                return
+            if not result.errors:
+                mark_legacy_checked(events_path)
+            self.log_operation(result.describe(), "\n".join(result.errors))
+            self.update_status(result.describe(), success=not result.errors)
+            self.reload_event_partitions()
+        
+        self.run_in_background(lambda: migrate_legacy(events_path, repo_id, context.name), on_done)
+
+    def sync_event_history(self):
+        """Share the active repository's events through its event log ref on the remote"""
+        if self.repo_context is None:
+            messagebox.showwarning("Warning", "Please select a repository first")
+            return
+        if not self.repo.remotes:
+            messagebox.showwarning("Warning", "The repository has no remote to sync events with")
+            return
+        path = self.repo_context.path
+        partition = self.event_partition_path()
+        remote_name = self.repo.remote().name
+        self.log_operation(f"Syncing event history with {remote_name}...")
+        
+        def sync():
+            # Worker threads use their own repository handle
+            return EventLog(self.workspace.handles.get(path)).sync(partition, remote_name)
+        
+        def on_done(future):
+            try:
+                result = future.result()
+            except Exception as e:
+                self.log_operation("Event history sync failed", str(e))
+                self.update_status("Failed to sync event history", success=False)
+                messagebox.showerror("Error", f"Failed to sync event history: {str(e)}")
+                return
+            details = "\n".join(f"Kept both versions of {conflict}" for conflict in result.conflicts)
+            self.log_operation(result.describe(), details)
+            self.update_status(result.describe())
+            if result.imported:
+                self.reload_event_partitions()
+        
+        self.run_in_background(sync, on_done)
+
+    @tracer.traced()
+    def load_cross_repo_events(self):
+        """Return an index of the events of all repositories, loading it on first use"""
+        if self.cross_repo_index is None:
+            index = EventIndex()
+            index.load_all(self.events_path.get())
+            self.cross_repo_index = index
+            self.build_text_index(index)
+        return self.cross_repo_index
+
+    def build_text_index(self, index):
+        """Build the full-text index of an event index in the background"""
+        build = index.full_text_builder()
+        
+        def on_done(future):
+            try:
+                text_index = future.result()
+            except Exception as e:
+                self.log_operation(f"Error building event search index: {str(e)}")
+                return
+            index.install_full_text(text_index)
+        
+        self.run_in_background(build, on_done)
+
     def show_event_history(self):
         """Show event history"""
         history_window = tk.Toplevel(self.root)
@@ -988,6 +1446,23 @@ class GitEventManager:
         ttk.Radiobutton(filter_frame, text="By Branch", variable=view_var, 
                         value="branch", command=lambda: update_tree("branch")).pack()
         
+        # Event scope: the active repository's partition or all repositories
+        ttk.Label(filter_frame, text="Scope:").pack(pady=(10,0))
+        scope_var = tk.StringVar(value="repo" if self.repo_context else "all")
+        repo_scope = ttk.Radiobutton(filter_frame, text="This Repository", variable=scope_var,
+                                     value="repo", command=lambda: update_tree(view_var.get()))
+        repo_scope.pack()
+        if self.repo_context is None:
+            repo_scope.configure(state='disabled')
+        ttk.Radiobutton(filter_frame, text="All Repositories", variable=scope_var,
+                        value="all", command=lambda: update_tree(view_var.get())).pack()
+        
+        def scope_index():
+            """Return the event index of the selected scope"""
+            if scope_var.get() == "all":
+                return self.load_cross_repo_events()
+            return self.event_index
+        
         # Search box
         ttk.Label(filter_frame, text="Search:").pack(pady=(10,0))
         search_var = tk.StringVar()
@@ -1000,10 +1475,11 @@ class GitEventManager:
         
         # Create tree view
         tree = ttk.Treeview(right_frame, columns=(
-            'Time', 'Title', 'Branch', 'Tag', 'Description'
+            'Time', 'Title', 'Repository', 'Branch', 'Tag', 'Description'
         ), show='headings')
         
         tree.heading('Time', text='Time')
+        tree.heading('Repository', text='Repository')
         tree.heading('Title', text='Title')
         tree.heading('Branch', text='Created Branch')
         tree.heading('Tag', text='Created Tag')
@@ -1012,6 +1488,7 @@ class GitEventManager:
         # Set column widths - increase Time column width to accommodate full date
         tree.column('Time', width=180)  # Increased from 150
         tree.column('Title', width=150)
+        tree.column('Repository', width=120)
         tree.column('Branch', width=150)
         tree.column('Tag', width=100)
         tree.column('Description', width=200)
@@ -1024,29 +1501,22 @@ class GitEventManager:
         tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
+        @tracer.traced("update_history_tree")
         def update_tree(view_type):
             """Update tree view"""
             tree.delete(*tree.get_children())
-            search_text = search_var.get().lower()
             
-            if view_type == "date":
-                data = self.events_by_date
-            else:
-                data = self.events_by_branch
-            
-            for key in sorted(data.keys(), reverse=True):
+            for key, events in scope_index().search(view_type, search_var.get()):
                 parent = tree.insert('', 'end', text=key, open=True)
-                for event in sorted(data[key], key=lambda x: x.date, reverse=True):
-                    if (search_text in event.title.lower() or 
-                        search_text in event.description.lower() or
-                        search_text in event.created_branch.lower()):
-                        tree.insert(parent, 'end', values=(
-                            event.date,  # Show full date and time instead of just time
-                            event.title,
-                            event.created_branch,
-                            event.created_tag,
-                            event.description
-                        ))
+                for event in events:
+                    tree.insert(parent, 'end', values=(
+                        event.date,  # Show full date and time instead of just time
+                        event.title,
+                        event.repo_name or "",
+                        event.created_branch,
+                        event.created_tag,
+                        event.description
+                    ))
         
         def on_search(*args):
             """Search event processing"""
@@ -1074,7 +1544,7 @@ class GitEventManager:
                     event_data = None
                     
                     # Search through all events to find the matching one
-                    for events in self.events_by_date.values():
+                    for events in scope_index().by_date.values():
                         for e in events:
                             if e.date == event_date and e.title == values[1]:
                                 event_data = e
@@ -1085,6 +1555,8 @@ class GitEventManager:
                     if event_data:
                         details = f"Title: {event_data.title}\n"
                         details += f"Date: {event_data.date}\n"
+                        if event_data.repo_name:
+                            details += f"Repository: {event_data.repo_name} ({event_data.repo_id})\n"
                         details += f"Description: {event_data.description}\n"
                         details += f"Base Branch: {event_data.base_branch}\n"
                         if event_data.created_branch:
@@ -1093,7 +1565,8 @@ class GitEventManager:
                             details += f"Created Tag: {event_data.created_tag}\n"
                         if hasattr(event_data, 'merged_branches_info') and event_data.merged_branches_info:
                             details += "\nMerged branch information:\n"
-                            for branch_info in event_data.merged_branches_info:
+                            commits = self.commit_table(event_data.repo_id or self.repo_context.repo_id)
+                            for branch_info in commits.resolve(event_data.merged_branches_info):
                                 details += f"\nBranch: {branch_info['name']}\n"
                                 details += f"Commit ID: {branch_info['commit_id']}\n"
                                 details += f"Commit message: {branch_info['commit_message']}\n"
@@ -1111,6 +1584,731 @@ class GitEventManager:
         # Initial display
         update_tree("date")
 
+    @tracer.traced()
+    def event_columns(self, index):
+        """Return the analytics columns of an event index, rebuilt only after it changed"""
+        cached = self.analytics_columns.get(index)
+        if cached and cached[0] == index.version:
+            return cached[1]
+        columns = EventColumns.from_events(index.events())
+        self.analytics_columns[index] = (index.version, columns)
+        return columns
+
+    def show_event_analytics(self):
+        """Show weekly activity, merges per release and the most merged sources"""
+        analytics_window = tk.Toplevel(self.root)
+        analytics_window.title("Event Analytics")
+        analytics_window.geometry("800x500")
+        
+        # Options: scope and time window
+        options_frame = ttk.Frame(analytics_window)
+        options_frame.pack(fill=tk.X, padx=5, pady=5)
+        
+        scope_var = tk.StringVar(value="repo" if self.repo_context else "all")
+        repo_scope = ttk.Radiobutton(options_frame, text="This Repository", variable=scope_var,
+                                     value="repo", command=lambda: update_report())
+        repo_scope.pack(side=tk.LEFT)
+        if self.repo_context is None:
+            repo_scope.configure(state='disabled')
+        ttk.Radiobutton(options_frame, text="All Repositories", variable=scope_var,
+                        value="all", command=lambda: update_report()).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Label(options_frame, text="Last weeks (0 = all):").pack(side=tk.LEFT, padx=(10, 0))
+        weeks_var = tk.IntVar(value=12)
+        ttk.Spinbox(options_frame, from_=0, to=520, width=5, textvariable=weeks_var,
+                    command=lambda: update_report()).pack(side=tk.LEFT, padx=5)
+        summary_label = ttk.Label(options_frame, text="")
+        summary_label.pack(side=tk.RIGHT)
+        
+        # One table per aggregate
+        notebook = ttk.Notebook(analytics_window)
+        notebook.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        tables = {}
+        for key, title, columns in (('weekly', "Weekly", WEEKLY_COLUMNS),
+                                    ('releases', "Merges per Release", RELEASE_COLUMNS),
+                                    ('most_merged', "Most Merged", MERGED_COLUMNS)):
+            frame = ttk.Frame(notebook)
+            notebook.add(frame, text=title)
+            tree = ttk.Treeview(frame, columns=columns, show='headings')
+            for column in columns:
+                tree.heading(column, text=column.replace('_', ' ').title())
+                tree.column(column, width=120)
+            scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=tree.yview)
+            tree.configure(yscrollcommand=scrollbar.set)
+            tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+            scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+            tables[key] = (tree, columns)
+        
+        report = {}
+        
+        @tracer.traced("update_analytics_report")
+        def update_report():
+            index = self.load_cross_repo_events() if scope_var.get() == "all" else self.event_index
+            try:
+                weeks = max(0, weeks_var.get())
+            except tk.TclError:
+                weeks = 0
+            report.clear()
+            report.update(build_report(self.event_columns(index), weeks))
+            
+            for key, (tree, columns) in tables.items():
+                tree.delete(*tree.get_children())
+                # Newest weeks first, long tables are shown in part and exported in full
+                rows = report[key][::-1] if key == 'weekly' else report[key]
+                for row in rows[:1000]:
+                    tree.insert('', 'end', values=[row[column] for column in columns])
+            summary_label.config(text=f"{report['events']} events ({report['backend']})")
+        
+        def save_csv():
+            key = list(tables)[notebook.index(notebook.select())]
+            path = filedialog.asksaveasfilename(parent=analytics_window, title="Export CSV",
+                                                defaultextension=".csv",
+                                                initialfile=f"{key}.csv",
+                                                filetypes=[("CSV", "*.csv")])
+            if path:
+                export_csv(report[key], tables[key][1], path)
+                self.log_operation(f"Exported analytics table: {path}")
+        
+        def save_json():
+            path = filedialog.asksaveasfilename(parent=analytics_window, title="Export JSON",
+                                                defaultextension=".json",
+                                                filetypes=[("JSON", "*.json")])
+            if path:
+                export_json(report, path)
+                self.log_operation(f"Exported analytics report: {path}")
+        
+        button_frame = ttk.Frame(analytics_window)
+        button_frame.pack(fill=tk.X, padx=5, pady=5)
+        ttk.Button(button_frame, text="Export JSON", command=save_json).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(button_frame, text="Export CSV", command=save_csv).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(button_frame, text="Refresh", command=update_report).pack(side=tk.RIGHT, padx=5)
+        
+        update_report()
+
+    def run_in_background(self, func, on_done):
+        """Run func in a worker thread and call on_done(future) on the Tk thread"""
+        def task():
+            try:
+                return func()
+            finally:
+                # Pool threads outlive the task, close the handles it opened
+                self.workspace.handles.release_thread()
+        
+        future = self.background_executor.submit(task)
+        
+        def check_done():
+            # Deferred while an operation runs, on_done may replace the repository state
+            if future.done() and not self.operation_active:
+                on_done(future)
+            else:
+                self.root.after(100, check_done)
+        
+        self.root.after(100, check_done)
+        return future
+
+    def build_pipeline_spec(self):
+        """Build a workspace pipeline spec from the current form values"""
+        spec = PipelineSpec()
+        
+        selections = self.base_items_listbox.curselection()
+        if selections:
+            spec.base_item = self.base_items_listbox.get(selections[0])
+        spec.create_branch = self.enable_branch_creation.get()
+        spec.branch_prefix = self.branch_prefix.get()
+        spec.branch_custom_suffix = self.branch_custom_suffix.get()
+        spec.branch_date_suffix = self.branch_date_suffix.get()
+        
+        if self.enable_merge.get():
+            spec.merge_branches = [b for b, var in self.merge_vars['branch'].items() if var.get()]
+            spec.merge_tags = [t for t, var in self.merge_vars['tag'].items() if var.get()]
+        
+        spec.create_tag = self.enable_tag_creation.get()
+        spec.tag_prefix = self.tag_prefix.get()
+        spec.tag_custom_suffix = self.tag_custom_suffix.get()
+        spec.tag_date_suffix = self.tag_date_suffix.get()
+        return spec
+
+    def run_batch_file(self):
+        """Run the pipeline for every spec of a JSON batch file in the active repository"""
+        if self.repo_context is None:
+            messagebox.showwarning("Warning", "Please select a repository first")
+            return
+        path = filedialog.askopenfilename(title="Select Batch File", filetypes=[("JSON", "*.json")])
+        if not path:
+            return
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                specs = [PipelineSpec.from_dict(entry) for entry in json.load(f)]
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            messagebox.showerror("Error", f"Failed to read batch file: {str(e)}")
+            return
+        if not specs:
+            messagebox.showwarning("Warning", "The batch file has no pipeline specs")
+            return
+        if not messagebox.askyesno("Confirm",
+                                   f"Create the branches and tags of {len(specs)} pipeline specs "
+                                   f"in {self.repo_context.name} and push them?"):
+            return
+        context = self.repo_context
+        self.log_operation(f"Running batch of {len(specs)} pipeline specs from {path}...")
+        
+        def on_done(future):
+            try:
+                report = future.result()
+            except Exception as e:
+                self.log_operation("Batch pipeline failed", str(e))
+                self.update_status("Batch pipeline failed", success=False)
+                messagebox.showerror("Error", f"Batch pipeline failed: {str(e)}")
+                return
+            self.log_operation("Batch pipeline finished", report.to_text())
+            self.update_status(f"Batch pipeline: {len(report.failed)} of "
+                               f"{len(report.results)} specs failed",
+                               success=not report.failed)
+            if context is self.repo_context:
+                self.apply_ref_snapshot(context.snapshot)
+                self.update_push_labels()
+            self.show_workspace_report(report)
+        
+        self.run_in_background(lambda: self.workspace.run_batch(context, specs), on_done)
+
+    def show_workspace(self):
+        """Show workspace window with all open repositories"""
+        workspace_window = tk.Toplevel(self.root)
+        workspace_window.title("Workspace")
+        workspace_window.geometry("800x400")
+        
+        # Create tree view
+        tree = ttk.Treeview(workspace_window, columns=(
+            'Repository', 'Branch', 'Branches', 'Tags', 'Status'
+        ), show='headings')
+        
+        tree.heading('Repository', text='Repository')
+        tree.heading('Branch', text='Current Branch')
+        tree.heading('Branches', text='Branches')
+        tree.heading('Tags', text='Tags')
+        tree.heading('Status', text='Status')
+        
+        tree.column('Repository', width=200)
+        tree.column('Branch', width=180)
+        tree.column('Branches', width=80)
+        tree.column('Tags', width=80)
+        tree.column('Status', width=240)
+        
+        tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        def update_tree():
+            """Update tree view"""
+            tree.delete(*tree.get_children())
+            for path, context in self.workspace.contexts.items():
+                snapshot = context.snapshot
+                if context.last_error:
+                    status = f"Error: {context.last_error}"
+                elif snapshot:
+                    status = "Refreshed " + datetime.fromtimestamp(snapshot.taken_at).strftime('%H:%M:%S')
+                else:
+                    status = "Not loaded"
+                if context is self.repo_context:
+                    status = "Active - " + status
+                tree.insert('', 'end', iid=path, values=(
+                    context.name,
+                    snapshot.current_branch if snapshot else "",
+                    len(snapshot.branches) + len(snapshot.remote_branches) if snapshot else "",
+                    len(snapshot.tags) if snapshot else "",
+                    status
+                ))
+        
+        def selected_contexts():
+            return [self.workspace.contexts[path] for path in tree.selection()]
+        
+        def add_repository():
+            path = filedialog.askdirectory(parent=workspace_window, title="Add Git Repository",
+                                           initialdir=os.getcwd())
+            if not path:
+                return
+            try:
+                self.workspace.open(path)
+                self.log_operation(f"Added repository to workspace: {path}")
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to open repository: {str(e)}",
+                                     parent=workspace_window)
+            update_tree()
+        
+        def remove_repository():
+            for context in selected_contexts():
+                if context is self.repo_context:
+                    messagebox.showwarning("Warning", "The active repository cannot be removed",
+                                           parent=workspace_window)
+                    continue
+                self.workspace.close(context.path)
+                self.log_operation(f"Removed repository from workspace: {context.path}")
+            update_tree()
+        
+        def switch_repository():
+            contexts = selected_contexts()
+            if contexts:
+                self.repo_path.set(contexts[0].path)
+                self.init_repo()
+                update_tree()
+        
+        def refresh_all():
+            contexts = selected_contexts() or list(self.workspace.contexts.values())
+            self.log_operation(f"Refreshing {len(contexts)} repositories...")
+            
+            def on_done(future):
+                try:
+                    outcomes = future.result()
+                except Exception as e:
+                    self.log_operation("Workspace refresh failed", str(e))
+                    self.update_status("Workspace refresh failed", success=False)
+                    messagebox.showerror("Error", f"Workspace refresh failed: {str(e)}")
+                    return
+                for context, outcome in outcomes.items():
+                    if isinstance(outcome, Exception):
+                        self.log_operation(f"Error refreshing {context.name}: {str(outcome)}")
+                    elif outcome:
+                        self.log_operation(f"{context.name}: {outcome.describe()}")
+                if self.repo_context in contexts and self.repo_context.snapshot:
+                    self.apply_ref_snapshot(self.repo_context.snapshot)
+                self.update_status(f"Refreshed {len(contexts)} repositories")
+                if workspace_window.winfo_exists():
+                    update_tree()
+            
+            self.run_in_background(lambda: self.workspace.refresh_all(contexts), on_done)
+        
+        def run_pipeline():
+            contexts = selected_contexts() or list(self.workspace.contexts.values())
+            spec = self.build_pipeline_spec()
+            if not (spec.create_branch or spec.merge_branches or spec.merge_tags or spec.create_tag):
+                messagebox.showwarning("Warning", "No operations were selected",
+                                       parent=workspace_window)
+                return
+            if not messagebox.askyesno("Confirm",
+                                       f"Run the selected operations in {len(contexts)} repositories?",
+                                       parent=workspace_window):
+                return
+            self.log_operation(f"Running pipeline in {len(contexts)} repositories...")
+            
+            def on_done(future):
+                try:
+                    report = future.result()
+                except Exception as e:
+                    self.log_operation("Workspace pipeline failed", str(e))
+                    self.update_status("Workspace pipeline failed", success=False)
+                    messagebox.showerror("Error", f"Workspace pipeline failed: {str(e)}")
+                    return
+                self.log_operation("Workspace pipeline finished", report.to_text())
+                self.update_status(f"Workspace pipeline: {len(report.failed)} of "
+                                   f"{len(report.results)} repositories failed",
+                                   success=not report.failed)
+                if self.repo_context in contexts:
+                    # The pending event scope stays the GUI's own
+                    self.apply_ref_snapshot(self.repo_context.snapshot)
+                    self.update_push_labels()
+                if workspace_window.winfo_exists():
+                    update_tree()
+                self.show_workspace_report(report)
+            
+            isolated = self.use_worktrees.get()
+            self.run_in_background(lambda: self.workspace.run_pipeline_all(spec, contexts, isolated), on_done)
+        
+        # Buttons
+        btn_frame = ttk.Frame(workspace_window)
+        btn_frame.pack(fill=tk.X, padx=5, pady=5)
+        ttk.Button(btn_frame, text="Add Repository", command=add_repository).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="Remove", command=remove_repository).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="Switch To", command=switch_repository).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="Run Pipeline", command=run_pipeline).pack(side=tk.RIGHT, padx=5)
+        ttk.Checkbutton(btn_frame, text="Isolated Worktrees",
+                        variable=self.use_worktrees).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(btn_frame, text="Refresh", command=refresh_all).pack(side=tk.RIGHT, padx=5)
+        
+        # Initial display
+        update_tree()
+
+    def show_workspace_report(self, report):
+        """Show the combined report of a workspace operation"""
+        report_window = tk.Toplevel(self.root)
+        report_window.title(report.title)
+        report_window.geometry("700x400")
+        
+        text = tk.Text(report_window, wrap=tk.WORD, padx=10, pady=10)
+        text.pack(fill=tk.BOTH, expand=True)
+        text.insert('1.0', report.to_text())
+        text.configure(state='disabled')
+        
+        def save_report():
+            path = filedialog.asksaveasfilename(parent=report_window, title="Save Report",
+                                                defaultextension=".json",
+                                                filetypes=[("JSON", "*.json")])
+            if path:
+                with open(path, 'w', encoding='utf-8') as f:
+                    json.dump(report.to_dict(), f, ensure_ascii=False, indent=2)
+                self.log_operation(f"Saved workspace report: {path}")
+        
+        ttk.Button(report_window, text="Save Report", command=save_report).pack(side=tk.RIGHT, padx=5, pady=5)
+
+    def show_diagnostics(self):
+        """Show diagnostics window"""
+        diagnostics_window = tk.Toplevel(self.root)
+        diagnostics_window.title("Diagnostics")
+        diagnostics_window.geometry("900x600")
+        
+        notebook = ttk.Notebook(diagnostics_window)
+        notebook.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        self.create_timing_tab(notebook)
+        self.create_schedule_tab(notebook)
+        self.create_handles_tab(notebook)
+        self.create_memory_tab(notebook)
+        self.create_profiler_tab(notebook)
+
+    def create_timing_tab(self, notebook):
+        """Create diagnostics tab with operation timing spans"""
+        frame = ttk.Frame(notebook)
+        notebook.add(frame, text="Timing")
+        
+        paned = ttk.PanedWindow(frame, orient=tk.VERTICAL)
+        paned.pack(fill=tk.BOTH, expand=True)
+        
+        # Summary by operation
+        summary_tree = ttk.Treeview(paned, columns=(
+            'Operation', 'Category', 'Count', 'Total', 'Mean', 'Max'
+        ), show='headings', height=8)
+        for column, text, width in (('Operation', 'Operation', 260), ('Category', 'Category', 80),
+                                    ('Count', 'Count', 60), ('Total', 'Total (ms)', 100),
+                                    ('Mean', 'Mean (ms)', 100), ('Max', 'Max (ms)', 100)):
+            summary_tree.heading(column, text=text)
+            summary_tree.column(column, width=width)
+        paned.add(summary_tree, weight=1)
+        
+        # Individual spans, nested spans are indented
+        spans_frame = ttk.Frame(paned)
+        spans_tree = ttk.Treeview(spans_frame, columns=(
+            'Start', 'Operation', 'Duration', 'Thread', 'Details'
+        ), show='headings')
+        for column, text, width in (('Start', 'Start (s)', 80), ('Operation', 'Operation', 260),
+                                    ('Duration', 'Duration (ms)', 100), ('Thread', 'Thread', 120),
+                                    ('Details', 'Details', 300)):
+            spans_tree.heading(column, text=text)
+            spans_tree.column(column, width=width)
+        spans_scrollbar = ttk.Scrollbar(spans_frame, orient=tk.VERTICAL, command=spans_tree.yview)
+        spans_tree.configure(yscrollcommand=spans_scrollbar.set)
+        spans_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        spans_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        paned.add(spans_frame, weight=3)
+        
+        def update_trees():
+            """Update span tree views"""
+            summary_tree.delete(*summary_tree.get_children())
+            for row in tracer.summary():
+                summary_tree.insert('', 'end', values=(
+                    row['name'], row['category'], row['count'],
+                    f"{row['total'] * 1000:.1f}", f"{row['mean'] * 1000:.1f}", f"{row['max'] * 1000:.1f}"
+                ))
+            
+            spans_tree.delete(*spans_tree.get_children())
+            # Show the most recent spans in start order
+            spans = sorted(tracer.snapshot()[-2000:], key=lambda span: span.start)
+            for span in spans:
+                details = span.error or span.args.get('command', span.args.get('repo', ''))
+                spans_tree.insert('', 'end', values=(
+                    f"{span.start:.3f}", "    " * span.depth + span.name,
+                    f"{span.duration * 1000:.1f}", span.thread_name, details
+                ))
+        
+        def clear_spans():
+            tracer.clear()
+            update_trees()
+        
+        def export_trace():
+            path = filedialog.asksaveasfilename(parent=frame, title="Export Chrome Trace",
+                                                defaultextension=".json",
+                                                filetypes=[("Chrome trace", "*.json")])
+            if path:
+                try:
+                    tracer.export_chrome_trace(path)
+                    self.log_operation(f"Exported Chrome trace: {path}")
+                except Exception as e:
+                    messagebox.showerror("Error", f"Failed to export trace: {str(e)}", parent=frame)
+        
+        # Buttons
+        btn_frame = ttk.Frame(frame)
+        btn_frame.pack(fill=tk.X, pady=5)
+        ttk.Button(btn_frame, text="Export Chrome Trace", command=export_trace).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(btn_frame, text="Clear", command=clear_spans).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(btn_frame, text="Refresh", command=update_trees).pack(side=tk.RIGHT, padx=5)
+        
+        # Initial display
+        update_trees()
+
+    def create_schedule_tab(self, notebook):
+        """Create diagnostics tab with the task graph of the last executed operations"""
+        frame = ttk.Frame(notebook)
+        notebook.add(frame, text="Schedule")
+        
+        summary_label = ttk.Label(frame, text="", justify=tk.LEFT)
+        summary_label.pack(fill=tk.X, padx=5, pady=5)
+        
+        # Tasks in start order, the critical path marked with *
+        tree = ttk.Treeview(frame, columns=(
+            'Critical', 'Task', 'Thread', 'Start', 'Duration', 'Waited', 'Status'
+        ), show='headings')
+        for column, text, width in (('Critical', '', 30), ('Task', 'Task', 260), ('Thread', 'Thread', 110),
+                                    ('Start', 'Start (ms)', 80), ('Duration', 'Duration (ms)', 100),
+                                    ('Waited', 'Waited For', 200), ('Status', 'Status', 200)):
+            tree.heading(column, text=text)
+            tree.column(column, width=width)
+        tree.pack(fill=tk.BOTH, expand=True, padx=5)
+        
+        def update_view():
+            """Update the task list"""
+            tree.delete(*tree.get_children())
+            graph = self.last_schedule
+            if graph is None:
+                summary_label.config(text="No operations executed yet")
+                return
+            summary_label.config(text=graph.describe())
+            critical = {task.name for task in graph.critical_path()}
+            tasks = sorted(graph.tasks.values(), key=lambda task: (task.started is None, task.started or 0))
+            for task in tasks:
+                waited = graph.waited_for(task)
+                status = f"{task.status}: {task.error}" if task.error else task.status
+                tree.insert('', 'end', values=(
+                    "*" if task.name in critical else "", task.name, task.thread_name,
+                    f"{task.started * 1000:.0f}" if task.started is not None else "",
+                    f"{task.duration * 1000:.0f}", waited.name if waited else "", status
+                ))
+        
+        def copy_chart():
+            if self.last_schedule is not None:
+                self.root.clipboard_clear()
+                self.root.clipboard_append(self.last_schedule.chart())
+        
+        # Buttons
+        btn_frame = ttk.Frame(frame)
+        btn_frame.pack(fill=tk.X, pady=5)
+        ttk.Button(btn_frame, text="Copy Chart", command=copy_chart).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(btn_frame, text="Refresh", command=update_view).pack(side=tk.RIGHT, padx=5)
+        
+        # Initial display
+        update_view()
+
+    def create_profiler_tab(self, notebook):
+        """Create diagnostics tab with the functions the sampling profiler found running most"""
+        frame = ttk.Frame(notebook)
+        notebook.add(frame, text="Profiler")
+        profiler = self.sampling_profiler
+        
+        summary_label = ttk.Label(frame)
+        summary_label.pack(fill=tk.X, padx=5, pady=5)
+        
+        # Thread whose innermost frames are counted, the Tk thread is MainThread
+        thread_frame = ttk.Frame(frame)
+        thread_frame.pack(fill=tk.X, padx=5)
+        ttk.Label(thread_frame, text="Thread:").pack(side=tk.LEFT)
+        thread_var = tk.StringVar(value="MainThread")
+        thread_combo = ttk.Combobox(thread_frame, textvariable=thread_var, state='readonly', width=30)
+        thread_combo.pack(side=tk.LEFT, padx=5)
+        
+        tree = ttk.Treeview(frame, columns=('Function', 'Samples', 'Share'), show='headings')
+        for column, text, width in (('Function', 'Function', 500), ('Samples', 'Samples', 100),
+                                    ('Share', 'Share (%)', 100)):
+            tree.heading(column, text=text)
+            tree.column(column, width=width)
+        tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        def update_view(*args):
+            """Update the function list"""
+            summary_label.config(text=profiler.describe())
+            totals = profiler.thread_totals()
+            thread_combo.configure(values=["All threads"] + sorted(totals))
+            thread_name = None if thread_var.get() == "All threads" else thread_var.get()
+            rows = profiler.top_functions(thread_name, limit=50)
+            total = sum(totals.values()) if thread_name is None else totals[thread_name]
+            tree.delete(*tree.get_children())
+            for label, count in rows:
+                tree.insert('', 'end', values=(label, count, f"{count * 100 / total:.1f}" if total else ""))
+        
+        def toggle():
+            self.profiling.set(not profiler.running)
+            self.toggle_sampling_profiler()
+            update_view()
+        
+        def clear():
+            profiler.clear()
+            update_view()
+        
+        thread_combo.bind('<<ComboboxSelected>>', update_view)
+        
+        # Buttons
+        btn_frame = ttk.Frame(frame)
+        btn_frame.pack(fill=tk.X, pady=5)
+        ttk.Button(btn_frame, text="Save Profile", command=self.save_profile).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(btn_frame, text="Clear", command=clear).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(btn_frame, text="Start/Stop", command=toggle).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(btn_frame, text="Refresh", command=update_view).pack(side=tk.RIGHT, padx=5)
+        
+        # Initial display
+        update_view()
+
+    def create_handles_tab(self, notebook):
+        """Create diagnostics tab with open repository handles and subprocesses"""
+        frame = ttk.Frame(notebook)
+        notebook.add(frame, text="Repositories")
+        
+        totals_label = ttk.Label(frame, text="")
+        totals_label.pack(fill=tk.X, padx=5, pady=5)
+        
+        tree = ttk.Treeview(frame, columns=(
+            'Repository', 'Thread', 'Helpers'
+        ), show='headings')
+        tree.heading('Repository', text='Repository')
+        tree.heading('Thread', text='Thread')
+        tree.heading('Helpers', text='Helper Processes')
+        tree.column('Repository', width=450)
+        tree.column('Thread', width=200)
+        tree.column('Helpers', width=120)
+        tree.pack(fill=tk.BOTH, expand=True, padx=5)
+        
+        def update_view():
+            """Update handle counts"""
+            stats = self.workspace.handles.stats()
+            children = stats['child_processes']
+            totals_label.config(text=(
+                f"Open handles: {stats['open_handles']}    "
+                f"Helper processes: {stats['helper_processes']}    "
+                f"Child processes: {children if children is not None else 'unknown'}    "
+                f"Opened/closed: {stats['opened']}/{stats['closed']}"
+            ))
+            tree.delete(*tree.get_children())
+            for row in stats['handles']:
+                thread = row['thread'] if row['thread_alive'] else f"{row['thread']} (exited)"
+                tree.insert('', 'end', values=(row['path'], thread, row['helper_processes']))
+        
+        def reap_handles():
+            count = self.workspace.handles.reap()
+            self.log_operation(f"Closed {count} repository handles of exited threads")
+            update_view()
+        
+        # Buttons
+        btn_frame = ttk.Frame(frame)
+        btn_frame.pack(fill=tk.X, pady=5)
+        ttk.Button(btn_frame, text="Reap", command=reap_handles).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(btn_frame, text="Refresh", command=update_view).pack(side=tk.RIGHT, padx=5)
+        
+        # Initial display
+        update_view()
+
+    def create_memory_tab(self, notebook):
+        """Create diagnostics tab with tracemalloc snapshots and Tk/git object counts"""
+        frame = ttk.Frame(notebook)
+        notebook.add(frame, text="Memory")
+        profiler = self.memory_profiler
+        
+        summary_label = ttk.Label(frame)
+        summary_label.pack(fill=tk.X, padx=5, pady=5)
+        
+        paned = ttk.PanedWindow(frame, orient=tk.VERTICAL)
+        paned.pack(fill=tk.BOTH, expand=True)
+        
+        # Allocation sites of the latest snapshot, or growth since the compared one
+        sites_frame = ttk.Frame(paned)
+        paned.add(sites_frame, weight=1)
+        compare_frame = ttk.Frame(sites_frame)
+        compare_frame.pack(fill=tk.X, padx=5)
+        ttk.Label(compare_frame, text="Compare with:").pack(side=tk.LEFT)
+        compare_var = tk.StringVar()
+        compare_combo = ttk.Combobox(compare_frame, textvariable=compare_var, state='readonly', width=30)
+        compare_combo.pack(side=tk.LEFT, padx=5)
+        sites_tree = ttk.Treeview(sites_frame, columns=('Site', 'Size', 'Count', 'Growth', 'New'),
+                                  show='headings', height=10)
+        for column, width in (('Site', 350), ('Size', 100), ('Count', 80), ('Growth', 100), ('New', 80)):
+            sites_tree.heading(column, text=column)
+            sites_tree.column(column, width=width, anchor='w' if column == 'Site' else 'e')
+        sites_tree.pack(fill=tk.BOTH, expand=True, padx=5)
+        
+        # Widgets, variables and repository objects by owner
+        objects_tree = ttk.Treeview(paned, columns=('Kind', 'Owner', 'Class', 'Count'),
+                                    show='headings', height=10)
+        for column, width in (('Kind', 100), ('Owner', 350), ('Class', 150), ('Count', 80)):
+            objects_tree.heading(column, text=column)
+            objects_tree.column(column, width=width, anchor='e' if column == 'Count' else 'w')
+        paned.add(objects_tree, weight=1)
+        
+        def build_report():
+            variables, tcl_globals = variable_counts(self, self.root.tk)
+            return MemoryReport(profiler, widget_counts(self.root, self),
+                                variables, tcl_globals, repo_counts(self.workspace.handles))
+        
+        def update_view():
+            """Update snapshot statistics and object counts"""
+            report = build_report()
+            snapshots = profiler.all_snapshots()
+            text = f"Tracing: {'on' if profiler.tracing else 'off'}    Snapshots: {len(snapshots)}"
+            if profiler.tracing:
+                current, peak = profiler.traced_memory()
+                text += f"    Traced: {format_bytes(current)} (peak {format_bytes(peak)})"
+            text += (f"    Widgets: {sum(report.widgets.values())}"
+                     f"    Variables: {sum(report.variables.values())}")
+            summary_label.config(text=text)
+            
+            titles = [snapshot.title for snapshot in snapshots[:-1]]
+            compare_combo['values'] = titles
+            if compare_var.get() not in titles:
+                compare_var.set(titles[-1] if titles else "")
+            sites_tree.delete(*sites_tree.get_children())
+            if snapshots:
+                latest = snapshots[-1]
+                if compare_var.get():
+                    old = snapshots[titles.index(compare_var.get())]
+                    for site, size_diff, count_diff, size in profiler.growth(old, latest):
+                        sites_tree.insert('', 'end', values=(site, format_bytes(size), "",
+                                                             f"+{format_bytes(size_diff)}", f"{count_diff:+d}"))
+                else:
+                    for site, size, count in profiler.top(latest):
+                        sites_tree.insert('', 'end', values=(site, format_bytes(size), count, "", ""))
+            
+            objects_tree.delete(*objects_tree.get_children())
+            for row in report.repos:
+                objects_tree.insert('', 'end', values=(
+                    "Repository", row['path'], f"{row['open']} open, {row['leaked']} leaked", row['live']))
+            for (owner, cls), count in report.variables.most_common():
+                objects_tree.insert('', 'end', values=("Variable", owner, cls, count))
+            for (owner, cls), count in report.widgets.most_common():
+                objects_tree.insert('', 'end', values=("Widget", owner, cls, count))
+        
+        def take_snapshot():
+            snapshot = profiler.take(self.repo_context.name if self.repo_context else "")
+            self.log_operation(f"Memory snapshot {snapshot.title}: "
+                               f"{format_bytes(snapshot.traced[0])} traced")
+            update_view()
+        
+        def stop_tracing():
+            profiler.stop()
+            update_view()
+        
+        def save_report():
+            path = filedialog.asksaveasfilename(parent=frame, title="Save Memory Report",
+                                                defaultextension=".txt",
+                                                filetypes=[("Text", "*.txt")])
+            if path:
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(build_report().to_text())
+                self.log_operation(f"Saved memory report: {path}")
+        
+        compare_combo.bind('<<ComboboxSelected>>', lambda e: update_view())
+        
+        # Buttons
+        btn_frame = ttk.Frame(frame)
+        btn_frame.pack(fill=tk.X, pady=5)
+        ttk.Button(btn_frame, text="Take Snapshot", command=take_snapshot).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="Stop Tracing", command=stop_tracing).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="Save Report", command=save_report).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(btn_frame, text="Refresh", command=update_view).pack(side=tk.RIGHT, padx=5)
+        
+        # Initial display
+        update_view()
+
     def setup_toolbar(self):
         toolbar = ttk.Frame(self.root)
         toolbar.pack(fill=tk.X, padx=5, pady=5)
@@ -1129,10 +2327,9 @@ class GitEventManager:
             
             selected = self.base_items_listbox.get(self.base_items_listbox.curselection())
             if selected:
-                # If it's a remote branch, remove "(remote)" suffix
-                branch_name = selected.split(' (remote)')[0]
+                # If it's a remote branch, remove its remote suffix
+                branch_name = pipeline.strip_remote_suffix(selected)
                 self.branch_prefix.set(branch_name)
-                self.update_branch_name()
                 
         except Exception as e:
             self.log_operation(f"Error in base item selection: {str(e)}")
@@ -1165,11 +2362,15 @@ class GitEventManager:
         
         ttk.Label(base_type_frame, text="Base Type:").pack(side=tk.LEFT)
         branch_radio = ttk.Radiobutton(base_type_frame, text="Branch", value="branch", 
-                                      variable=self.base_type, command=self.update_base_items)
+                                      variable=self.base_type)
         branch_radio.pack(side=tk.LEFT, padx=5)
         tag_radio = ttk.Radiobutton(base_type_frame, text="Tag", value="tag", 
-                                   variable=self.base_type, command=self.update_base_items)
+                                   variable=self.base_type)
         tag_radio.pack(side=tk.LEFT)
+        sort_combo = ttk.Combobox(base_type_frame, textvariable=self.ref_sort_mode, values=SORT_MODES,
+                                  state='readonly', width=8)
+        sort_combo.pack(side=tk.RIGHT)
+        ttk.Label(base_type_frame, text="Sort:").pack(side=tk.RIGHT, padx=5)
         
         # Base item selection - add search functionality
         base_items_frame = ttk.Frame(branch_frame)
@@ -1177,8 +2378,7 @@ class GitEventManager:
         
         ttk.Label(base_items_frame, text="Base Item:").pack(side=tk.LEFT)
         
-        # Add search box
-        self.base_search_var = tk.StringVar()
+        # Add search box, the list is filtered by the view state
         search_entry = ttk.Entry(base_items_frame, textvariable=self.base_search_var)
         search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
         
@@ -1195,9 +2395,6 @@ class GitEventManager:
         base_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.base_items_listbox.configure(yscrollcommand=base_scrollbar.set)
         
-        # Bind search event
-        self.base_search_var.trace_add("write", self.update_base_items)
-        
         # Bind selection event
         self.base_items_listbox.bind('<<ListboxSelect>>', self.on_base_item_selected)
         
@@ -1209,7 +2406,6 @@ class GitEventManager:
         prefix_combo = ttk.Combobox(prefix_frame, textvariable=self.branch_prefix, 
                                    values=['feature', 'bugfix', 'hotfix', 'release', 'custom'])
         prefix_combo.pack(side=tk.LEFT, padx=5)
-        prefix_combo.bind('<<ComboboxSelected>>', self.update_branch_name)
         
         # Custom suffix
         custom_suffix_frame = ttk.Frame(branch_frame)
@@ -1218,7 +2414,6 @@ class GitEventManager:
         ttk.Label(custom_suffix_frame, text="Custom Suffix:").pack(side=tk.LEFT)
         custom_entry = ttk.Entry(custom_suffix_frame, textvariable=self.branch_custom_suffix)
         custom_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
-        custom_entry.bind('<KeyRelease>', self.update_branch_name)
         
         # Date suffix
         date_suffix_frame = ttk.Frame(branch_frame)
@@ -1227,7 +2422,6 @@ class GitEventManager:
         ttk.Label(date_suffix_frame, text="Date Suffix:").pack(side=tk.LEFT)
         date_entry = ttk.Entry(date_suffix_frame, textvariable=self.branch_date_suffix)
         date_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
-        date_entry.bind('<KeyRelease>', self.update_branch_name)
         
         # Branch name preview
         preview_frame = ttk.Frame(branch_frame)
@@ -1257,9 +2451,12 @@ class GitEventManager:
         search_frame = ttk.Frame(merge_frame)
         search_frame.pack(fill=tk.X, padx=5, pady=2)
         ttk.Label(search_frame, text="Search:").pack(side=tk.LEFT)
-        self.merge_search_var = tk.StringVar()
         search_entry = ttk.Entry(search_frame, textvariable=self.merge_search_var)
         search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        ttk.Checkbutton(search_frame, text="Hide merged", variable=self.hide_merged).pack(side=tk.LEFT)
+        ttk.Label(search_frame, text="Sort:").pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Combobox(search_frame, textvariable=self.ref_sort_mode, values=SORT_MODES,
+                     state='readonly', width=8).pack(side=tk.LEFT, padx=5)
         
         # Create scrollable frame
         scroll_frame = ttk.Frame(merge_frame)
@@ -1287,55 +2484,6 @@ class GitEventManager:
         self.branch_checkbuttons = {}
         self.tag_checkbuttons = {}
         
-        def update_merge_items():
-            """Update display of merge items"""
-            search_text = self.merge_search_var.get().lower()
-            
-            # Clear internal frame
-            for widget in self.merge_inner_frame.winfo_children():
-                widget.destroy()
-            
-            # Create branch area
-            branch_frame = ttk.LabelFrame(self.merge_inner_frame, text="Branches")
-            branch_frame.pack(fill=tk.X, expand=True, padx=5, pady=5)
-            
-            # Display branches
-            all_branches = sorted(set(self.cached_branches + 
-                                    [f"{b} (remote)" for b in self.cached_remote_branches]))
-            
-            for branch in all_branches:
-                if search_text in branch.lower():
-                    if branch not in self.merge_vars['branch']:
-                        self.merge_vars['branch'][branch] = tk.BooleanVar()
-                    checkbox = ttk.Checkbutton(
-                        branch_frame,
-                        text=branch,
-                        variable=self.merge_vars['branch'][branch]
-                    )
-                    checkbox.pack(anchor='w', padx=20, pady=2)
-                    self.branch_checkbuttons[branch] = checkbox
-            
-            # Create tag area
-            if self.cached_tags:
-                tag_frame = ttk.LabelFrame(self.merge_inner_frame, text="Tags")
-                tag_frame.pack(fill=tk.X, expand=True, padx=5, pady=5)
-                
-                for tag in sorted(self.cached_tags):
-                    if search_text in tag.lower():
-                        if tag not in self.merge_vars['tag']:
-                            self.merge_vars['tag'][tag] = tk.BooleanVar()
-                        checkbox = ttk.Checkbutton(
-                            tag_frame,
-                            text=tag,
-                            variable=self.merge_vars['tag'][tag]
-                        )
-                        checkbox.pack(anchor='w', padx=20, pady=2)
-                        self.tag_checkbuttons[tag] = checkbox
-            
-            # Update canvas scroll region
-            self.merge_inner_frame.update_idletasks()
-            self.merge_canvas.configure(scrollregion=self.merge_canvas.bbox("all"))
-        
         # Bind event to update scroll region
         def on_frame_configure(event):
             self.merge_canvas.configure(scrollregion=self.merge_canvas.bbox("all"))
@@ -1347,17 +2495,11 @@ class GitEventManager:
         self.merge_inner_frame.bind("<Configure>", on_frame_configure)
         self.merge_canvas.bind("<Configure>", on_canvas_configure)
         
-        # Bind search event
-        self.merge_search_var.trace_add("write", lambda *args: update_merge_items())
-        
         # Bind mouse wheel event
         def on_mousewheel(event):
             self.merge_canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
         
         self.merge_canvas.bind_all("<MouseWheel>", on_mousewheel)
-        
-        # Initial display all items
-        update_merge_items()
 
     def create_tag_section(self, parent):
         """Create tag operations area"""
@@ -1402,11 +2544,6 @@ class GitEventManager:
         final_entry = ttk.Entry(final_frame, textvariable=self.final_tag_name, 
                                state='readonly')
         final_entry.pack(fill=tk.X, expand=True, padx=5)
-        
-        # Add event bindings
-        self.tag_prefix.trace_add("write", self.update_tag_name)
-        self.tag_custom_suffix.trace_add("write", self.update_tag_name)
-        self.tag_date_suffix.trace_add("write", self.update_tag_name)
 
     def create_execute_section(self, parent):
         """Create unified execution area"""
@@ -1417,6 +2554,22 @@ class GitEventManager:
         execute_btn = ttk.Button(execute_frame, text="Execute Selected Operations", 
                                 command=self.execute_operations)
         execute_btn.pack(fill=tk.X, padx=5, pady=5)
+        
+        # Resume button, enabled while the last run has unfinished steps
+        self.resume_button = ttk.Button(execute_frame, text="Resume Last Run",
+                                        command=self.resume_operations, state='disabled')
+        self.resume_button.pack(fill=tk.X, padx=5, pady=(0, 5))
+        
+        # Cancel button, enabled while git runs for an operation
+        self.cancel_button = ttk.Button(execute_frame, text="Cancel",
+                                        command=self.cancel_operations, state='disabled')
+        self.cancel_button.pack(fill=tk.X, padx=5, pady=(0, 5))
+        
+        # Progress of the running fetch or push
+        self.transfer_label = ttk.Label(execute_frame, text="")
+        self.transfer_label.pack(fill=tk.X, padx=5)
+        self.transfer_bar = ttk.Progressbar(execute_frame, mode='determinate', maximum=100)
+        self.transfer_bar.pack(fill=tk.X, padx=5, pady=(0, 5))
 
     def update_sections_state(self):
         """Update state of all domains"""
@@ -1438,47 +2591,91 @@ class GitEventManager:
             if isinstance(widget, (ttk.Entry, ttk.Combobox, ttk.Button)):
                 widget.configure(state=state)
 
+    def operation_checkpoint_path(self):
+        """Return the checkpoint file of the active repository"""
+        return checkpoint_path(self.checkpoint_dir, self.repo_context.repo_id)
+
+    def load_operation_checkpoint(self):
+        """Return the checkpoint of the active repository's last run, or None"""
+        if self.repo_context is None:
+            return None
+        try:
+            return OperationCheckpoint.load(self.operation_checkpoint_path())
+        except (OSError, ValueError, KeyError) as e:
+            self.log_operation(f"Error loading operation checkpoint: {str(e)}")
+            return None
+
+    def update_resume_state(self):
+        """Enable the resume button while the active repository has unfinished operations"""
+        checkpoint = self.load_operation_checkpoint()
+        unfinished = checkpoint is not None and not checkpoint.complete
+        if hasattr(self, 'resume_button'):
+            self.resume_button.configure(state='normal' if unfinished else 'disabled')
+        return checkpoint if unfinished else None
+
+    def plan_operations(self):
+        """Return the steps of the selected operations, or None if nothing should run"""
+        steps = []
+        any_operation_enabled = False
+        
+        # 1. Create branch
+        if self.enable_branch_creation.get():
+            any_operation_enabled = True
+            branch_name = self.final_branch_name.get()
+            if branch_name:
+                steps.append({'kind': 'create_branch', 'name': branch_name,
+                              'base': self.selected_base_item()})
+        
+        # 2. Execute merge
+        if self.enable_merge.get():
+            any_operation_enabled = True
+            selected_branches = [branch for branch, var in self.merge_vars['branch'].items() 
+                               if var.get()]
+            selected_tags = [tag for tag, var in self.merge_vars['tag'].items() 
+                           if var.get()]
+            if not selected_branches and not selected_tags:
+                messagebox.showwarning("Warning", "Please select at least one branch or tag")
+                return None
+            steps.extend({'kind': 'merge_branch', 'name': branch} for branch in selected_branches)
+            steps.extend({'kind': 'merge_tag', 'name': tag} for tag in selected_tags)
+        
+        # 3. Create tag and push it
+        if self.enable_tag_creation.get():
+            any_operation_enabled = True
+            tag_name = self.final_tag_name.get()
+            if tag_name:
+                steps.append({'kind': 'create_tag', 'name': tag_name})
+                steps.append({'kind': 'push_tag', 'name': tag_name})
+        
+        # Check if any operation is enabled
+        if not any_operation_enabled:
+            messagebox.showwarning("Warning", "No operations were selected")
+            return None
+        return steps
+
+    @tracer.traced()
     def execute_operations(self):
         """Execute all selected operations"""
         try:
-            operations_executed = []
-            any_operation_enabled = False
-            self.last_merged_info = None  # Add class attribute to store the latest merge information
-            
-            # 1. Create branch
-            if self.enable_branch_creation.get():
-                any_operation_enabled = True
-                branch_name = self.final_branch_name.get()
-                if branch_name:
-                    self.create_branch()
-                    operations_executed.append(f"Created branch '{branch_name}'")
-            
-            # 2. Execute merge
-            if self.enable_merge.get():
-                any_operation_enabled = True
-                self.last_merged_info = self.merge_branches()  # Save merge information
-                if self.last_merged_info:
-                    operations_executed.append(f"Merged {len(self.last_merged_info)} items")
-            
-            # 3. Create tag
-            if self.enable_tag_creation.get():
-                any_operation_enabled = True
-                tag_name = self.final_tag_name.get()
-                if tag_name:
-                    self.create_tag()
-                    operations_executed.append(f"Created tag '{tag_name}'")
+            # An unfinished run would be lost by starting over
+            checkpoint = self.update_resume_state()
+            if checkpoint and not messagebox.askyesno(
+                    "Unfinished Operations",
+                    f"The last run did not finish:\n\n{checkpoint.describe()}\n\n"
+                    "Discard it and execute the selected operations?"):
+                return
             
-            # Check if any operation is enabled
-            if not any_operation_enabled:
-                messagebox.showwarning("Warning", "No operations were selected")
+            steps = self.plan_operations()
+            if not steps:
                 return
+            if checkpoint:
+                checkpoint.discard()
             
-            # Show execution result
-            if operations_executed:
-                success_message = "\n".join(operations_executed)
-                self.log_operation("Executed operations:\n" + success_message)
-                self.update_status("All selected operations completed successfully", success=True)
-                messagebox.showinfo("Success", "Operations completed successfully")
+            checkpoint = OperationCheckpoint.plan(self.operation_checkpoint_path(),
+                                                  self.repo_context.path, steps)
+            checkpoint.record_head(self.repo)
+            checkpoint.save()
+            self.run_operations(checkpoint)
             
         except Exception as e:
             error_msg = str(e)
@@ -1486,6 +2683,187 @@ class GitEventManager:
             self.update_status("Failed to execute operations", success=False)
             messagebox.showerror("Error", f"Failed to execute operations: {error_msg}")
 
+    def resume_operations(self):
+        """Continue the last run from its first incomplete step"""
+        try:
+            checkpoint = self.update_resume_state()
+            if checkpoint is None:
+                messagebox.showinfo("Resume", "There are no unfinished operations to resume")
+                return
+            if not checkpoint.head_matches(self.repo):
+                if not messagebox.askyesno("Confirm",
+                                           "The repository has changed since the last completed step "
+                                           f"(expected {checkpoint.head_branch or 'detached HEAD'} at "
+                                           f"{(checkpoint.head_sha or '')[:8]}). Resume anyway?"):
+                    return
+            
+            self.log_operation("Resuming operations", checkpoint.describe())
+            self.run_operations(checkpoint)
+            
+        except Exception as e:
+            error_msg = str(e)
+            self.log_operation(f"Error resuming operations: {error_msg}")
+            self.update_status("Failed to resume operations", success=False)
+            messagebox.showerror("Error", f"Failed to resume operations: {error_msg}")
+
+    def run_operation_step(self, step, prepared=None):
+        """Run one checkpointed step and return its result
+
+        prepared is the result of the step's worker task, the commit
+        metadata of a merge or the remote's object of a pushed tag.
+        """
+        kind = step['kind']
+        if kind == 'create_branch':
+            self.create_branch(step['base'], step['name'])
+        elif kind in ('merge_branch', 'merge_tag'):
+            return self.merge_item(step['name'], is_tag=(kind == 'merge_tag'), info=prepared)
+        elif kind == 'create_tag':
+            self.create_tag(step['name'])
+        elif kind == 'push_tag':
+            self.push_tag(step['name'], remote_object=prepared)
+        else:
+            raise ValueError(f"Unknown operation: {kind}")
+        return None
+
+    def rollback_step(self, step, state, held_locks=()):
+        """Undo a cancelled step, e.g. abort its merge or delete its branch"""
+        try:
+            actions = pipeline.rollback(self.repo, state, step['kind'], step['name'], held_locks)
+            if actions:
+                self.log_operation("Rolled back: " + ", ".join(actions))
+        except Exception as e:
+            self.log_operation(f"Error rolling back {step['kind']} {step['name']}: {str(e)}")
+            messagebox.showerror("Rollback Error",
+                                 f"Failed to roll back the cancelled step: {str(e)}\n\n"
+                                 "Check the repository state before resuming.")
+
+    def build_operation_graph(self, checkpoint):
+        """Build the task graph of the incomplete steps of a checkpoint
+
+        Steps run on the Tk thread in checkpoint order, they share the
+        working tree. Worker tasks collect the commit metadata of every
+        merge, writing it to the commit table, and check the remote before
+        a tag push, while the steps before them run.
+        """
+        graph = TaskGraph("Execute operations")
+        path = self.repo_context.path
+        previous = None
+        info_tasks = []
+        for index, step in enumerate(checkpoint.steps):
+            if step['status'] not in (PENDING, FAILED):
+                continue
+            after = [previous] if previous else []
+            prepared = None
+            if step['kind'] in ('merge_branch', 'merge_tag'):
+                prepared = graph.add(f"Commit info '{step['name']}'", functools.partial(
+                    self.collect_commit_info, path, step['name'], step['kind'] == 'merge_tag')).name
+                info_tasks.append(prepared)
+            elif step['kind'] == 'push_tag':
+                prepared = graph.add(f"Check remote for tag '{step['name']}'", functools.partial(
+                    self.check_remote_tag, path, step['name'])).name
+            if prepared:
+                after.append(prepared)
+            previous = graph.add(checkpoint.describe_step(step), functools.partial(
+                self.run_step_task, checkpoint, index, graph, prepared), after, on_main=True).name
+        if info_tasks and self.repo_context.repo_id:
+            table = self.commit_table(self.repo_context.repo_id)
+            graph.add("Store commit metadata", lambda: table.store(
+                [graph[name].result for name in info_tasks if graph[name].result]), info_tasks)
+        return graph
+
+    def collect_commit_info(self, path, name, is_tag):
+        """Return the merge information of a branch or tag, None if it cannot be collected ahead"""
+        try:
+            return pipeline.commit_info(self.workspace.handles.get(path), name, is_tag=is_tag)
+        except Exception as e:
+            # The merge step collects it again and reports the error
+            print(f"Error collecting commit info of {name}: {str(e)}")
+            return None
+        finally:
+            self.workspace.handles.release_thread()
+
+    def check_remote_tag(self, path, tag_name):
+        """Pre-flight check of a tag push: the remote is reachable, return where it has the tag"""
+        try:
+            return pipeline.remote_tag(self.workspace.handles.get(path), tag_name)
+        finally:
+            self.workspace.handles.release_thread()
+
+    def run_step_task(self, checkpoint, index, graph, prepared):
+        """Run one checkpointed step as a task, raising if the run has to stop"""
+        step = checkpoint.steps[index]
+        state = pipeline.capture_state(self.repo)
+        operation = None
+        try:
+            with self.cancellable(pipeline.STEP_OPERATIONS.get(step['kind'], step['kind'])) as operation:
+                result = self.run_operation_step(step, graph[prepared].result if prepared else None)
+        except OperationCancelled as e:
+            # Stop the run and undo what the interrupted step left behind
+            error_msg = str(e)
+            self.log_operation(f"Stopped: {checkpoint.describe_step(step)}: {error_msg}")
+            self.update_status(f"Cancelled: {checkpoint.describe_step(step)}", success=False)
+            self.rollback_step(step, state, operation.held_locks if operation else ())
+            checkpoint.mark(index, FAILED, error=error_msg)
+            raise
+        except Exception as e:
+            error_msg = str(e)
+            self.log_operation(f"Error: {checkpoint.describe_step(step)}: {error_msg}")
+            self.update_status(f"Failed: {checkpoint.describe_step(step)}", success=False)
+            if step['kind'] in ('merge_branch', 'merge_tag'):
+                kind = "tag" if step['kind'] == 'merge_tag' else "branch"
+                if messagebox.askyesno("Error", 
+                                     f"Failed to merge {kind} {step['name']}. Continue with remaining items?"):
+                    checkpoint.mark(index, SKIPPED, error=error_msg)
+                    return SKIPPED
+            checkpoint.mark(index, FAILED, error=error_msg)
+            raise
+        checkpoint.mark(index, DONE, repo=self.repo, result=result)
+        return DONE
+
+    def run_operations(self, checkpoint):
+        """Run the incomplete steps of a checkpoint, saving it after every step"""
+        graph = self.build_operation_graph(checkpoint)
+        with self.cancel_enabled():
+            graph.run(self.step_executor, wait_hook=self.wait_for_git)
+        self.last_schedule = graph
+        
+        # A step a failed worker task kept from running, e.g. a push whose pre-flight check failed
+        index = checkpoint.next_step()
+        if index is not None and checkpoint.steps[index]['status'] == PENDING:
+            task = graph[checkpoint.describe_step(checkpoint.steps[index])]
+            if task.status == TASK_SKIPPED:
+                self.log_operation(f"Error: {task.name}: {task.error}")
+                checkpoint.mark(index, FAILED, error=task.error)
+        self.log_operation("Schedule", graph.chart())
+        
+        # Event scope covers the whole run, including steps completed before a resume
+        bases = [step['base'] for step in checkpoint.steps
+                 if step['kind'] == 'create_branch' and step['status'] == DONE]
+        if bases:
+            self.current_base_branch = bases[0]
+        self.last_merged_info = checkpoint.results('merge_branch', 'merge_tag') or None
+        # Record the created names now, refreshing the refs below moves the name previews on
+        self.created_branch = checkpoint.created('create_branch')
+        self.created_tag = checkpoint.created('create_tag')
+        
+        # Update ref snapshot, lists and labels once for the whole run
+        self.refresh_local_refs(update_ui=True)
+        self.update_push_labels()
+        
+        if checkpoint.complete:
+            checkpoint.discard()
+            self.log_operation("Executed operations:\n" + checkpoint.describe())
+            self.update_status("All selected operations completed successfully", success=True)
+            messagebox.showinfo("Success", "Operations completed successfully")
+        else:
+            step = checkpoint.steps[checkpoint.next_step()]
+            self.log_operation("Operations stopped, completed steps are saved", checkpoint.describe())
+            messagebox.showerror("Error",
+                                 f"Failed to execute operations at: {checkpoint.describe_step(step)}\n"
+                                 f"{step['error']}\n\n"
+                                 "Completed steps are saved, use Resume to continue from this step.")
+        self.update_resume_state()
+
     def create_push_section(self, parent):
         """Create Push operations area"""
         push_frame = ttk.LabelFrame(parent, text="4. Push to Remote")
@@ -1527,8 +2905,8 @@ class GitEventManager:
             self.push_branch_label.config(text=current_branch)
             self.push_branch_var.set(True)
             
-            # Update tag label
-            tag_name = self.final_tag_name.get()
+            # Update tag label, the tag the last run created
+            tag_name = self.created_tag
             if tag_name:
                 self.push_tag_label.config(text=tag_name)
                 self.push_tag_var.set(True)
@@ -1540,6 +2918,7 @@ class GitEventManager:
             self.log_operation(f"Error updating push labels: {str(e)}")
             self.update_status("Failed to update push labels", success=False)
 
+    @tracer.traced()
     def push_to_remote(self):
         """Push selected branches and tags to remote"""
         try:
@@ -1551,7 +2930,9 @@ class GitEventManager:
                 current_branch = self.repo.active_branch.name
                 try:
                     # Use --set-upstream to push the current branch
-                    self.repo.git.push('--set-upstream', remote.name, current_branch)
+                    progress = TransferProgress("push", remote.name)
+                    with self.cancellable("push", progress), supervisor.reporting(progress):
+                        self.repo.git.push('--progress', '--set-upstream', remote.name, current_branch)
                     pushed_items.append(f"branch '{current_branch}'")
                     self.log_operation(f"Pushed branch {current_branch} to remote with upstream")
                 except Exception as branch_error:
@@ -1560,10 +2941,12 @@ class GitEventManager:
             
             # Push tag
             if self.push_tag_var.get():
-                tag_name = self.final_tag_name.get()
+                tag_name = self.created_tag
                 if tag_name:
                     try:
-                        remote.push(tag_name)
+                        progress = TransferProgress("push", remote.name)
+                        with self.cancellable("push", progress):
+                            pipeline.push_tag(self.repo, tag_name, progress)
                         pushed_items.append(f"tag '{tag_name}'")
                         self.log_operation(f"Pushed tag {tag_name} to remote")
                     except Exception as tag_error:
@@ -1586,19 +2969,40 @@ class GitEventManager:
             self.update_status("Failed to push to remote", success=False)
             messagebox.showerror("Error", f"Failed to push to remote: {error_msg}")
 
+    def daemon_call(self, method, **params):
+        """Call the daemon if it is running, return None if it is not or failed"""
+        if self.daemon is None:
+            return None
+        try:
+            return self.daemon.call(method, **params)
+        except DaemonError as e:
+            # Stop asking a daemon that went away
+            self.log_operation(f"Daemon unavailable, continuing without it: {str(e)}")
+            self.daemon.close()
+            self.daemon = None
+            return None
+
     def check_git_config(self):
         """Check and set Git user information"""
         try:
-            # Use git.Git() instead of self.repo.git
-            git_cmd = git.Git()
-            
-            # Check if user information is configured
-            try:
-                user_name = git_cmd.config('--get', 'user.name')
-                user_email = git_cmd.config('--get', 'user.email')
-            except git.exc.GitCommandError:
-                user_name = ''
-                user_email = ''
+            config = self.daemon_call('config')
+            if config is not None and not (config['user_name'] and config['user_email']):
+                # Configured since the daemon cached it, e.g. by the dialog below
+                config = self.daemon_call('config', refresh=True)
+            if config is not None:
+                user_name = config['user_name']
+                user_email = config['user_email']
+            else:
+                # Global configuration needs no repository, traced like every git call
+                git_cmd = TracedGit()
+                
+                # Check if user information is configured
+                try:
+                    user_name = git_cmd.config('--get', 'user.name')
+                    user_email = git_cmd.config('--get', 'user.email')
+                except git.exc.GitCommandError:
+                    user_name = ''
+                    user_email = ''
             
             # If not configured, show configuration dialog
             if not user_name or not user_email:
@@ -1642,8 +3046,8 @@ class GitEventManager:
                 return
             
             try:
-                # Use git.Git() instead of self.repo.git
-                git_cmd = git.Git()
+                # Global configuration needs no repository, traced like every git call
+                git_cmd = TracedGit()
                 
                 # Set global Git configuration
                 git_cmd.config('--global', 'user.name', name)
@@ -1694,7 +3098,9 @@ class GitEventManager:
         )
         if path:
             self.events_path.set(path)
-            self.load_all_events()  # Reload events
+            # Partitions of all open repositories now live elsewhere
+            self.reload_event_partitions()
+            self.start_repo_watcher()  # Watch the new events directory
 
 if __name__ == "__main__":
     app = GitEventManager()
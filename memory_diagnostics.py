@@ -0,0 +1,243 @@
+"""Memory diagnostics: tracemalloc snapshots and counts of Tk and git objects
+
+tracemalloc is started on demand from the Diagnostics window, or at
+startup with GIT_EVENT_TRACEMALLOC=<frames>. Snapshots list the top
+allocation sites, and comparing two snapshots shows what grew in
+between, e.g. across a few repository switches. Tk widgets and variables
+are counted by the application attribute that owns them, and live
+git.Repo objects are compared with the open repository handles, so
+objects that outlive their owner show up without a debugger.
+"""
+import gc
+import linecache
+import os
+import time
+import tkinter as tk
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+import git
+
+# Allocations of the profiler itself and of the import machinery are noise
+IGNORED_FILES = (tracemalloc.__file__, linecache.__file__, "<frozen importlib._bootstrap>",
+                 "<frozen importlib._bootstrap_external>", "<unknown>")
+
+
+class MemorySnapshot:
+    """One tracemalloc snapshot with when and why it was taken"""
+
+    def __init__(self, label, snapshot, traced):
+        self.label = label
+        self.snapshot = snapshot
+        self.taken_at = datetime.now()
+        self.traced = traced   # (current, peak) traced bytes
+
+    @property
+    def title(self):
+        return f"{self.taken_at.strftime('%H:%M:%S')} {self.label}".rstrip()
+
+
+class MemoryProfiler:
+    """Takes tracemalloc snapshots and reports top and growing allocation sites
+
+    Only the first snapshot, the baseline, and the last max_snapshots are
+    kept, since a snapshot holds every traced allocation.
+    """
+
+    def __init__(self, frames=10, max_snapshots=5):
+        self.frames = frames
+        self.max_snapshots = max_snapshots
+        self.baseline = None
+        self.snapshots = []
+
+    @property
+    def tracing(self):
+        return tracemalloc.is_tracing()
+
+    def start(self, frames=None):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames or self.frames)
+
+    def traced_memory(self):
+        """Return (current, peak) traced bytes"""
+        return tracemalloc.get_traced_memory()
+
+    def stop(self):
+        tracemalloc.stop()
+        self.baseline = None
+        self.snapshots = []
+
+    def take(self, label=""):
+        """Take a snapshot, starting tracemalloc if needed"""
+        self.start()
+        gc.collect()
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, pattern) for pattern in IGNORED_FILES])
+        taken = MemorySnapshot(label, snapshot, self.traced_memory())
+        if self.baseline is None:
+            self.baseline = taken
+        else:
+            self.snapshots.append(taken)
+            del self.snapshots[:-self.max_snapshots]
+        return taken
+
+    def all_snapshots(self):
+        return ([self.baseline] if self.baseline else []) + self.snapshots
+
+    def top(self, taken, limit=25, key_type='lineno'):
+        """Return (site, size, count) of the largest allocation sites of a snapshot"""
+        stats = taken.snapshot.statistics(key_type)
+        return [(format_site(stat.traceback), stat.size, stat.count) for stat in stats[:limit]]
+
+    def growth(self, old, new, limit=25, key_type='lineno'):
+        """Return (site, size diff, count diff, size) of the sites that grew most between two snapshots"""
+        stats = new.snapshot.compare_to(old.snapshot, key_type)
+        stats = [stat for stat in stats if stat.size_diff > 0]
+        return [(format_site(stat.traceback), stat.size_diff, stat.count_diff, stat.size)
+                for stat in stats[:limit]]
+
+
+def format_site(traceback):
+    frame = traceback[0]
+    return f"{os.path.basename(frame.filename)}:{frame.lineno}"
+
+
+def format_bytes(size):
+    sign = "-" if size < 0 else ""
+    size = abs(size)
+    for unit in ('B', 'KiB', 'MiB'):
+        if size < 1024:
+            return f"{sign}{size:.0f} {unit}" if unit == 'B' else f"{sign}{size:.1f} {unit}"
+        size /= 1024
+    return f"{sign}{size:.1f} GiB"
+
+
+def attribute_owners(owner, types):
+    """Map id() of the objects of the given types referenced by an object's attributes to the attribute
+
+    Follows dicts, lists and tuples one level deep per attribute, e.g.
+    merge_vars['branch'] -> 'merge_vars[branch]'.
+    """
+    owners = {}
+
+    def visit(value, name, depth):
+        if isinstance(value, types):
+            owners.setdefault(id(value), name)
+        elif depth < 2 and isinstance(value, dict):
+            for key, item in list(value.items()):
+                visit(item, f"{name}[{key}]" if isinstance(item, dict) else name, depth + 1)
+        elif depth < 2 and isinstance(value, (list, tuple)):
+            for item in value:
+                visit(item, name, depth + 1)
+
+    for name, value in list(vars(owner).items()):
+        visit(value, name, 0)
+    return owners
+
+
+def widget_counts(root, owner):
+    """Count the widgets under root by owning attribute of owner and by class
+
+    A widget belongs to the nearest ancestor an attribute refers to, or
+    to its toplevel window.
+    """
+    owners = attribute_owners(owner, tk.Misc)
+    counts = Counter()
+    stack = [root]
+    while stack:
+        widget = stack.pop()
+        stack.extend(widget.winfo_children())
+        ancestor = widget
+        name = None
+        while ancestor is not None and name is None:
+            if isinstance(ancestor, (tk.Tk, tk.Toplevel)):
+                name = f"window '{ancestor.title()}'"
+            else:
+                name = owners.get(id(ancestor))
+            ancestor = ancestor.master
+        counts[(name or "unknown", widget.winfo_class())] += 1
+    return counts
+
+
+def variable_counts(owner, interp=None):
+    """Count live Tk variables by owning attribute of owner and by class
+
+    Variables no attribute refers to are counted as unowned, they are
+    usually held by widgets of a closed window or by a stale cache. With
+    an interpreter, the number of Tcl global variables is returned too,
+    so variables leaked on the Tcl side show up as well.
+    """
+    owners = attribute_owners(owner, tk.Variable)
+    counts = Counter()
+    for obj in gc.get_objects():
+        if isinstance(obj, tk.Variable):
+            counts[(owners.get(id(obj), "unowned"), type(obj).__name__)] += 1
+    tcl_globals = None
+    if interp is not None:
+        tcl_globals = len(interp.splitlist(interp.call('info', 'globals')))
+    return counts, tcl_globals
+
+
+def repo_counts(handles):
+    """Count live git.Repo objects by working directory next to the open handles
+
+    Repository objects beyond the open handles are leaked: something
+    still refers to a handle that was released.
+    """
+    gc.collect()
+    live = Counter()
+    for obj in gc.get_objects():
+        if isinstance(obj, git.Repo):
+            live[os.path.normpath(obj.working_dir or obj.git_dir)] += 1
+    stats = handles.stats()
+    open_handles = Counter(row['path'] for row in stats['handles'])
+    rows = []
+    for path in sorted(set(live) | set(open_handles)):
+        rows.append({'path': path, 'live': live[path], 'open': open_handles[path],
+                     'leaked': max(0, live[path] - open_handles[path])})
+    return rows
+
+
+class MemoryReport:
+    """Text report of the object counts and the latest snapshot growth, for saving"""
+
+    def __init__(self, profiler, widgets, variables, tcl_globals, repos):
+        self.created_at = time.time()
+        self.profiler = profiler
+        self.widgets = widgets
+        self.variables = variables
+        self.tcl_globals = tcl_globals
+        self.repos = repos
+
+    def to_text(self, limit=25):
+        lines = [f"Memory report {datetime.fromtimestamp(self.created_at).strftime('%Y-%m-%d %H:%M:%S')}"]
+        if self.profiler.tracing:
+            current, peak = self.profiler.traced_memory()
+            lines.append(f"Traced memory: {format_bytes(current)} (peak {format_bytes(peak)})")
+        snapshots = self.profiler.all_snapshots()
+        if snapshots:
+            latest = snapshots[-1]
+            lines.append("")
+            lines.append(f"Top allocation sites ({latest.title}):")
+            for site, size, count in self.profiler.top(latest, limit):
+                lines.append(f"  {format_bytes(size):>12}  {count:>8}  {site}")
+        if len(snapshots) > 1:
+            old, new = snapshots[0], snapshots[-1]
+            lines.append("")
+            lines.append(f"Growth from {old.title} to {new.title}:")
+            for site, size_diff, count_diff, size in self.profiler.growth(old, new, limit):
+                lines.append(f"  {format_bytes(size_diff):>12}  {count_diff:>+8}  {site}")
+        lines.append("")
+        lines.append("Widgets:")
+        for (owner, cls), count in self.widgets.most_common():
+            lines.append(f"  {count:>8}  {owner} {cls}")
+        lines.append("")
+        lines.append(f"Variables (Tcl globals: {self.tcl_globals if self.tcl_globals is not None else 'unknown'}):")
+        for (owner, cls), count in self.variables.most_common():
+            lines.append(f"  {count:>8}  {owner} {cls}")
+        lines.append("")
+        lines.append("Repository objects (live/open/leaked):")
+        for row in self.repos:
+            lines.append(f"  {row['live']}/{row['open']}/{row['leaked']}  {row['path']}")
+        return "\n".join(lines)
@@ -0,0 +1,175 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from tracing import TracedGit, tracer
+
+# for-each-ref learned %(ahead-behind:<committish>) in git 2.41
+AHEAD_BEHIND_VERSION = (2, 41)
+
+
+def has_commit_graph(repo):
+    """Check whether the repository has a commit-graph file with generation numbers"""
+    info_dir = os.path.join(repo.common_dir, 'objects', 'info')
+    return (os.path.exists(os.path.join(info_dir, 'commit-graph')) or
+            os.path.isdir(os.path.join(info_dir, 'commit-graphs')))
+
+
+class MergeAnalysis:
+    """Merged state and ahead/behind counts of every ref relative to one HEAD"""
+
+    def __init__(self, head_sha):
+        self.head_sha = head_sha
+        self.merged = set()   # Full ref names whose commit is contained in HEAD
+        self.counts = {}      # Full ref name -> (ahead, behind), behind may be None
+        self.method = ""
+        self.commit_graph = False
+
+    def is_merged(self, ref):
+        return ref in self.merged
+
+    def counts_for(self, ref):
+        """Return (ahead, behind) for a full ref name, or None if not analyzed"""
+        return self.counts.get(ref)
+
+
+class MergeAnalyzer:
+    """Bulk merged and ahead/behind analysis, cached per HEAD sha
+
+    Counts only depend on HEAD and the ref's commit, so results are cached
+    by commit sha below each HEAD. Refs moving to known commits and
+    re-rendering the merge list cost no git calls.
+
+    The analysis is read-only: it only reports whether a commit-graph
+    exists, unless write_commit_graph opts in to writing a missing one.
+    """
+
+    def __init__(self, max_heads=16, max_workers=4, write_commit_graph=False):
+        self.max_heads = max_heads
+        self.max_workers = max_workers
+        self.write_commit_graph = write_commit_graph
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # (common dir, HEAD sha) -> {commit sha: (ahead, behind)}
+        self._graph_checked = set()  # Common dirs whose commit-graph was checked
+
+    def analyze(self, repo, snapshot):
+        """Return a MergeAnalysis for the refs of a snapshot"""
+        head_sha = snapshot.head_sha
+        analysis = MergeAnalysis(head_sha)
+        if not head_sha:
+            return analysis
+        with tracer.span("merge analysis", "app", refs=len(snapshot.ref_shas)):
+            analysis.commit_graph = self._ensure_commit_graph(repo)
+            key = (os.path.normpath(repo.common_dir), head_sha)
+            with self._lock:
+                cached = self._cache.pop(key, {})
+                self._cache[key] = cached
+                while len(self._cache) > self.max_heads:
+                    self._cache.popitem(last=False)
+
+            if repo.git.version_info[:2] >= AHEAD_BEHIND_VERSION:
+                analysis.method = "for-each-ref ahead-behind"
+                commits = self._count_with_for_each_ref(repo, snapshot, cached)
+            else:
+                analysis.method = "rev-list --left-right --count"
+                commits = self._count_with_rev_list(repo, snapshot, head_sha, cached)
+
+            for ref, commit in commits.items():
+                counts = cached.get(commit)
+                if counts is None:
+                    continue
+                analysis.counts[ref] = counts
+                if counts[0] == 0:
+                    analysis.merged.add(ref)
+        return analysis
+
+    def _tracked_patterns(self, snapshot):
+        return snapshot.patterns()
+
+    def _count_with_for_each_ref(self, repo, snapshot, cached):
+        """Count every ref in one for-each-ref call"""
+        output = repo.git.for_each_ref(
+            '--format=%(objectname)%09%(*objectname)%09%(ahead-behind:HEAD)%09%(refname)',
+            *self._tracked_patterns(snapshot))
+        commits = {}
+        for line in output.splitlines():
+            # Only annotated tags have a peeled object name, and refs to
+            # trees or blobs have an empty ahead-behind field
+            sha, peeled, counts, ref = line.split('\t')
+            commit = peeled or sha
+            commits[ref] = commit
+            if counts:
+                ahead, behind = counts.split(' ')
+                with self._lock:
+                    cached[commit] = (int(ahead), int(behind))
+        return commits
+
+    def _count_with_rev_list(self, repo, snapshot, head_sha, cached):
+        """Mark merged refs in one call, then count the unmerged commits
+
+        Refs already contained in HEAD are found with a single
+        for-each-ref --merged (the bulk form of git branch --merged) and
+        are 0 ahead. Only the remaining distinct commits need a
+        rev-list --left-right --count, run a few at a time.
+        """
+        output = repo.git.for_each_ref('--format=%(objectname) %(*objectname) %(refname)',
+                                       *self._tracked_patterns(snapshot))
+        commits = {}
+        for line in output.splitlines():
+            sha, peeled, ref = line.split(' ')
+            commits[ref] = peeled or sha
+
+        with self._lock:
+            missing = {commit for commit in commits.values() if commit not in cached}
+        if not missing:
+            return commits
+
+        merged_refs = repo.git.for_each_ref('--merged', head_sha, '--format=%(refname)',
+                                            *self._tracked_patterns(snapshot)).splitlines()
+        merged_commits = {commits[ref] for ref in merged_refs if ref in commits}
+        with self._lock:
+            for commit in merged_commits & missing:
+                cached[commit] = (0, None)
+        unmerged = sorted(missing - merged_commits)
+
+        def count(commit):
+            # GitPython handles are not shared between threads, each call gets its own git
+            git = TracedGit(repo.working_dir)
+            try:
+                left, right = git.rev_list('--left-right', '--count', f"{commit}...{head_sha}").split()
+            except Exception:
+                return commit, None  # Not a commit, e.g. a tag of a tree
+            return commit, (int(left), int(right))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for commit, counts in executor.map(count, unmerged):
+                if counts is not None:
+                    with self._lock:
+                        cached[commit] = counts
+        return commits
+
+    def _ensure_commit_graph(self, repo):
+        """Report whether a commit-graph exists, writing a missing one once if opted in
+
+        Generation numbers in the commit-graph speed up the reachability
+        walks; writing one changes the repository, so it is off by default.
+        """
+        common_dir = os.path.normpath(repo.common_dir)
+        if has_commit_graph(repo) or not self.write_commit_graph:
+            return has_commit_graph(repo)
+        with self._lock:
+            if common_dir in self._graph_checked:
+                return False
+            self._graph_checked.add(common_dir)
+        try:
+            if repo.git.config('--get', 'core.commitGraph', with_exceptions=False) == 'false':
+                return False
+            repo.git.commit_graph('write', '--reachable')
+        except Exception as e:
+            print(f"Error writing commit-graph: {str(e)}")
+        return has_commit_graph(repo)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
@@ -0,0 +1,32 @@
+import re
+
+
+def build_base_name(prefix, date, custom):
+    """Build a branch or tag base name from its naming fields
+
+    Returns an empty string when the prefix is 'custom' and no custom
+    suffix was entered.
+    """
+    if prefix == 'custom':
+        return custom
+    base_name = f"{prefix}_{date}"
+    if custom:
+        base_name = f"{base_name}_{custom}"
+    return base_name
+
+
+def next_available_name(base_name, existing_names):
+    """Return base_name, or base_name with the next free '.N' suffix if it is taken"""
+    if base_name not in existing_names:
+        return base_name
+
+    # Find the largest number among similar names
+    pattern = re.compile(f"^{re.escape(base_name)}\\.(\\d+)$")
+    max_number = 0
+    for name in existing_names:
+        match = pattern.match(name)
+        if match:
+            max_number = max(max_number, int(match.group(1)))
+
+    # Use the next number
+    return f"{base_name}.{max_number + 1}"
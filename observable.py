@@ -0,0 +1,153 @@
+"""Observable values, derived values and effects with batched notification
+
+Reading a value inside a derived value or an effect records a dependency.
+Changing a value only marks what depends on it as dirty and schedules one
+flush (with Tk, through after_idle), so several changes made for one user
+action, e.g. a key press writing a variable that a trace and a binding
+both used to react to, are coalesced. On flush every dirty effect runs
+once, and each derived value it reads is recomputed at most once.
+"""
+
+
+class Observable:
+    """A value whose readers are notified when it changes"""
+
+    def __init__(self, store, value=None, name=""):
+        self.store = store
+        self.name = name
+        self.dependents = set()
+        self._value = value
+
+    def get(self):
+        self.store._track(self)
+        return self._value
+
+    def set(self, value):
+        if value == self._value:
+            return
+        self._value = value
+        self.store._changed(self)
+
+
+class Derived:
+    """A value computed from other values, recomputed lazily after they change"""
+
+    def __init__(self, store, func, name=""):
+        self.store = store
+        self.func = func
+        self.name = name
+        self.sources = set()
+        self.dependents = set()
+        self.dirty = True
+        self.computations = 0
+        self._value = None
+
+    def get(self):
+        self.store._track(self)
+        if self.dirty:
+            self._value = self.store._evaluate(self)
+            self.dirty = False
+            self.computations += 1
+        return self._value
+
+
+class Effect:
+    """A function rerun on flush when a value it read has changed"""
+
+    def __init__(self, store, func, name, order):
+        self.store = store
+        self.func = func
+        self.name = name
+        self.order = order
+        self.sources = set()
+        self.runs = 0
+
+
+class Store:
+    """Dependency graph of observables, derived values and effects
+
+    schedule is called with the flush function when the first change of a
+    batch arrives, e.g. root.after_idle. Without it, flush() has to be
+    called explicitly.
+    """
+
+    def __init__(self, schedule=None, max_rounds=10):
+        self.schedule = schedule
+        self.max_rounds = max_rounds
+        self.effects = []
+        self.flushes = 0
+        self._active = []       # Derived values and effects being evaluated
+        self._pending = set()   # Effects to run on the next flush
+        self._scheduled = False
+
+    def value(self, value=None, name=""):
+        return Observable(self, value, name)
+
+    def variable(self, variable, name=""):
+        """Return an observable mirroring a tk.Variable, written through a single trace"""
+        observable = Observable(self, variable.get(), name)
+        variable.trace_add("write", lambda *args: observable.set(variable.get()))
+        return observable
+
+    def derived(self, func, name=""):
+        return Derived(self, func, name)
+
+    def effect(self, func, name=""):
+        """Register a function to run on the next flush and whenever its inputs change"""
+        effect = Effect(self, func, name, len(self.effects))
+        self.effects.append(effect)
+        self._pending.add(effect)
+        self._request_flush()
+        return effect
+
+    def flush(self):
+        """Run the effects whose inputs changed, in registration order"""
+        self._scheduled = False
+        rounds = 0
+        # Effects may change values again, e.g. selecting the only list entry
+        while self._pending and rounds < self.max_rounds:
+            rounds += 1
+            effects = sorted(self._pending, key=lambda effect: effect.order)
+            self._pending.clear()
+            for effect in effects:
+                effect.runs += 1
+                try:
+                    self._evaluate(effect)
+                except Exception as e:
+                    print(f"Error in {effect.name or 'effect'}: {str(e)}")
+        if self._pending:
+            print(f"Stopped flushing after {rounds} rounds, effects keep changing their inputs")
+            self._pending.clear()
+        self.flushes += 1
+
+    def _request_flush(self):
+        if not self._scheduled and self.schedule is not None:
+            self._scheduled = True
+            self.schedule(self.flush)
+
+    def _track(self, node):
+        if self._active:
+            consumer = self._active[-1]
+            consumer.sources.add(node)
+            node.dependents.add(consumer)
+
+    def _evaluate(self, consumer):
+        # Dependencies are recorded afresh, so branches not taken are dropped
+        for source in consumer.sources:
+            source.dependents.discard(consumer)
+        consumer.sources = set()
+        self._active.append(consumer)
+        try:
+            return consumer.func()
+        finally:
+            self._active.pop()
+
+    def _changed(self, node):
+        for dependent in list(node.dependents):
+            if isinstance(dependent, Effect):
+                self._pending.add(dependent)
+            elif not dependent.dirty:
+                dependent.dirty = True
+                self._changed(dependent)
+        if self._pending:
+            self._request_flush()
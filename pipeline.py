@@ -0,0 +1,270 @@
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from git.exc import GitCommandError
+
+from git_supervisor import OperationCancelled, supervisor
+
+# Supervisor operation (and so timeout) of each checkpointed step kind
+STEP_OPERATIONS = {
+    'create_branch': "checkout",
+    'merge_branch': "merge",
+    'merge_tag': "merge",
+    'create_tag': "tag",
+    'push_tag': "push"
+}
+
+
+# Suffix of remote branches in lists and events before they named their remote,
+# it stands for the default remote
+LEGACY_REMOTE = "remote"
+
+
+def split_remote_suffix(name):
+    """Split a branch list entry into (branch name, remote name or None)
+
+    Remote branches are listed as '<branch> (<remote>)'; ref names cannot
+    contain spaces, so the suffix is never part of a branch name.
+    """
+    branch, separator, rest = name.partition(' (')
+    if not separator or not rest.endswith(')'):
+        return name, None
+    return branch, rest[:-1]
+
+
+def strip_remote_suffix(name):
+    """Remove the ' (<remote>)' display suffix from a branch name"""
+    return split_remote_suffix(name)[0]
+
+
+def remote_display_name(branch, remote_name):
+    """Return the list entry of a remote branch"""
+    return f"{branch} ({remote_name})"
+
+
+def entry_remote(repo, name):
+    """Return the remote of a branch list entry, None for local branches"""
+    remote_name = split_remote_suffix(name)[1]
+    if remote_name == LEGACY_REMOTE and LEGACY_REMOTE not in [remote.name for remote in repo.remotes]:
+        return repo.remote().name
+    return remote_name
+
+
+def base_revision(repo, name):
+    """Return what to check out for a base list entry
+
+    Branches of the default remote are checked out by name, so git
+    creates the local tracking branch as before; branches of other remotes
+    as <remote>/<branch>, since a local branch may have the same name.
+    """
+    remote_name = entry_remote(repo, name)
+    branch = strip_remote_suffix(name)
+    if remote_name is None or remote_name == repo.remote().name:
+        return branch
+    return f"{remote_name}/{branch}"
+
+
+def commit_info(repo, name, is_tag=False):
+    """Collect the merge information recorded in events for a branch or tag"""
+    if is_tag:
+        commit = repo.tags[name].commit
+        display_name = f"tag:{name}"
+    else:
+        display_name = name
+        remote_name = entry_remote(repo, name)
+        if remote_name is not None:
+            commit = repo.remote(remote_name).refs[strip_remote_suffix(name)].commit
+        else:
+            commit = repo.heads[name].commit
+
+    return {
+        'name': display_name,
+        'commit_id': commit.hexsha[:8],  # Only take the first 8 digits
+        'commit': commit.hexsha,  # Key of the partition's commit table
+        'commit_message': commit.message.strip(),
+        'commit_author': commit.author.name,
+        'commit_date': datetime.fromtimestamp(commit.committed_date).strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+
+def merge_target(repo, name):
+    """Return the revision to pass to git merge for a merge list entry"""
+    remote_name = entry_remote(repo, name)
+    if remote_name is not None:
+        return f"{remote_name}/{strip_remote_suffix(name)}"
+    return name
+
+
+def create_branch(repo, base_item, new_branch_name):
+    """Check out the base item and create a new branch on it"""
+    repo.git.checkout(base_item)
+    repo.git.checkout('-b', new_branch_name)
+
+
+def create_branch_at(repo, start_point, new_branch_name):
+    """Create and check out a new branch at a start point without checking out the start point itself"""
+    repo.git.checkout('-b', new_branch_name, start_point)
+
+
+def merge_ref(repo, name, is_tag=False, info=None):
+    """Merge one branch or tag with --no-ff and return its merge information
+
+    info is collected unless given, e.g. by a worker ahead of the merge. A
+    failed merge is aborted before the error is raised again.
+    """
+    if info is None:
+        info = commit_info(repo, name, is_tag=is_tag)
+    try:
+        repo.git.merge(name if is_tag else merge_target(repo, name), '--no-ff')
+    except OperationCancelled:
+        raise  # No more git commands in a cancelled operation, see rollback
+    except Exception:
+        try:
+            repo.git.merge('--abort')
+        except Exception as abort_error:
+            print(f"Error aborting merge: {str(abort_error)}")
+        raise
+    return info
+
+
+def create_tag(repo, tag_name, push=True):
+    """Create a tag on HEAD and optionally push it to the remote"""
+    repo.create_tag(tag_name)
+    if push:
+        push_tag(repo, tag_name)
+
+
+def push_tag(repo, tag_name, progress=None):
+    """Push one tag to the remote, streaming git's progress to a RemoteProgress if given"""
+    # Through git push itself, so the push is supervised and a rejection raises
+    if progress is not None:
+        with supervisor.reporting(progress):
+            repo.git.push('--progress', repo.remote().name, tag_name)
+    else:
+        repo.git.push(repo.remote().name, tag_name)
+
+
+def remote_tag(repo, tag_name):
+    """Return the object a tag points to on the remote, None if the remote has no such tag"""
+    ref = f"refs/tags/{tag_name}"
+    for line in repo.git.ls_remote('--tags', repo.remote().name, ref).splitlines():
+        sha, _, name = line.partition('\t')
+        if name == ref:
+            return sha
+    return None
+
+
+def check_tag_push(repo, tag_name, remote_object):
+    """Raise ValueError if the remote has the tag on another object, its push would be rejected"""
+    if remote_object and remote_object != repo.tags[tag_name].object.hexsha:
+        raise ValueError(f"Tag {tag_name} already exists on {repo.remote().name} at {remote_object[:8]}")
+
+
+def resolve_commit(repo, rev):
+    """Return the sha of the commit a revision points to, peeling annotated tags"""
+    return repo.git.rev_parse('--verify', f"{rev}^{{commit}}")
+
+
+def merge_message(repo, name, is_tag=False):
+    """Return the message git merge would write for a merge list entry"""
+    if is_tag:
+        return f"Merge tag '{name}'"
+    if entry_remote(repo, name) is not None:
+        return f"Merge remote-tracking branch '{merge_target(repo, name)}'"
+    return f"Merge branch '{name}'"
+
+
+def merge_commit(repo, head_sha, name, is_tag=False):
+    """Merge a branch or tag into a commit without a working tree and return the new commit
+
+    The equivalent of git merge --no-ff built with git merge-tree
+    --write-tree and git commit-tree, so nothing is checked out. A ref
+    already contained in head_sha returns head_sha, a conflict raises
+    ValueError naming the conflicting files.
+    """
+    target_sha = resolve_commit(repo, name if is_tag else merge_target(repo, name))
+    if repo.is_ancestor(target_sha, head_sha):
+        return head_sha
+    command = ['--write-tree', '--name-only', '--no-messages', head_sha, target_sha]
+    status, output, error = repo.git.merge_tree(*command, with_extended_output=True, with_exceptions=False)
+    if status == 1:
+        # A conflict, the conflicting files follow the tree id
+        files = [line for line in output.splitlines()[1:] if line]
+        raise ValueError(f"Merging {name} conflicts in: {', '.join(files)}")
+    if status != 0:
+        raise GitCommandError(['git', 'merge-tree'] + command, status, error)
+    tree = output.splitlines()[0]
+    return repo.git.commit_tree(tree, '-p', head_sha, '-p', target_sha, '-m', merge_message(repo, name, is_tag))
+
+
+def update_refs(repo, updates):
+    """Create refs in one git update-ref --stdin transaction, all of them or none
+
+    updates is a list of (full ref name, sha). Fails if any ref exists.
+    """
+    commands = "start\n" + "".join(f"create {ref} {sha}\n" for ref, sha in updates) + "commit\n"
+    with tempfile.TemporaryFile() as istream:
+        istream.write(commands.encode('utf-8'))
+        istream.seek(0)
+        repo.git.update_ref('--stdin', istream=istream)
+
+
+def push_refs(repo, refs, progress=None):
+    """Push several refs to the remote with one git push"""
+    if progress is not None:
+        with supervisor.reporting(progress):
+            repo.git.push('--progress', repo.remote().name, *refs)
+    else:
+        repo.git.push(repo.remote().name, *refs)
+
+
+def capture_state(repo):
+    """Record HEAD and the checked out branch before a step, for rollback"""
+    return {
+        'head_sha': repo.head.commit.hexsha,
+        'branch': None if repo.head.is_detached else repo.active_branch.name,
+        'branches': [head.name for head in repo.heads],
+        'tags': [tag.name for tag in repo.tags],
+        'started_at': time.time()
+    }
+
+
+def rollback(repo, state, kind, name, held_locks=()):
+    """Undo what a cancelled step left behind and return the actions taken
+
+    A merge in progress is aborted, a branch or tag created by the step is
+    deleted and HEAD is moved back to the recorded branch and commit. A
+    pushed tag cannot be taken back from the remote and is left alone.
+    held_locks are the lock files the step's git had open when it was
+    terminated, see SupervisedOperation.held_locks.
+    """
+    actions = []
+    # A killed git may not have removed its index lock, one held by any
+    # other process is left alone
+    lock_path = os.path.join(repo.git_dir, 'index.lock')
+    held = {os.path.realpath(path) for path in held_locks}
+    if os.path.exists(lock_path) and os.path.realpath(lock_path) in held:
+        os.remove(lock_path)
+        actions.append("removed stale index.lock")
+    if os.path.exists(os.path.join(repo.git_dir, 'MERGE_HEAD')):
+        repo.git.merge('--abort')
+        actions.append("aborted merge")
+
+    branch = None if repo.head.is_detached else repo.active_branch.name
+    if branch != state['branch']:
+        repo.git.checkout(state['branch'] or state['head_sha'])
+        actions.append(f"checked out {state['branch'] or state['head_sha'][:8]}")
+    if repo.head.commit.hexsha != state['head_sha']:
+        # Keeps local changes, refuses if they would be overwritten
+        repo.git.reset('--keep', state['head_sha'])
+        actions.append(f"reset {state['branch'] or 'HEAD'} to {state['head_sha'][:8]}")
+
+    if kind == 'create_branch' and name in repo.heads and name not in state['branches']:
+        repo.git.branch('-D', name)
+        actions.append(f"deleted branch {name}")
+    elif kind == 'create_tag' and name in repo.tags and name not in state['tags']:
+        repo.delete_tag(name)
+        actions.append(f"deleted tag {name}")
+    return actions
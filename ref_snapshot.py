@@ -0,0 +1,232 @@
+import copy
+import time
+
+from sort_keys import natural_key, version_key
+
+
+class RefSnapshot:
+    """Point-in-time view of a repository's branches and tags
+
+    Built from a single for-each-ref call so refreshing a repository with
+    many refs costs one subprocess instead of one object per ref. Every
+    remote's branches are kept in their own refs/remotes/<remote>
+    namespace; those of the default remote are listed unless a local
+    branch has their name, those of other remotes (upstream, mirrors)
+    always, since merging upstream's main is what they are there for.
+    """
+
+    def __init__(self):
+        self.remote_name = ""       # Default remote
+        self.remote_names = []      # Every remote, the default one first
+        self.current_branch = ""    # Empty when HEAD is detached
+        self.head_sha = ""
+        self.branches = []          # Local branches except the current one
+        self.remote_branches = []   # Listed remote branches as <remote>/<branch>
+        self.tags = []
+        self.ref_shas = {}          # Full ref name -> object sha
+        self.commit_dates = None    # Full ref name -> committer timestamp, loaded on demand
+        self.taken_at = 0.0
+        self._orders = {}           # (kind, sort mode) -> ordered full ref names
+
+    @classmethod
+    def capture(cls, repo, remote_name=None):
+        """Read all refs of a repository into a new snapshot"""
+        snapshot = cls()
+        if remote_name is None:
+            remote_name = repo.remote().name if repo.remotes else ""
+        snapshot.remote_name = remote_name
+        snapshot.remote_names = ([remote_name] if remote_name else []) + sorted(
+            remote.name for remote in repo.remotes if remote.name != remote_name)
+
+        try:
+            snapshot.current_branch = repo.active_branch.name
+        except TypeError:
+            # Detached HEAD
+            snapshot.current_branch = ""
+        snapshot.head_sha = repo.head.commit.hexsha if repo.head.is_valid() else ""
+
+        output = repo.git.for_each_ref('--format=%(objectname) %(refname)', *snapshot.patterns())
+        snapshot._load_refs(output.splitlines())
+        snapshot._rebuild_lists()
+        snapshot.taken_at = time.time()
+        return snapshot
+
+    # Fields exchanged with the daemon, see to_dict
+    FIELDS = ('remote_name', 'remote_names', 'current_branch', 'head_sha', 'branches', 'remote_branches',
+              'tags', 'ref_shas', 'taken_at')
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a snapshot sent by the daemon"""
+        snapshot = cls()
+        for field in cls.FIELDS:
+            if field in data:
+                setattr(snapshot, field, data[field])
+        if 'remote_names' not in data:
+            # Daemon of an older version, tracking the default remote only
+            snapshot.remote_names = [snapshot.remote_name] if snapshot.remote_name else []
+            snapshot._rebuild_lists()
+        return snapshot
+
+    def patterns(self):
+        """Return the for-each-ref patterns of the refs the snapshot tracks"""
+        return ['refs/heads', 'refs/tags'] + [f"refs/remotes/{name}" for name in self.remote_names]
+
+    def split_remote_ref(self, ref):
+        """Return (remote, branch) of a full remote branch ref name, None if no tracked remote has it"""
+        # Longest remote name first, remote names may contain slashes
+        for remote_name in sorted(self.remote_names, key=len, reverse=True):
+            prefix = f"refs/remotes/{remote_name}/"
+            if ref.startswith(prefix):
+                return remote_name, ref[len(prefix):]
+        return None
+
+    def updated(self, repo, ref_names=(), head_changed=False):
+        """Return a copy of the snapshot with only the given refs re-read
+
+        Used for targeted invalidation when a watcher reports which loose refs
+        changed, instead of re-reading every ref.
+        """
+        snapshot = copy.copy(self)
+        snapshot.ref_shas = dict(self.ref_shas)
+        snapshot.commit_dates = None
+        snapshot._orders = {}
+
+        if head_changed:
+            try:
+                snapshot.current_branch = repo.active_branch.name
+            except TypeError:
+                snapshot.current_branch = ""
+            snapshot.head_sha = repo.head.commit.hexsha if repo.head.is_valid() else ""
+
+        ref_names = [ref for ref in ref_names if snapshot._is_tracked(ref)]
+        if ref_names:
+            # Refs missing from the output were deleted
+            for ref in ref_names:
+                snapshot.ref_shas.pop(ref, None)
+            output = repo.git.for_each_ref('--format=%(objectname) %(refname)', *ref_names)
+            snapshot._load_refs(output.splitlines())
+
+        if snapshot.current_branch:
+            snapshot.head_sha = snapshot.ref_shas.get(f"refs/heads/{snapshot.current_branch}",
+                                                      snapshot.head_sha)
+
+        snapshot._rebuild_lists()
+        snapshot.taken_at = time.time()
+        return snapshot
+
+    def _is_tracked(self, ref):
+        """Check whether a full ref name belongs to the snapshot"""
+        if ref.startswith('refs/heads/') or ref.startswith('refs/tags/'):
+            return True
+        return self.split_remote_ref(ref) is not None
+
+    def _load_refs(self, lines):
+        """Read for-each-ref output lines into the ref table"""
+        for line in lines:
+            if ' ' not in line:
+                continue
+            sha, ref = line.split(' ', 1)
+            self.ref_shas[ref] = sha
+
+    def _rebuild_lists(self):
+        """Sort the ref table into branches, remote branches and tags"""
+        local = []
+        remote = []
+        tags = []
+        for ref in self.ref_shas:
+            if ref.startswith('refs/heads/'):
+                local.append(ref[len('refs/heads/'):])
+            elif ref.startswith('refs/tags/'):
+                tags.append(ref[len('refs/tags/'):])
+            else:
+                split = self.split_remote_ref(ref)
+                if split is not None and split[1] != 'HEAD':
+                    remote.append(split)
+
+        local_set = set(local)
+        self.branches = [b for b in local if b != self.current_branch]
+        self.remote_branches = [f"{remote_name}/{b}" for remote_name, b in remote
+                                if remote_name != self.remote_name or
+                                (b not in local_set and b != self.current_branch)]
+        self.tags = tags
+
+    def all_branch_names(self):
+        """Return every local and remote branch name, including the current branch"""
+        names = set(self.branches)
+        # New branches are pushed to the default remote, only its names are taken
+        names.update(branch for remote_name, branch in
+                     (self.split_remote_ref(f"refs/remotes/{name}") for name in self.remote_branches)
+                     if remote_name == self.remote_name)
+        if self.current_branch:
+            names.add(self.current_branch)
+        return names
+
+    def branch_sha(self, name):
+        """Return the sha of a local branch, falling back to its remote branch"""
+        sha = self.ref_shas.get(f"refs/heads/{name}")
+        if sha is None and self.remote_name:
+            sha = self.ref_shas.get(f"refs/remotes/{self.remote_name}/{name}")
+        return sha
+
+    def tag_sha(self, name):
+        return self.ref_shas.get(f"refs/tags/{name}")
+
+    def branch_refs(self):
+        """Return the full ref names of the listed local and remote branches"""
+        return ([f"refs/heads/{name}" for name in self.branches] +
+                [f"refs/remotes/{name}" for name in self.remote_branches])
+
+    def tag_refs(self):
+        return [f"refs/tags/{name}" for name in self.tags]
+
+    def display_name(self, ref):
+        """Return the list entry of a full ref name, remote branches with their remote as suffix"""
+        if ref.startswith('refs/heads/'):
+            return ref[len('refs/heads/'):]
+        if ref.startswith('refs/tags/'):
+            return ref[len('refs/tags/'):]
+        remote_name, branch = self.split_remote_ref(ref)
+        return f"{branch} ({remote_name})"
+
+    def load_commit_dates(self, repo):
+        """Read the committer date of every ref in one for-each-ref call"""
+        output = repo.git.for_each_ref(
+            '--format=%(committerdate:unix) %(*committerdate:unix) %(refname)', *self.patterns())
+        dates = {}
+        for line in output.splitlines():
+            # Annotated tags carry the date of the tagged commit in the peeled field
+            date, peeled_date, ref = line.split(' ')
+            dates[ref] = int(peeled_date or date or 0)
+        self.commit_dates = dates
+
+    def ordered(self, kind, mode="version", repo=None):
+        """Return the branch or tag refs in a sort mode, sorting once per snapshot
+
+        Modes are 'version' (natural, semver aware), 'name' (plain string)
+        and 'date' (newest commit first, needs repo to load the dates once).
+        """
+        order = self._orders.get((kind, mode))
+        if order is not None:
+            return order
+
+        refs = self.branch_refs() if kind == "branches" else self.tag_refs()
+        names = {ref: self.display_name(ref) for ref in refs}
+        if mode == "name":
+            keys = names
+        else:
+            # Remote branches sort by their name, the suffix only breaks ties
+            bare = {ref: name.split(' (')[0] for ref, name in names.items()}
+            if mode == "date":
+                if self.commit_dates is None:
+                    self.load_commit_dates(repo)
+                dates = self.commit_dates
+                keys = {ref: (-dates.get(ref, 0), natural_key(bare[ref]), names[ref]) for ref in refs}
+            else:
+                keys = {ref: (version_key(bare[ref]), names[ref]) for ref in refs}
+        order = sorted(refs, key=keys.__getitem__)
+        self._orders[(kind, mode)] = order
+        return order
@@ -0,0 +1,141 @@
+import os
+import threading
+
+from tracing import TracedRepo
+
+
+def helper_process_count(repo):
+    """Count the live persistent cat-file processes of a repository handle"""
+    count = 0
+    for cmd in (repo.git.cat_file_header, repo.git.cat_file_all):
+        proc = getattr(cmd, 'proc', None)
+        if proc is not None and proc.poll() is None:
+            count += 1
+    return count
+
+
+def child_process_count():
+    """Count the direct child processes of this process, or None if unknown
+
+    Reads /proc, so it is only available on Linux.
+    """
+    pid = os.getpid()
+    try:
+        entries = os.listdir('/proc')
+    except OSError:
+        return None
+    count = 0
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", 'r') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name may contain spaces, fields after it are fixed
+        fields = stat.rsplit(')', 1)[-1].split()
+        if len(fields) > 1 and fields[1] == str(pid):
+            count += 1
+    return count
+
+
+class RepoHandleManager:
+    """Hands out one repository handle per thread and repository path
+
+    GitPython handles keep persistent cat-file processes and object caches
+    and must not be shared between threads. Handles are created lazily,
+    and closed when their repository is released or their thread has
+    exited, which terminates the helper processes.
+    """
+
+    def __init__(self, repo_class=TracedRepo):
+        self.repo_class = repo_class
+        self._lock = threading.Lock()
+        self._handles = {}  # (path, thread ident) -> (thread name, repo)
+        self.opened = 0
+        self.closed = 0
+
+    def get(self, path):
+        """Return the calling thread's handle for a repository path"""
+        path = os.path.normpath(os.path.abspath(path))
+        key = (path, threading.get_ident())
+        with self._lock:
+            handle = self._handles.get(key)
+        if handle is not None:
+            return handle[1]
+
+        repo = self.repo_class(path)
+        with self._lock:
+            self._handles[key] = (threading.current_thread().name, repo)
+            self.opened += 1
+        return repo
+
+    def release(self, path, current_thread_only=False):
+        """Close the handles of a repository, in all threads or only the calling one
+
+        The repository stays usable, the next get() opens a new handle.
+        """
+        path = os.path.normpath(os.path.abspath(path))
+        ident = threading.get_ident()
+        with self._lock:
+            keys = [key for key in self._handles
+                    if key[0] == path and (not current_thread_only or key[1] == ident)]
+            repos = [self._handles.pop(key)[1] for key in keys]
+        self._close(repos)
+        return len(repos)
+
+    def release_thread(self):
+        """Close every handle owned by the calling thread"""
+        ident = threading.get_ident()
+        with self._lock:
+            keys = [key for key in self._handles if key[1] == ident]
+            repos = [self._handles.pop(key)[1] for key in keys]
+        self._close(repos)
+        return len(repos)
+
+    def reap(self):
+        """Close handles whose thread has exited"""
+        alive = {thread.ident for thread in threading.enumerate()}
+        with self._lock:
+            keys = [key for key in self._handles if key[1] not in alive]
+            repos = [self._handles.pop(key)[1] for key in keys]
+        self._close(repos)
+        return len(repos)
+
+    def close_all(self):
+        with self._lock:
+            repos = [handle[1] for handle in self._handles.values()]
+            self._handles.clear()
+        self._close(repos)
+
+    def _close(self, repos):
+        for repo in repos:
+            try:
+                repo.close()
+            except Exception as e:
+                print(f"Error closing repository handle: {str(e)}")
+        with self._lock:
+            self.closed += len(repos)
+
+    def stats(self):
+        """Return one row per open handle plus totals, for the diagnostics view"""
+        alive = {thread.ident: thread for thread in threading.enumerate()}
+        with self._lock:
+            handles = list(self._handles.items())
+        rows = []
+        for (path, ident), (thread_name, repo) in handles:
+            rows.append({
+                'path': path,
+                'thread': thread_name,
+                'thread_alive': ident in alive,
+                'helper_processes': helper_process_count(repo)
+            })
+        return {
+            'handles': rows,
+            'open_handles': len(rows),
+            'helper_processes': sum(row['helper_processes'] for row in rows),
+            'child_processes': child_process_count(),
+            'opened': self.opened,
+            'closed': self.closed
+        }
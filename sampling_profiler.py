@@ -0,0 +1,162 @@
+"""Sampling profiler for diagnosing slow UI actions in the field
+
+A background thread reads the stack of every other thread with
+sys._current_frames() at a fixed interval and counts identical stacks,
+so the Tk thread and the worker threads are profiled without tracing
+every call. Started from the Tools menu, or at startup with
+GIT_EVENT_PROFILE=<output file> (GIT_EVENT_PROFILE_INTERVAL in
+milliseconds, 10 by default). The counts are written as collapsed stacks,
+one 'thread;outer;...;inner count' line per stack, which flamegraph.pl,
+speedscope and inferno read directly.
+
+Sampling cost is one pass over the threads' frames per interval, with
+frame labels cached per code object; it is measured and reported as
+overhead, so the interval can be raised if it ever shows.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+class SamplingProfiler:
+    """Counts the stacks of all threads sampled at a fixed interval
+
+    With an output path the collapsed stacks are also written every
+    flush_interval seconds, so a hung or killed application still leaves
+    a profile behind.
+    """
+
+    def __init__(self, interval=0.01, max_depth=128, output_path=None, flush_interval=30.0):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.output_path = output_path
+        self.flush_interval = flush_interval
+        self.stacks = Counter()       # Collapsed stack -> samples
+        self.samples = 0              # Sampling passes
+        self.sampling_time = 0.0      # Seconds spent sampling
+        self.started_at = None
+        self.elapsed = 0.0            # Seconds sampled by earlier runs
+        self._labels = {}             # Code object -> frame label
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self.started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and write the output file if there is one"""
+        if not self.running:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.elapsed += time.monotonic() - self.started_at
+        self.started_at = None
+        if self.output_path:
+            self.write(self.output_path)
+
+    def clear(self):
+        with self._lock:
+            self.stacks.clear()
+            self.samples = 0
+            self.sampling_time = 0.0
+            self.elapsed = 0.0
+            if self.started_at is not None:
+                self.started_at = time.monotonic()
+
+    def _run(self):
+        next_flush = time.monotonic() + self.flush_interval
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+                if self.output_path and time.monotonic() >= next_flush:
+                    self.write(self.output_path)
+                    next_flush = time.monotonic() + self.flush_interval
+            except Exception as e:
+                print(f"Error sampling stacks: {str(e)}")
+
+    def sample(self):
+        """Record the current stack of every thread but the sampler's own"""
+        started = time.perf_counter()
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks = []
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            labels = []
+            while frame is not None and len(labels) < self.max_depth:
+                labels.append(self._label(frame.f_code))
+                frame = frame.f_back
+            labels.append(names.get(ident, f"thread-{ident}").replace(";", ":"))
+            stacks.append(";".join(reversed(labels)))
+        with self._lock:
+            self.stacks.update(stacks)
+            self.samples += 1
+            self.sampling_time += time.perf_counter() - started
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            # Semicolons separate the frames of a collapsed stack
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            label = self._labels[code] = label.replace(";", ":")
+        return label
+
+    def duration(self):
+        """Return the seconds sampled so far"""
+        running = time.monotonic() - self.started_at if self.started_at is not None else 0.0
+        return self.elapsed + running
+
+    def overhead(self):
+        """Return the share of wall time spent sampling"""
+        duration = self.duration()
+        return self.sampling_time / duration if duration else 0.0
+
+    def collapsed(self):
+        """Return the collapsed stack lines, most sampled first"""
+        with self._lock:
+            return [f"{stack} {count}" for stack, count in self.stacks.most_common()]
+
+    def write(self, path):
+        """Write the collapsed stacks atomically"""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            f.write("\n".join(self.collapsed()) + "\n")
+        os.replace(path + ".tmp", path)
+
+    def top_functions(self, thread_name=None, limit=20):
+        """Return (frame label, samples) of the innermost frames, optionally of one thread"""
+        counts = Counter()
+        with self._lock:
+            for stack, count in self.stacks.items():
+                frames = stack.split(";")
+                if thread_name is None or frames[0] == thread_name:
+                    counts[frames[-1]] += count
+        return counts.most_common(limit)
+
+    def thread_totals(self):
+        """Return thread name -> samples"""
+        counts = Counter()
+        with self._lock:
+            for stack, count in self.stacks.items():
+                counts[stack.split(";", 1)[0]] += count
+        return counts
+
+    def describe(self):
+        state = "running" if self.running else "stopped"
+        return (f"Sampling profiler {state}: {self.samples} samples over {self.duration():.1f}s, "
+                f"{len(self.stacks)} distinct stacks, overhead {self.overhead() * 100:.2f}%")
@@ -0,0 +1,190 @@
+"""Dependency graph scheduler for the steps of one operation run
+
+A run is a graph of tasks. Tasks that change the working tree or ask the
+user run on the calling (Tk) thread in the order their dependencies
+give, everything else, such as collecting commit metadata or checking
+the remote before a push, runs in worker threads as soon as the tasks it
+depends on are done. Every task records when it ran, so the critical
+path, the chain of tasks that determined how long the run took, can be
+shown afterwards.
+"""
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from tracing import tracer
+
+# Task states
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+class Task:
+    """One unit of work of a graph and what happened when it ran"""
+
+    def __init__(self, name, func, after=(), on_main=False):
+        self.name = name
+        self.func = func
+        self.after = list(after)   # Names of the tasks that must be done first
+        self.on_main = on_main     # Run on the thread calling TaskGraph.run
+        self.status = PENDING
+        self.result = None
+        self.error = ""
+        self.started = None        # Seconds since the run started
+        self.finished = None
+        self.thread_name = ""
+
+    @property
+    def duration(self):
+        if self.started is None or self.finished is None:
+            return 0.0
+        return self.finished - self.started
+
+
+class TaskGraph:
+    """Tasks and their dependencies, run on the calling thread and an executor
+
+    Dependencies must be added before the tasks depending on them, so a
+    graph cannot have cycles. A failed task skips every task depending on
+    it, other tasks still run.
+    """
+
+    def __init__(self, name="run"):
+        self.name = name
+        self.tasks = {}
+        self.origin = None
+        self.elapsed = 0.0
+
+    def __getitem__(self, name):
+        return self.tasks[name]
+
+    def add(self, name, func, after=(), on_main=False):
+        """Add a task running func() once the tasks named in after are done"""
+        if name in self.tasks:
+            raise ValueError(f"Duplicate task: {name}")
+        for dependency in after:
+            if dependency not in self.tasks:
+                raise ValueError(f"Unknown dependency of {name}: {dependency}")
+        task = self.tasks[name] = Task(name, func, after, on_main)
+        return task
+
+    def ready(self, task):
+        return task.status == PENDING and all(self.tasks[name].status == DONE for name in task.after)
+
+    def run(self, executor, wait_hook=None, poll_interval=0.05):
+        """Run every task that can run, return when none is left
+
+        wait_hook is called while the calling thread has nothing to do
+        but wait for worker tasks, e.g. to keep processing Tk events.
+        """
+        self.origin = time.perf_counter()
+        running = {}
+        while True:
+            self._skip_blocked()
+            for task in self.tasks.values():
+                if not task.on_main and self.ready(task):
+                    task.status = RUNNING
+                    running[executor.submit(self._execute, task)] = task
+            task = next((task for task in self.tasks.values() if task.on_main and self.ready(task)), None)
+            if task is not None:
+                self._execute(task)
+                continue
+            if not running:
+                break
+            done, _ = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+            for future in done:
+                del running[future]
+            if not done and wait_hook is not None:
+                try:
+                    wait_hook()
+                except Exception as e:
+                    print(f"Error in wait hook: {str(e)}")
+        self.elapsed = time.perf_counter() - self.origin
+
+    def _execute(self, task):
+        task.status = RUNNING
+        task.thread_name = threading.current_thread().name
+        task.started = time.perf_counter() - self.origin
+        try:
+            with tracer.span(task.name, "scheduler"):
+                task.result = task.func()
+            task.status = DONE
+        except Exception as e:
+            task.error = str(e)
+            task.status = FAILED
+        finally:
+            task.finished = time.perf_counter() - self.origin
+
+    def _skip_blocked(self):
+        """Skip the pending tasks a failed or skipped dependency keeps from running"""
+        changed = True
+        while changed:
+            changed = False
+            for task in self.tasks.values():
+                if task.status != PENDING:
+                    continue
+                blocking = next((self.tasks[name] for name in task.after
+                                 if self.tasks[name].status in (FAILED, SKIPPED)), None)
+                if blocking is not None:
+                    task.status = SKIPPED
+                    task.error = blocking.error if blocking.status == SKIPPED else \
+                        f"{blocking.name} failed: {blocking.error}"
+                    changed = True
+
+    def critical_path(self):
+        """Return the tasks the run waited for, from the first to the one that finished last
+
+        Going back from the last task, each step follows the dependency
+        that finished last, the one the task actually had to wait for.
+        """
+        finished = [task for task in self.tasks.values() if task.finished is not None]
+        if not finished:
+            return []
+        task = max(finished, key=lambda task: task.finished)
+        path = [task]
+        while True:
+            dependencies = [self.tasks[name] for name in task.after if self.tasks[name].finished is not None]
+            if not dependencies:
+                break
+            task = max(dependencies, key=lambda task: task.finished)
+            path.append(task)
+        return path[::-1]
+
+    def waited_for(self, task):
+        """Return the dependency a task waited for last, None if it had none"""
+        dependencies = [self.tasks[name] for name in task.after if self.tasks[name].finished is not None]
+        return max(dependencies, key=lambda task: task.finished) if dependencies else None
+
+    def describe(self):
+        path = self.critical_path()
+        if not path:
+            return f"{self.name}: nothing ran"
+        busy = sum(task.duration for task in self.tasks.values())
+        steps = " -> ".join(f"{task.name} ({task.duration * 1000:.0f} ms)" for task in path)
+        return (f"{self.name}: {self.elapsed * 1000:.0f} ms, {busy * 1000:.0f} ms of work\n"
+                f"Critical path: {steps}")
+
+    def chart(self, width=40):
+        """Return a text timeline of the tasks, critical path tasks marked with *"""
+        critical = {task.name for task in self.critical_path()}
+        tasks = sorted(self.tasks.values(), key=lambda task: (task.started is None, task.started or 0))
+        total = max(self.elapsed, max((task.finished or 0 for task in tasks), default=0), 1e-9)
+        name_width = min(40, max((len(task.name) for task in tasks), default=0))
+        lines = [self.describe()]
+        for task in tasks:
+            bar = [" "] * width
+            if task.started is not None:
+                first = min(width - 1, int(task.started / total * width))
+                last = max(first + 1, min(width, round(task.finished / total * width)))
+                bar[first:last] = ["#" if task.name in critical else "="] * (last - first)
+                timing = f"{task.duration * 1000:7.0f} ms  {task.thread_name}"
+                if task.status == FAILED:
+                    timing += f"  failed: {task.error}"
+            else:
+                timing = f"{task.status:>10}  {task.error}"
+            marker = "*" if task.name in critical else " "
+            lines.append(f"{marker} {task.name[:name_width]:<{name_width}} |{''.join(bar)}| {timing}")
+        return "\n".join(lines)
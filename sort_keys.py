@@ -0,0 +1,29 @@
+import re
+
+# Sort modes offered for branch and tag lists
+SORT_MODES = ("version", "name", "date")
+
+_DIGITS = re.compile(r'(\d+)')
+_VERSION = re.compile(r'^(?P<prefix>.*?)(?P<version>\d+(?:\.\d+)*)'
+                      r'(?:-(?P<pre>[0-9A-Za-z.-]+))?(?:\+[0-9A-Za-z.-]+)?$')
+
+
+def natural_key(name):
+    """Sort key comparing digit runs as numbers, so 'v1.9' sorts before 'v1.10'"""
+    return tuple((0, int(part)) if part.isdigit() else (1, part)
+                 for part in _DIGITS.split(name.lower()) if part)
+
+
+def version_key(name):
+    """Natural sort key that also orders semver pre-releases before their release
+
+    'v2.0.0-rc.1' sorts before 'v2.0.0', which sorts before 'v2.0.1'.
+    Names without a trailing version sort naturally.
+    """
+    match = _VERSION.match(name)
+    if not match:
+        return (natural_key(name), (), 1, ())
+    numbers = tuple(int(part) for part in match.group('version').split('.'))
+    pre = match.group('pre')
+    return (natural_key(match.group('prefix')), numbers,
+            0 if pre else 1, natural_key(pre) if pre else ())
@@ -0,0 +1,59 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+# The modules live in the repository root, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def git_env(monkeypatch, tmp_path):
+    """Run git with a fixed identity and without the user's configuration"""
+    monkeypatch.setenv('GIT_CONFIG_GLOBAL', os.devnull)
+    monkeypatch.setenv('GIT_CONFIG_NOSYSTEM', '1')
+    monkeypatch.setenv('HOME', str(tmp_path))
+    for role in ('AUTHOR', 'COMMITTER'):
+        monkeypatch.setenv(f'GIT_{role}_NAME', 'Test')
+        monkeypatch.setenv(f'GIT_{role}_EMAIL', 'test@example.com')
+
+
+def git(cwd, *args):
+    """Run a git command in cwd and return its stripped output"""
+    return subprocess.run(['git', *args], cwd=cwd, check=True, capture_output=True,
+                          text=True).stdout.strip()
+
+
+def commit(cwd, message, files=None):
+    """Commit files (name -> contents) in a scratch repository, return the commit sha"""
+    for name, content in (files or {}).items():
+        path = os.path.join(cwd, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        git(cwd, 'add', name)
+    git(cwd, 'commit', '-q', '--allow-empty', '-m', message)
+    return git(cwd, 'rev-parse', 'HEAD')
+
+
+@pytest.fixture
+def scratch_repo(tmp_path):
+    """A repository on branch main with one commit"""
+    path = str(tmp_path / "repo")
+    git(str(tmp_path), 'init', '-q', '-b', 'main', path)
+    commit(path, "Initial commit", {'README': "readme\n"})
+    return path
+
+
+@pytest.fixture
+def remote_and_clones(tmp_path, scratch_repo):
+    """A bare repository holding scratch_repo's history and two clones of it"""
+    bare = str(tmp_path / "remote.git")
+    git(str(tmp_path), 'clone', '-q', '--bare', scratch_repo, bare)
+    clones = []
+    for name in ("clone_a", "clone_b"):
+        path = str(tmp_path / name)
+        git(str(tmp_path), 'clone', '-q', bare, path)
+        clones.append(path)
+    return bare, clones
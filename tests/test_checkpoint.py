@@ -0,0 +1,67 @@
+import os
+
+import git as gitpython
+
+from checkpoint import DONE, FAILED, PENDING, SKIPPED, OperationCheckpoint, checkpoint_path
+from conftest import commit
+
+
+def plan(tmp_path, repo_path):
+    steps = [{'kind': 'create_branch', 'name': "feature_x"},
+             {'kind': 'merge_branch', 'name': "fix"},
+             {'kind': 'push_tag', 'name': "v1"}]
+    return OperationCheckpoint.plan(checkpoint_path(str(tmp_path / "checkpoints"), "repo-id"), repo_path, steps)
+
+
+def test_checkpoint_round_trip(tmp_path, scratch_repo):
+    repo = gitpython.Repo(scratch_repo)
+    checkpoint = plan(tmp_path, scratch_repo)
+    checkpoint.record_head(repo)
+    checkpoint.save()
+    checkpoint.mark(0, DONE, repo=repo, result="main")
+    checkpoint.mark(1, FAILED, error="conflict")
+
+    loaded = OperationCheckpoint.load(checkpoint.path)
+    assert loaded.repo_path == scratch_repo
+    assert [step['status'] for step in loaded.steps] == [DONE, FAILED, PENDING]
+    assert loaded.steps[1]['error'] == "conflict"
+    assert loaded.next_step() == 1 and not loaded.complete
+    assert loaded.results('create_branch') == ["main"]
+    assert loaded.head_sha == repo.head.commit.hexsha and loaded.head_branch == "main"
+    assert "2. [failed] Merge branch 'fix': conflict" in loaded.describe()
+
+
+def test_checkpoint_completes_when_no_step_is_left(tmp_path, scratch_repo):
+    checkpoint = plan(tmp_path, scratch_repo)
+    for index, status in enumerate((DONE, SKIPPED, DONE)):
+        checkpoint.mark(index, status)
+    assert checkpoint.complete
+    checkpoint.discard()
+    assert OperationCheckpoint.load(checkpoint.path) is None
+    checkpoint.discard()  # Already gone
+
+
+def test_head_matches_detects_moved_repositories(tmp_path, scratch_repo):
+    repo = gitpython.Repo(scratch_repo)
+    checkpoint = plan(tmp_path, scratch_repo)
+    assert checkpoint.head_matches(repo)  # Nothing recorded yet
+    checkpoint.record_head(repo)
+    assert checkpoint.head_matches(repo)
+    commit(scratch_repo, "Moved on")
+    assert not checkpoint.head_matches(repo)
+    assert os.path.basename(checkpoint.path) == "repo-id.json"
+
+
+def test_created_names_come_from_completed_steps(tmp_path, scratch_repo):
+    steps = [{'kind': 'create_branch', 'name': "feature_1"},
+             {'kind': 'create_tag', 'name': "v1"},
+             {'kind': 'push_tag', 'name': "v1"}]
+    checkpoint = OperationCheckpoint.plan(checkpoint_path(str(tmp_path), "repo-id"), scratch_repo, steps)
+    checkpoint.mark(0, DONE)
+    checkpoint.mark(1, FAILED, error="exists")
+    assert checkpoint.created('create_branch') == "feature_1"
+    assert checkpoint.created('create_tag') == ""
+    # A resumed run keeps the names of the steps done before it
+    resumed = OperationCheckpoint.load(checkpoint.path)
+    resumed.mark(1, DONE)
+    assert (resumed.created('create_branch'), resumed.created('create_tag')) == ("feature_1", "v1")
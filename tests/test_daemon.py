@@ -0,0 +1,70 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from conftest import git
+from daemon import DaemonClient, DaemonError, EventDaemon, serve
+from event_store import partition_path
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    daemon = EventDaemon(str(tmp_path / "events"), str(tmp_path / "daemon_repos.json"), watch=False)
+    yield daemon
+    daemon.close()
+
+
+def test_requests_are_answered_with_results_or_errors(daemon, scratch_repo):
+    assert daemon.handle({'id': 1, 'method': 'ping'})['result']['pid'] == os.getpid()
+    assert daemon.handle({'id': 2, 'method': 'nope'}) == {'id': 2, 'error': "Unknown method: nope"}
+    refs = daemon.handle({'id': 3, 'method': 'refs', 'params': {'path': scratch_repo}})['result']
+    assert refs['current_branch'] == "main" and "refs/heads/main" in refs['ref_shas']
+    failed = daemon.handle({'id': 4, 'method': 'commit', 'params': {'path': scratch_repo, 'rev': "missing"}})
+    assert failed['id'] == 4 and 'error' in failed
+    assert daemon.handle({'id': 5, 'method': 'refs', 'params': {'bogus': 1}})['error']
+    status = daemon.handle({'id': 6, 'method': 'status'})['result']
+    assert status['requests'] == 5 and [repo['path'] for repo in status['repos']] == [scratch_repo]
+
+
+def test_commits_and_events_are_served_from_cache(daemon, scratch_repo):
+    head = git(scratch_repo, 'rev-parse', 'HEAD')
+    info = daemon.commit(scratch_repo, "main")
+    assert info['sha'] == head and info['message'] == "Initial commit"
+    assert daemon.commit(scratch_repo, head) is info
+
+    context = daemon.context_for(scratch_repo)
+    day_dir = os.path.join(partition_path(daemon.events_path, context.repo_id), "2024-01-05")
+    os.makedirs(day_dir)
+    event_file = os.path.join(day_dir, "a.json")
+    with open(event_file, 'w', encoding='utf-8') as f:
+        json.dump({'title': "Release", 'date': "2024-01-05 10:00:00", 'base_branch': "main"}, f)
+    context.event_index.load_file(event_file)
+    [summary] = daemon.events(scratch_repo, query="release")
+    assert summary['title'] == "Release"
+    assert daemon.events(scratch_repo, branch="develop") == []
+
+
+def test_served_over_the_socket_once_per_path(tmp_path):
+    socket_path = str(tmp_path / "d.sock")
+    server = threading.Thread(target=serve, args=(socket_path, str(tmp_path / "events")),
+                              kwargs={'watch': False})
+    server.start()
+    deadline = time.monotonic() + 10
+    while not DaemonClient.running(socket_path):
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    # A second daemon leaves the live socket alone
+    with pytest.raises(DaemonError, match="already running"):
+        serve(socket_path, str(tmp_path / "events"), watch=False)
+    client = DaemonClient(socket_path)
+    assert client.call('ping')['repos'] == 0
+    with pytest.raises(DaemonError, match="Unknown method"):
+        client.call('nope')
+    assert client.call('stop') == {'stopping': True}
+    client.close()
+    server.join(timeout=10)
+    assert not server.is_alive() and not os.path.exists(socket_path)
+    assert not DaemonClient.running(socket_path)
@@ -0,0 +1,74 @@
+import csv
+import json
+
+import pytest
+
+import event_analytics
+from event_analytics import (MERGED_COLUMNS, WEEKLY_COLUMNS, EventColumns, build_report, export_csv,
+                             export_json, most_merged, release_merges, weekly_counts)
+from event_store import GitEvent
+
+
+def event(date, branch="", tag="", merged=(), repo_name="app"):
+    item = GitEvent()
+    item.date = date
+    item.created_branch = branch
+    item.created_tag = tag
+    item.merged_branches = list(merged)
+    item.repo_name = repo_name
+    return item
+
+
+EVENTS = [
+    event("2024-01-01 10:00:00", branch="release_1", merged=["feature (origin)", "fix"]),
+    event("2024-01-03 12:00:00", tag="v1", merged=["feature"]),
+    event("2024-01-09 09:00:00", tag="v2", merged=["fix", "docs"], repo_name="lib"),
+    event("", branch="undated", merged=["feature"]),
+]
+
+
+@pytest.fixture(params=["numpy", "array"])
+def backend(request, monkeypatch):
+    if request.param == "array":
+        monkeypatch.setattr(event_analytics, 'numpy', None)
+    elif event_analytics.numpy is None:
+        pytest.skip("NumPy is not installed")
+    return request.param
+
+
+def test_weekly_counts_skip_undated_events(backend):
+    columns = EventColumns.from_events(EVENTS)
+    assert len(columns) == 4
+    assert weekly_counts(columns) == [
+        {'week': "2024-01-01", 'events': 2, 'branches': 1, 'tags': 1, 'merges': 3},
+        {'week': "2024-01-08", 'events': 1, 'branches': 0, 'tags': 1, 'merges': 2}]
+    since = columns.days[2]
+    assert [row['week'] for row in weekly_counts(columns, since)] == ["2024-01-08"]
+
+
+def test_release_merges_and_most_merged_sources(backend):
+    columns = EventColumns.from_events(EVENTS)
+    assert release_merges(columns) == [
+        {'tag': "v2", 'date': "2024-01-09 09:00:00", 'repository': "lib", 'merges': 2},
+        {'tag': "v1", 'date': "2024-01-03 12:00:00", 'repository': "app", 'merges': 1}]
+    # Local and remote merges of a branch count together, the undated event does not count
+    assert most_merged(columns) == [
+        {'source': "feature", 'merges': 2, 'releases': 1},
+        {'source': "fix", 'merges': 2, 'releases': 1},
+        {'source': "docs", 'merges': 1, 'releases': 1}]
+    assert len(most_merged(columns, limit=1)) == 1
+
+
+def test_report_exports(tmp_path, backend):
+    report = build_report(EventColumns.from_events(EVENTS))
+    assert report['backend'] == backend and report['events'] == 4
+    assert build_report(EventColumns.from_events([]))['weekly'] == []
+    json_path, csv_path = str(tmp_path / "report.json"), str(tmp_path / "merged.csv")
+    export_json(report, json_path)
+    with open(json_path, encoding='utf-8') as f:
+        assert json.load(f)['most_merged'] == report['most_merged']
+    export_csv(report['most_merged'], MERGED_COLUMNS, csv_path)
+    with open(csv_path, encoding='utf-8', newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert rows[0] == {'source': "feature", 'merges': "2", 'releases': "1"}
+    assert set(report['weekly'][0]) == set(WEEKLY_COLUMNS)
@@ -0,0 +1,74 @@
+import json
+import os
+
+import pytest
+
+from event_archive import archive_paths, compact, legacy_event_count, migrate_legacy, read_existing_records
+from event_store import EventIndex, load_archive_events, partition_path, read_archived_events
+
+
+def write_event(directory, date, name, **fields):
+    date_dir = os.path.join(directory, date)
+    os.makedirs(date_dir, exist_ok=True)
+    fields.setdefault('date', f"{date} 12:00:00")
+    with open(os.path.join(date_dir, name), 'w', encoding='utf-8') as f:
+        json.dump(fields, f)
+
+
+@pytest.mark.parametrize("compression", ["gz", "xz"])
+def test_compact_round_trip(tmp_path, compression):
+    partition = partition_path(str(tmp_path), "repo-id")
+    write_event(partition, "2024-01-05", "a.json", title="First", base_branch="main", notes="kept")
+    write_event(partition, "2024-01-20", "b.json", title="Second", base_branch="develop")
+    write_event(partition, "2024-02-01", "c.json", title="Open month")
+
+    result = compact(str(tmp_path), before="2024-02", compression=compression)
+    assert not result.errors and result.removed_files == 2
+    assert sorted(os.listdir(partition)) == ["2024-02-01", "archive"]
+    archive_path, index_path = archive_paths(partition, "2024-01", compression)
+
+    events = load_archive_events(index_path)
+    assert sorted(event.title for event in events) == ["First", "Second"]
+    assert [event.title for event in load_archive_events(index_path, date="2024-01-20")] == ["Second"]
+    assert [event.title for event in load_archive_events(index_path, branch="main")] == ["First"]
+    # Fields outside the summary are read from the archive on access
+    full = {archived.title: event for archived, event in read_archived_events(events)}
+    assert full["First"].notes == "kept"
+
+    index = EventIndex()
+    index.load_all(str(tmp_path))
+    assert sorted(event.title for event in index.events()) == ["First", "Open month", "Second"]
+
+
+def test_compacting_again_merges_new_files(tmp_path):
+    partition = partition_path(str(tmp_path), "repo-id")
+    write_event(partition, "2024-01-05", "a.json", title="First")
+    compact(str(tmp_path), before="2024-02")
+    write_event(partition, "2024-01-06", "b.json", title="Late")
+    result = compact(str(tmp_path), before="2024-02", compression="xz")
+
+    assert result.archives[0][1:] == (1, 2)
+    gz_path, _ = archive_paths(partition, "2024-01", "gz")
+    assert not os.path.exists(gz_path)  # Recompressed as xz
+    _, index_path = archive_paths(partition, "2024-01", "xz")
+    assert sorted(name for name, data in read_existing_records(index_path)) == [
+        "2024-01-05/a.json", "2024-01-06/b.json"]
+
+
+def test_migrate_legacy_moves_files_and_archives(tmp_path):
+    events_path = str(tmp_path)
+    write_event(events_path, "2024-01-05", "a.json", title="Archived")
+    compact(events_path, before="2024-02")
+    write_event(events_path, "2024-03-01", "b.json", title="Loose", repo_name="kept")
+    assert legacy_event_count(events_path) == 2
+
+    result = migrate_legacy(events_path, "repo-id", "repo")
+    assert result.moved == 2 and not result.errors
+    assert legacy_event_count(events_path) == 0
+    assert migrate_legacy(events_path, "repo-id", "repo").moved == 0
+
+    index = EventIndex()
+    index.load_all(partition_path(events_path, "repo-id"))
+    events = {event.title: event for event in index.events()}
+    assert events["Archived"].repo_id == "repo-id" and events["Archived"].repo_name == "repo"
+    assert events["Loose"].repo_name == "kept"
@@ -0,0 +1,71 @@
+import json
+import os
+
+import git as gitpython
+
+from event_log import EVENT_LOG_REF, EventLog, local_event_files
+from event_store import CommitTable
+
+
+def write_event(directory, relative_path, **fields):
+    path = os.path.join(directory, *relative_path.split('/'))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(fields, f)
+
+
+def contents(directory):
+    return sorted(local_event_files(directory).values())
+
+
+def test_conflicting_events_converge(tmp_path, remote_and_clones):
+    bare, (clone_a, clone_b) = remote_and_clones
+    events_a, events_b = str(tmp_path / "events_a"), str(tmp_path / "events_b")
+    write_event(events_a, "2024-01-01/event.json", title="from a")
+    write_event(events_a, "2024-01-02/only_a.json", title="only a")
+    write_event(events_b, "2024-01-01/event.json", title="from b")
+    write_event(events_b, "2024-01-03/only_b.json", title="only b")
+    CommitTable(events_a).store([{'name': 'feature', 'commit': 'a' * 40, 'commit_message': "A"}])
+    CommitTable(events_b).store([{'name': 'fix', 'commit': 'b' * 40, 'commit_message': "B"}])
+
+    log_a, log_b = EventLog(gitpython.Repo(clone_a)), EventLog(gitpython.Repo(clone_b))
+    first = log_a.sync(events_a, 'origin')
+    assert first.pushed and first.exported == 2
+    second = log_b.sync(events_b, 'origin')
+    assert second.merged and second.pushed
+    assert second.conflicts == ["2024-01-01/event.json"]
+    log_a.sync(events_a, 'origin')
+
+    # Both partitions hold all four events, the conflicting path twice
+    assert contents(events_a) == contents(events_b)
+    assert len(contents(events_a)) == 4
+    assert log_a.head() == log_b.head() == gitpython.Repo(bare).git.rev_parse(EVENT_LOG_REF)
+    assert CommitTable(events_a).records() == CommitTable(events_b).records()
+    assert set(CommitTable(events_a).records()) == {'a' * 40, 'b' * 40}
+
+
+def test_sync_without_changes_is_a_no_op(tmp_path, remote_and_clones):
+    bare, (clone_a, clone_b) = remote_and_clones
+    events = str(tmp_path / "events")
+    write_event(events, "2024-01-01/event.json", title="event")
+    log = EventLog(gitpython.Repo(clone_a))
+    log.sync(events, 'origin')
+    head = log.head()
+
+    again = log.sync(events, 'origin')
+    assert again.exported == 0 and again.imported == 0 and not again.pushed
+    assert log.head() == head
+
+
+def test_commit_table_keeps_its_cache_after_own_writes(tmp_path):
+    table = CommitTable(str(tmp_path))
+    table.store([{'name': 'feature', 'commit': 'c' * 40, 'commit_message': "C"}])
+    commits = table._commits
+    table.update({'d' * 40: {'commit_message': "D", 'commit_author': "", 'commit_date': ""}})
+    assert table._commits is commits
+    assert table.get('d' * 40)['commit_message'] == "D"
+    # Another writer's append is still picked up
+    with open(table.path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'sha': 'e' * 40, 'commit_message': "E"}) + "\n")
+    os.utime(table.path, ns=(0, 1))
+    assert table.get('e' * 40)['commit_message'] == "E"
@@ -0,0 +1,73 @@
+import os
+
+import git as gitpython
+
+from conftest import git
+from event_store import CommitTable, EventIndex, partition_path, repo_identity
+
+
+def test_clones_share_the_repository_identity(remote_and_clones):
+    bare, (clone_a, clone_b) = remote_and_clones
+    root = git(clone_a, 'rev-list', '--max-parents=0', 'HEAD')
+    identity = repo_identity(gitpython.Repo(clone_a))
+    assert identity == root[:16]
+    assert repo_identity(gitpython.Repo(clone_b)) == identity
+    assert repo_identity(gitpython.Repo(bare)) == identity
+
+
+def test_empty_repositories_fall_back_to_the_remote_url(tmp_path):
+    first, second = str(tmp_path / "first"), str(tmp_path / "second")
+    for path in (first, second):
+        git(str(tmp_path), 'init', '-q', path)
+        git(path, 'remote', 'add', 'origin', "https://example.com/app.git")
+    identity = repo_identity(gitpython.Repo(first))
+    assert identity.startswith("h") and len(identity) == 16
+    assert repo_identity(gitpython.Repo(second)) == identity
+
+
+def test_identities_are_cached_by_git_directory(tmp_path, scratch_repo):
+    cache_path = str(tmp_path / "ids" / "repo_ids.json")
+    identity = repo_identity(gitpython.Repo(scratch_repo), cache_path)
+    git(scratch_repo, 'commit', '-q', '--amend', '-m', "Rewritten root")
+    # The cached id survives history rewrites, events stay in their partition
+    assert repo_identity(gitpython.Repo(scratch_repo), cache_path) == identity
+    assert repo_identity(gitpython.Repo(scratch_repo)) != identity
+
+
+def test_partition_index_only_covers_its_repository(tmp_path):
+    events_path = str(tmp_path)
+    own, other = partition_path(events_path, "own"), partition_path(events_path, "other")
+    for directory in (own, other):
+        os.makedirs(os.path.join(directory, "2024-01-05"))
+    index = EventIndex()
+    index.load_all(own)
+    assert index.covers(os.path.join(own, "2024-01-05", "a.json"))
+    assert not index.covers(os.path.join(other, "2024-01-05", "a.json"))
+
+
+def test_commit_table_stores_each_commit_once(tmp_path):
+    table = CommitTable(str(tmp_path / "partition"))
+    info = [{'name': 'feature', 'commit': 'a' * 40, 'commit_message': "Add feature",
+             'commit_author': "Test", 'commit_date': "2024-01-05"},
+            {'name': 'v1 (tag)', 'commit': 'a' * 40, 'commit_message': "Add feature",
+             'commit_author': "Test", 'commit_date': "2024-01-05"},
+            {'name': 'legacy', 'short_commit': "bbbbbbb", 'commit_message': "Old"}]
+    references = table.store(info)
+    assert references[0] == {'name': 'feature', 'commit': 'a' * 40}
+    assert references[2] == info[2]
+    assert table.store(info[:1]) == references[:1]
+    with open(table.path, encoding='utf-8') as f:
+        assert len(f.readlines()) == 1
+
+    # Another process reads the same file
+    resolved = CommitTable(str(tmp_path / "partition")).resolve(references + [{'commit': 'c' * 40}])
+    assert resolved[:3] == info
+    assert resolved[3]['commit_message'] == "(unknown)"
+
+
+def test_commit_table_skips_lines_cut_short(tmp_path):
+    table = CommitTable(str(tmp_path))
+    table.store([{'name': 'feature', 'commit': 'a' * 40, 'commit_message': "A"}])
+    with open(table.path, 'a', encoding='utf-8') as f:
+        f.write('{"sha": "bbb')
+    assert set(CommitTable(str(tmp_path)).records()) == {'a' * 40}
@@ -0,0 +1,81 @@
+import threading
+import time
+
+import git as gitpython
+
+from conftest import commit, git
+from fetch_coordinator import FetchCoordinator, FetchResult
+
+
+def push_change(clone, message, tag=None):
+    commit(clone, message)
+    git(clone, 'push', '-q', 'origin', 'HEAD')
+    if tag:
+        git(clone, 'tag', tag)
+        git(clone, 'push', '-q', 'origin', tag)
+
+
+def test_fetches_within_the_ttl_come_from_cache(remote_and_clones):
+    bare, (clone_a, clone_b) = remote_and_clones
+    repo = gitpython.Repo(clone_a)
+    coordinator = FetchCoordinator(ttl=60)
+    assert coordinator.fetch(repo).source == FetchResult.NETWORK
+    push_change(clone_b, "Upstream change")
+    cached = coordinator.fetch(repo)
+    assert cached.source == FetchResult.CACHE and cached.age < 60
+    assert coordinator.fetch(repo, force=True).source == FetchResult.NETWORK
+    assert git(clone_a, 'rev-parse', 'origin/main') == git(clone_b, 'rev-parse', 'HEAD')
+
+
+def test_unchanged_remotes_are_not_fetched_unless_forced(remote_and_clones):
+    bare, (clone_a, clone_b) = remote_and_clones
+    repo = gitpython.Repo(clone_a)
+    coordinator = FetchCoordinator(ttl=0)
+    coordinator.fetch(repo)
+    assert coordinator.fetch(repo).source == FetchResult.UNCHANGED
+    assert coordinator.fetch(repo, force=True).source == FetchResult.NETWORK
+    push_change(clone_b, "Upstream change")
+    result = coordinator.fetch(repo)
+    assert result.source == FetchResult.NETWORK and result.changed_refs == 1
+
+
+def test_fetches_without_tags_never_serve_fetches_with_tags(remote_and_clones):
+    bare, (clone_a, clone_b) = remote_and_clones
+    repo = gitpython.Repo(clone_a)
+    coordinator = FetchCoordinator(ttl=60)
+    push_change(clone_b, "Tagged change", tag="v1")
+    assert coordinator.fetch(repo, tags=False).source == FetchResult.NETWORK
+    assert git(clone_a, 'tag', '--list') == ""
+    # The tags were never fetched, the cached fetch without them does not count
+    assert coordinator.fetch(repo).source == FetchResult.NETWORK
+    assert git(clone_a, 'tag', '--list') == "v1"
+    assert coordinator.fetch(repo, tags=False).source == FetchResult.CACHE
+
+
+def test_concurrent_fetches_share_one_fetch(remote_and_clones, monkeypatch):
+    bare, (clone_a, clone_b) = remote_and_clones
+    repo = gitpython.Repo(clone_a)
+    coordinator = FetchCoordinator(ttl=60)
+    listed = []
+    release = threading.Event()
+    advertised_refs = coordinator.advertised_refs
+
+    def slow_advertised_refs(*args):
+        listed.append(args)
+        release.wait(timeout=10)
+        return advertised_refs(*args)
+
+    monkeypatch.setattr(coordinator, 'advertised_refs', slow_advertised_refs)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(coordinator.fetch(repo))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    while not listed:
+        time.sleep(0.01)
+    time.sleep(0.1)  # Let the other callers find the fetch in flight
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(listed) == 1
+    assert sorted(result.shared for result in results) == [False, True, True]
+    assert {result.source for result in results} == {FetchResult.NETWORK}
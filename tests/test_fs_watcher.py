@@ -0,0 +1,65 @@
+import os
+import queue
+import time
+
+import pytest
+
+from conftest import git
+from fs_watcher import Invalidation, RepoWatcher
+
+
+def collect(invalidations, until, timeout=10):
+    """Merge invalidations from the watcher until until(merged) holds"""
+    merged = Invalidation()
+    deadline = time.monotonic() + timeout
+    while not until(merged):
+        invalidation = invalidations.get(timeout=max(deadline - time.monotonic(), 0.01))
+        merged.refs |= invalidation.refs
+        merged.head |= invalidation.head
+        merged.packed_refs |= invalidation.packed_refs
+        merged.event_files |= invalidation.event_files
+        merged.event_dirs |= invalidation.event_dirs
+        merged.full |= invalidation.full
+    return merged
+
+
+@pytest.mark.parametrize('use_inotify', [True, False], ids=["inotify", "polling"])
+def test_ref_and_event_changes_are_reported(tmp_path, scratch_repo, use_inotify):
+    events_path = str(tmp_path / "events")
+    os.makedirs(os.path.join(events_path, "2024-01-05"))
+    git_dir = os.path.join(scratch_repo, '.git')
+    invalidations = queue.Queue()
+    watcher = RepoWatcher(git_dir, git_dir, events_path, invalidations.put, debounce=0.1,
+                          use_inotify=use_inotify, poll_interval=0.1)
+    watcher.start()
+    try:
+        time.sleep(0.2)  # Polling needs a first pass before the changes
+        git(scratch_repo, 'branch', 'feature')
+        git(scratch_repo, 'checkout', '-q', 'feature')
+        event_file = os.path.join(events_path, "2024-01-05", "event.json")
+        with open(event_file, 'w', encoding='utf-8') as f:
+            f.write("{}")
+        merged = collect(invalidations, lambda m: m.head and m.refs and m.event_files)
+    finally:
+        watcher.stop()
+    assert "refs/heads/feature" in merged.refs
+    assert merged.event_files == {event_file}
+    assert merged.refs_changed and merged.events_changed
+
+
+def test_changes_are_classified_by_path(tmp_path):
+    git_dir, events_path = str(tmp_path / ".git"), str(tmp_path / "events")
+    watcher = RepoWatcher(git_dir, git_dir, events_path, None)
+    for path, is_dir in ((os.path.join(git_dir, 'HEAD'), False),
+                         (os.path.join(git_dir, 'HEAD.lock'), False),
+                         (os.path.join(git_dir, 'packed-refs'), False),
+                         (os.path.join(git_dir, 'refs', 'tags', 'v1'), False),
+                         (os.path.join(events_path, "2024-01-05"), True),
+                         (os.path.join(events_path, "notes.txt"), False)):
+        watcher._classify(path, is_dir, False)
+    pending = watcher._pending
+    assert pending.head and pending.packed_refs and pending.refs == {"refs/tags/v1"}
+    assert pending.event_dirs == {os.path.join(events_path, "2024-01-05")} and not pending.event_files
+    assert pending.describe() == "HEAD, packed-refs, 1 refs, 1 event paths"
+    watcher._classify(None, False, True)
+    assert pending.full
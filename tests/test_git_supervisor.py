@@ -0,0 +1,96 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import git as gitpython
+import pytest
+
+import pipeline
+from git_supervisor import (GitSupervisor, OperationCancelled, OperationTimedOut, SupervisedOperation,
+                            parse_timeouts, subcommand)
+
+# A git command that hangs, git runs the alias in a shell of its process group
+SLOW = ['git', '-c', 'alias.slow=!sleep 30', 'slow']
+
+
+def run(supervisor, path, command):
+    return supervisor.execute(gitpython.Git(path).execute, command, (), {})
+
+
+def test_timeouts_and_subcommands_are_parsed():
+    assert parse_timeouts("fetch=120, push=1.5,broken,merge=x") == {'fetch': 120.0, 'push': 1.5}
+    assert parse_timeouts(None) == {}
+    assert subcommand(SLOW) == "slow"
+    assert subcommand(['git']) == ""
+
+
+def test_commands_time_out_and_are_terminated(scratch_repo):
+    supervisor = GitSupervisor({'slow': 0.3}, grace=1.0)
+    assert run(supervisor, scratch_repo, ['git', 'rev-parse', '--abbrev-ref', 'HEAD']) == "main"
+    start = time.monotonic()
+    with pytest.raises(OperationTimedOut, match="timed out after 0.3s"):
+        run(supervisor, scratch_repo, SLOW)
+    assert time.monotonic() - start < 5
+    assert supervisor.active_operations() == []
+
+
+def test_cancelled_operations_stop_their_commands(scratch_repo):
+    supervisor = GitSupervisor(grace=1.0)
+    errors = []
+
+    def job():
+        with supervisor.operation("fetch"):
+            try:
+                run(supervisor, scratch_repo, SLOW)
+            except OperationCancelled as e:
+                errors.append(e)
+            # Later commands of the cancelled operation do not start
+            try:
+                run(supervisor, scratch_repo, ['git', 'status'])
+            except OperationCancelled as e:
+                errors.append(e)
+
+    thread = threading.Thread(target=job)
+    thread.start()
+    while not supervisor.active_operations():
+        time.sleep(0.01)
+    time.sleep(0.2)
+    assert supervisor.cancel_all() == 1
+    thread.join(timeout=10)
+    assert not thread.is_alive()
+    assert [type(e) for e in errors] == [OperationCancelled, OperationCancelled]
+    assert "Operation 'fetch' cancelled" in str(errors[0])
+
+
+def test_terminated_processes_record_their_lock_files(tmp_path):
+    lock_path = str(tmp_path / "index.lock")
+    holder = subprocess.Popen([sys.executable, '-c', f"f = open({lock_path!r}, 'w'); print(1, flush=True); "
+                               "import time; time.sleep(30)"],
+                              stdout=subprocess.PIPE, start_new_session=True)
+    holder.stdout.readline()
+    operation = SupervisedOperation("merge")
+    operation.add(holder)
+    operation.cancel()
+    assert holder.wait(timeout=10) != 0
+    assert operation.cancelled and operation.held_locks == {lock_path}
+    holder.stdout.close()
+
+
+def test_rollback_only_removes_index_locks_the_step_held(scratch_repo):
+    repo = gitpython.Repo(scratch_repo)
+    state = pipeline.capture_state(repo)
+    repo.git.checkout('-b', 'feature')
+    lock_path = os.path.join(repo.git_dir, 'index.lock')
+    open(lock_path, 'w').close()
+
+    # Held by someone else, e.g. the user's own git, so it is left alone and blocks the rollback
+    with pytest.raises(gitpython.GitCommandError):
+        pipeline.rollback(repo, state, 'create_branch', 'feature')
+    assert os.path.exists(lock_path)
+
+    actions = pipeline.rollback(repo, state, 'create_branch', 'feature', held_locks={lock_path})
+    assert actions == ["removed stale index.lock", "checked out main", "deleted branch feature"]
+    assert not os.path.exists(lock_path)
+    assert repo.active_branch.name == "main" and 'feature' not in repo.heads
@@ -0,0 +1,67 @@
+import os
+import tkinter as tk
+import types
+from collections import Counter
+
+import pytest
+
+from memory_diagnostics import (MemoryProfiler, MemoryReport, attribute_owners, format_bytes, repo_counts,
+                                variable_counts)
+from repo_handles import RepoHandleManager
+
+
+@pytest.fixture
+def profiler():
+    profiler = MemoryProfiler(frames=1, max_snapshots=2)
+    yield profiler
+    profiler.stop()
+
+
+def test_snapshots_keep_the_baseline_and_show_growth(profiler):
+    baseline = profiler.take("start")
+    kept = [bytearray(256 * 1024) for _ in range(4)]
+    for label in ("one", "two", "three"):
+        profiler.take(label)
+    assert [taken.label for taken in profiler.all_snapshots()] == ["start", "two", "three"]
+    assert profiler.baseline is baseline and profiler.tracing
+    site, size_diff, count_diff, size = profiler.growth(baseline, profiler.snapshots[-1])[0]
+    assert site.startswith("test_memory_diagnostics.py:") and size_diff >= 1024 * 1024
+    assert profiler.top(profiler.snapshots[-1], limit=1)[0][0] == site
+    del kept
+
+
+def test_variables_are_counted_by_owning_attribute():
+    interp = tk.Tcl()
+    owner = types.SimpleNamespace(title=tk.StringVar(interp),
+                                  merge_vars={'branch': {'main': tk.BooleanVar(interp)}})
+    stray = tk.StringVar(interp)
+    assert set(attribute_owners(owner, tk.Variable).values()) == {"title", "merge_vars[branch]"}
+    counts, tcl_globals = variable_counts(owner, interp)
+    assert counts[("title", "StringVar")] == 1
+    assert counts[("merge_vars[branch]", "BooleanVar")] == 1
+    assert counts[("unowned", "StringVar")] >= 1
+    assert tcl_globals >= 3
+    del stray
+
+
+def test_repository_objects_beyond_open_handles_are_leaked(scratch_repo):
+    handles = RepoHandleManager()
+    kept = handles.get(scratch_repo)
+    handles.release(scratch_repo)
+    handles.get(scratch_repo)
+    [row] = [row for row in repo_counts(handles) if row['path'] == os.path.normpath(scratch_repo)]
+    assert (row['live'], row['open'], row['leaked']) == (2, 1, 1)
+    handles.close_all()
+    del kept
+
+
+def test_report_text(profiler):
+    profiler.take("start")
+    profiler.take("after")
+    report = MemoryReport(profiler, Counter({("window 'Git'", "Frame"): 2}), Counter(), None, [])
+    text = report.to_text(limit=3)
+    assert "Growth from " in text and "Top allocation sites" in text
+    assert "       2  window 'Git' Frame" in text
+    assert "Variables (Tcl globals: unknown):" in text
+    assert (format_bytes(512), format_bytes(-2048), format_bytes(3 * 1024 ** 3)) == ("512 B", "-2.0 KiB",
+                                                                                     "3.0 GiB")
@@ -0,0 +1,69 @@
+import os
+import types
+
+
+from conftest import commit, git
+from merge_analysis import MergeAnalyzer, has_commit_graph
+from ref_snapshot import RefSnapshot
+from tracing import TracedRepo, tracer
+
+
+def branch_off(path, name, *messages):
+    git(path, 'checkout', '-q', '-b', name, 'main')
+    for message in messages:
+        commit(path, message, {f'{name}.txt': message})
+    git(path, 'checkout', '-q', 'main')
+
+
+def test_counts_and_merged_refs(scratch_repo):
+    branch_off(scratch_repo, 'merged', "Merged work")
+    git(scratch_repo, 'merge', '-q', '--no-ff', '-m', "Merge merged", 'merged')
+    branch_off(scratch_repo, 'feature', "One", "Two")
+    git(scratch_repo, 'tag', '-a', '-m', "Release", 'v1', 'feature')
+    commit(scratch_repo, "Main moved on")
+    repo = TracedRepo(scratch_repo)
+    snapshot = RefSnapshot.capture(repo)
+
+    analysis = MergeAnalyzer().analyze(repo, snapshot)
+    assert analysis.method == "rev-list --left-right --count"
+    assert analysis.merged == {"refs/heads/main", "refs/heads/merged"}
+    assert analysis.counts_for("refs/heads/feature") == (2, 1)
+    # Annotated tags are counted by their commit
+    assert analysis.counts_for("refs/tags/v1") == (2, 1)
+    assert analysis.counts_for("refs/heads/merged")[0] == 0
+    # Read-only unless opted in
+    assert not analysis.commit_graph and not has_commit_graph(repo)
+
+
+def test_results_are_cached_per_head(scratch_repo):
+    branch_off(scratch_repo, 'feature', "One")
+    repo = TracedRepo(scratch_repo)
+    analyzer = MergeAnalyzer()
+    analyzer.analyze(repo, RefSnapshot.capture(repo))
+    tracer.clear()
+    # A new branch on a known commit costs no counting
+    git(scratch_repo, 'branch', 'copy', 'feature')
+    analysis = analyzer.analyze(repo, RefSnapshot.capture(repo))
+    assert analysis.counts_for("refs/heads/copy") == (1, 0)
+    assert not [span for span in tracer.snapshot() if span.name == "git rev-list"]
+
+
+def test_commit_graph_is_written_only_when_opted_in(scratch_repo):
+    repo = TracedRepo(scratch_repo)
+    analysis = MergeAnalyzer(write_commit_graph=True).analyze(repo, RefSnapshot.capture(repo))
+    assert analysis.commit_graph and has_commit_graph(repo)
+
+
+def test_for_each_ref_ahead_behind_output_is_parsed(tmp_path):
+    output = "\n".join(["a" * 40 + "\t\t0 3\trefs/heads/main",
+                        "b" * 40 + "\t" + "c" * 40 + "\t2 1\trefs/tags/v1",
+                        "d" * 40 + "\t\t\trefs/tags/tree"])
+    fake_git = types.SimpleNamespace(version_info=(2, 41, 0), for_each_ref=lambda *args: output)
+    repo = types.SimpleNamespace(git=fake_git, common_dir=str(tmp_path), working_dir=str(tmp_path))
+    snapshot = RefSnapshot()
+    snapshot.head_sha = "a" * 40
+    analysis = MergeAnalyzer().analyze(repo, snapshot)
+    assert analysis.method == "for-each-ref ahead-behind"
+    assert analysis.counts == {"refs/heads/main": (0, 3), "refs/tags/v1": (2, 1)}
+    assert analysis.merged == {"refs/heads/main"}
+    assert not os.path.exists(os.path.join(str(tmp_path), 'objects'))
@@ -0,0 +1,19 @@
+from naming import build_base_name, next_available_name
+
+
+def test_build_base_name():
+    assert build_base_name("feature", "2024.01.05", "") == "feature_2024.01.05"
+    assert build_base_name("feature", "2024.01.05", "login") == "feature_2024.01.05_login"
+    assert build_base_name("custom", "2024.01.05", "hotfix") == "hotfix"
+    assert build_base_name("custom", "2024.01.05", "") == ""
+
+
+def test_next_available_name():
+    assert next_available_name("v1", set()) == "v1"
+    assert next_available_name("v1", {"v1"}) == "v1.1"
+    assert next_available_name("v1", {"v1", "v1.1", "v1.7", "v1.x", "v10.9"}) == "v1.8"
+
+
+def test_next_available_name_escapes_the_base_name():
+    assert next_available_name("a+b", {"a+b", "aab.3"}) == "a+b.1"
+
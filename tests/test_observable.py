@@ -0,0 +1,66 @@
+from observable import Store
+
+
+def test_derived_values_are_recomputed_lazily_once_per_change():
+    store = Store()
+    first, second = store.value(1), store.value(2)
+    total = store.derived(lambda: first.get() + second.get())
+    assert total.get() == 3
+    assert total.get() == 3
+    assert total.computations == 1
+    first.set(10)
+    second.set(20)
+    assert total.computations == 1
+    assert total.get() == 30
+    assert total.computations == 2
+
+
+def test_changes_are_coalesced_into_one_scheduled_flush():
+    scheduled = []
+    store = Store(schedule=scheduled.append)
+    name = store.value("a")
+    seen = []
+    store.effect(lambda: seen.append(name.get()))
+    assert len(scheduled) == 1
+    store.flush()
+    name.set("b")
+    name.set("c")
+    assert len(scheduled) == 2
+    store.flush()
+    assert seen == ["a", "c"]
+
+
+def test_setting_an_equal_value_notifies_nobody():
+    store = Store()
+    value = store.value(5)
+    effect = store.effect(lambda: value.get())
+    store.flush()
+    value.set(5)
+    store.flush()
+    assert effect.runs == 1
+
+
+def test_dependencies_follow_the_branch_taken():
+    store = Store()
+    use_first = store.value(True)
+    first, second = store.value("first"), store.value("second")
+    seen = []
+    store.effect(lambda: seen.append(first.get() if use_first.get() else second.get()))
+    store.flush()
+    second.set("changed")
+    store.flush()
+    assert seen == ["first"]
+    use_first.set(False)
+    store.flush()
+    first.set("ignored")
+    store.flush()
+    assert seen == ["first", "changed"]
+
+
+def test_effects_changing_their_inputs_stop_after_max_rounds():
+    store = Store(max_rounds=3)
+    counter = store.value(0)
+    effect = store.effect(lambda: counter.set(counter.get() + 1))
+    store.flush()
+    assert effect.runs == 3
+    assert store._pending == set()
@@ -0,0 +1,101 @@
+import os
+
+import git as gitpython
+import pytest
+from git.exc import GitCommandError
+
+import pipeline
+from conftest import commit, git
+from fetch_coordinator import FetchCoordinator
+from workspace import PipelineSpec, Workspace
+
+
+@pytest.fixture
+def branches(scratch_repo):
+    """main plus a feature branch adding a file, a branch conflicting with main and a tag"""
+    git(scratch_repo, 'checkout', '-q', '-b', 'feature')
+    commit(scratch_repo, "Add feature", {'feature.txt': "feature\n"})
+    git(scratch_repo, 'tag', '-a', 'v1', '-m', "Version 1")
+    git(scratch_repo, 'checkout', '-q', '-b', 'conflict', 'main')
+    commit(scratch_repo, "Change readme", {'README': "conflict\n"})
+    git(scratch_repo, 'checkout', '-q', 'main')
+    commit(scratch_repo, "Change readme on main", {'README': "main\n"})
+    return gitpython.Repo(scratch_repo)
+
+
+def test_merge_commit_builds_a_merge_without_checking_out(branches):
+    repo = branches
+    head = repo.head.commit.hexsha
+    merged = pipeline.merge_commit(repo, head, 'feature')
+
+    commit_object = repo.commit(merged)
+    assert [parent.hexsha for parent in commit_object.parents] == [head, repo.commit('feature').hexsha]
+    assert commit_object.message.strip() == "Merge branch 'feature'"
+    assert 'feature.txt' in commit_object.tree
+    # Nothing changed in the working tree or HEAD
+    assert repo.head.commit.hexsha == head
+    assert not os.path.exists(os.path.join(repo.working_dir, 'feature.txt'))
+
+
+def test_merge_commit_of_a_tag_and_of_a_merged_ref(branches):
+    repo = branches
+    head = repo.head.commit.hexsha
+    merged = pipeline.merge_commit(repo, head, 'v1', is_tag=True)
+    assert repo.commit(merged).message.strip() == "Merge tag 'v1'"
+    assert repo.commit(merged).parents[1].hexsha == repo.commit('feature').hexsha
+    # Already contained, nothing to merge
+    assert pipeline.merge_commit(repo, merged, 'feature') == merged
+
+
+def test_merge_commit_reports_conflicting_files(branches):
+    with pytest.raises(ValueError, match="README"):
+        pipeline.merge_commit(branches, branches.head.commit.hexsha, 'conflict')
+
+
+def test_update_refs_creates_all_refs_or_none(branches):
+    repo = branches
+    head = repo.head.commit.hexsha
+    pipeline.update_refs(repo, [('refs/heads/batch', head), ('refs/tags/batch-tag', head)])
+    assert repo.commit('batch').hexsha == head and repo.tags['batch-tag'].commit.hexsha == head
+
+    with pytest.raises(GitCommandError):
+        pipeline.update_refs(repo, [('refs/heads/other', head), ('refs/heads/batch', head)])
+    assert 'other' not in repo.heads
+
+
+def test_run_batch_creates_and_pushes_every_spec(tmp_path, remote_and_clones):
+    bare, (clone, _) = remote_and_clones
+    git(clone, 'checkout', '-q', '-b', 'feature')
+    commit(clone, "Add feature", {'feature.txt': "feature\n"})
+    git(clone, 'push', '-q', 'origin', 'feature')
+    git(clone, 'checkout', '-q', 'main')
+
+    specs = []
+    for custom in ("one", "two"):
+        spec = PipelineSpec()
+        spec.create_branch = True
+        spec.branch_prefix = "release"
+        spec.branch_date_suffix = "2024.01.05"
+        spec.branch_custom_suffix = custom
+        spec.merge_branches = ["feature"]
+        spec.create_tag = True
+        spec.tag_prefix = "custom"
+        spec.tag_custom_suffix = "v1"
+        specs.append(spec)
+
+    workspace = Workspace(FetchCoordinator())
+    try:
+        report = workspace.run_batch(workspace.open(clone), specs)
+    finally:
+        workspace.handles.close_all()
+
+    assert not report.failed
+    assert [result.created_branch for result in report.results] == [
+        "release_2024.01.05_one", "release_2024.01.05_two"]
+    # The second spec's tag name was taken by the first one
+    assert [result.created_tag for result in report.results] == ["v1", "v1.1"]
+    remote_refs = git(bare, 'for-each-ref', '--format=%(refname)').splitlines()
+    assert {'refs/heads/release_2024.01.05_one', 'refs/heads/release_2024.01.05_two',
+            'refs/tags/v1', 'refs/tags/v1.1'} <= set(remote_refs)
+    assert git(clone, 'rev-parse', '--abbrev-ref', 'HEAD') == "main"
+    assert not os.path.exists(os.path.join(clone, 'feature.txt'))
@@ -0,0 +1,50 @@
+import threading
+
+from repo_handles import RepoHandleManager, helper_process_count
+
+
+def in_thread(function):
+    results = []
+    thread = threading.Thread(target=lambda: results.append(function()))
+    thread.start()
+    thread.join()
+    return results[0]
+
+
+def test_every_thread_gets_its_own_handle(scratch_repo):
+    handles = RepoHandleManager()
+    repo = handles.get(scratch_repo)
+    assert handles.get(scratch_repo + "/.") is repo
+    other = in_thread(lambda: handles.get(scratch_repo))
+    assert other is not repo
+    assert handles.opened == 2 and handles.stats()['open_handles'] == 2
+    handles.close_all()
+    assert handles.closed == 2
+
+
+def test_released_handles_stop_their_helper_processes(scratch_repo):
+    handles = RepoHandleManager()
+    repo = handles.get(scratch_repo)
+    repo.head.commit.message  # Starts the persistent cat-file processes
+    assert helper_process_count(repo) > 0
+    assert handles.release(scratch_repo, current_thread_only=True) == 1
+    assert helper_process_count(repo) == 0
+    # The next get opens a new handle
+    assert handles.get(scratch_repo) is not repo
+    assert handles.release_thread() == 1
+    assert handles.stats()['open_handles'] == 0
+
+
+def test_handles_of_exited_threads_are_reaped(scratch_repo):
+    handles = RepoHandleManager()
+    handles.get(scratch_repo)
+
+    def use_and_keep():
+        handles.get(scratch_repo).head.commit.message
+
+    in_thread(use_and_keep)
+    stats = handles.stats()
+    assert [row['thread_alive'] for row in stats['handles']].count(False) == 1
+    assert handles.reap() == 1
+    assert handles.stats()['open_handles'] == 1 and handles.stats()['helper_processes'] == 0
+    handles.close_all()
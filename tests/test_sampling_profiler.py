@@ -0,0 +1,48 @@
+import threading
+import time
+
+from sampling_profiler import SamplingProfiler
+
+
+def busy_wait(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_stacks_of_other_threads_are_collapsed(tmp_path):
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_wait, args=(stop,), name="worker;1")
+    worker.start()
+    output = str(tmp_path / "profile" / "stacks.txt")
+    profiler = SamplingProfiler(interval=0.005, output_path=output)
+    profiler.start()
+    time.sleep(0.3)
+    profiler.stop()
+    stop.set()
+    worker.join()
+
+    assert not profiler.running and profiler.samples > 0
+    assert 0 < profiler.duration() and 0 <= profiler.overhead() < 1
+    # Semicolons only separate frames, the thread name comes first
+    worker_stacks = [line for line in profiler.collapsed() if line.startswith("worker:1;")]
+    assert worker_stacks and all(int(line.rsplit(" ", 1)[1]) > 0 for line in worker_stacks)
+    assert any("busy_wait (test_sampling_profiler.py:" in line for line in worker_stacks)
+    assert not [line for line in profiler.collapsed() if line.startswith("sampling-profiler;")]
+    assert profiler.thread_totals()["worker:1"] <= profiler.samples
+    assert profiler.top_functions("worker:1", limit=1)
+    with open(output, encoding='utf-8') as f:
+        assert f.read().splitlines() == profiler.collapsed()
+
+
+def test_sample_skips_the_sampling_thread_and_clear_resets():
+    profiler = SamplingProfiler()
+    sampler = threading.Thread(target=profiler.sample, name="sampler")
+    sampler.start()
+    sampler.join()
+    assert profiler.samples == 1
+    assert profiler.thread_totals()["MainThread"] == 1 and "sampler" not in profiler.thread_totals()
+    [line] = [line for line in profiler.collapsed() if line.startswith("MainThread;")]
+    assert "test_sample_skips_the_sampling_thread_and_clear_resets (test_sampling_profiler.py:" in line
+    assert "1 samples" in profiler.describe() and "stopped" in profiler.describe()
+    profiler.clear()
+    assert profiler.samples == 0 and profiler.collapsed() == []
@@ -0,0 +1,90 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from scheduler import DONE, FAILED, PENDING, SKIPPED, TaskGraph
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        yield executor
+
+
+def test_tasks_run_after_their_dependencies(executor):
+    order = []
+    lock = threading.Lock()
+
+    def step(name, delay=0.0):
+        def run():
+            time.sleep(delay)
+            with lock:
+                order.append(name)
+            return name
+        return run
+
+    graph = TaskGraph()
+    graph.add("info", step("info", 0.05))
+    graph.add("checkout", step("checkout"), on_main=True)
+    graph.add("merge", step("merge"), after=["checkout", "info"], on_main=True)
+    graph.add("store", step("store"), after=["info"])
+    graph.run(executor)
+
+    assert all(task.status == DONE for task in graph.tasks.values())
+    assert order.index("merge") > order.index("info")
+    assert order.index("merge") > order.index("checkout")
+    assert graph["merge"].result == "merge"
+    assert graph["checkout"].thread_name == graph["merge"].thread_name == threading.current_thread().name
+    assert graph["info"].thread_name != threading.current_thread().name
+
+
+def test_a_failed_task_skips_its_dependents_only(executor):
+    def fail():
+        raise ValueError("remote unreachable")
+
+    graph = TaskGraph()
+    graph.add("check", fail)
+    graph.add("push", lambda: None, after=["check"], on_main=True)
+    graph.add("announce", lambda: None, after=["push"])
+    graph.add("other", lambda: "ran", on_main=True)
+    graph.run(executor)
+
+    assert graph["check"].status == FAILED
+    assert graph["push"].status == SKIPPED and graph["push"].error == "check failed: remote unreachable"
+    assert graph["announce"].status == SKIPPED and graph["announce"].error == graph["push"].error
+    assert graph["other"].status == DONE
+
+
+def test_wait_hook_runs_while_waiting_for_workers(executor):
+    calls = []
+    graph = TaskGraph()
+    graph.add("slow", lambda: time.sleep(0.2))
+    graph.run(executor, wait_hook=lambda: calls.append(1), poll_interval=0.01)
+    assert calls
+
+
+def test_critical_path_follows_the_dependency_waited_for(executor):
+    graph = TaskGraph()
+    graph.add("fast", lambda: None)
+    graph.add("slow", lambda: time.sleep(0.1))
+    graph.add("merge", lambda: None, after=["fast", "slow"], on_main=True)
+    graph.run(executor)
+
+    assert [task.name for task in graph.critical_path()] == ["slow", "merge"]
+    assert graph.waited_for(graph["merge"]).name == "slow"
+    assert "Critical path: slow" in graph.describe()
+    chart = graph.chart(width=20).splitlines()
+    assert len(chart) == 5 and chart[-1].startswith("* merge")
+
+
+def test_dependencies_must_exist_first():
+    graph = TaskGraph()
+    graph.add("a", lambda: None)
+    with pytest.raises(ValueError):
+        graph.add("a", lambda: None)
+    with pytest.raises(ValueError):
+        graph.add("b", lambda: None, after=["missing"])
+    assert graph["a"].status == PENDING
+    assert graph.describe() == "run: nothing ran"
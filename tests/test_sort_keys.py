@@ -0,0 +1,16 @@
+from sort_keys import natural_key, version_key
+
+
+def test_natural_key_compares_numbers():
+    names = ["v1.10", "v1.9", "V1.2", "v1.2a"]
+    assert sorted(names, key=natural_key) == ["V1.2", "v1.2a", "v1.9", "v1.10"]
+
+
+def test_version_key_orders_pre_releases_first():
+    names = ["v2.0.1", "v2.0.0", "v2.0.0-rc.10", "v2.0.0-rc.2", "v10.0.0", "nightly"]
+    assert sorted(names, key=version_key) == [
+        "nightly", "v2.0.0-rc.2", "v2.0.0-rc.10", "v2.0.0", "v2.0.1", "v10.0.0"]
+
+
+def test_version_key_ignores_build_metadata():
+    assert version_key("1.2.3+build.5") == version_key("1.2.3")
@@ -0,0 +1,54 @@
+from event_store import GitEvent
+from text_index import FullTextIndex, event_search_text, query_words
+
+
+class Doc:
+    def __init__(self, name):
+        self.name = name
+
+
+def test_query_words_keep_branch_names_and_versions_whole():
+    assert query_words("Release feature/x_2024.01.05 v1.2.3") == ["release", "feature/x_2024.01.05", "v1.2.3"]
+
+
+def test_search_matches_substrings_of_every_word():
+    index = FullTextIndex()
+    release, hotfix, other = Doc("release"), Doc("hotfix"), Doc("other")
+    index.add_many([(release, "Release v1.2.3 merged feature/login 3f2a9c1"),
+                    (hotfix, "Hotfix v1.2.4 merged bugfix/login"),
+                    (other, "Nothing to see")])
+    assert set(index.search("login")) == {release, hotfix}
+    assert index.search("3f2a9") == [release]
+    assert index.search("login v1.2.4") == [hotfix]
+    assert index.search("hotfix 3f2a9") == []
+    assert index.search("  ") is None
+
+
+def test_short_words_are_matched_by_scanning():
+    index = FullTextIndex()
+    first, second = Doc("first"), Doc("second")
+    index.add_many([(first, "ab cd"), (second, "abc")])
+    assert set(index.search("ab")) == {first, second}
+    assert index.search("cd") == [first]
+
+
+def test_replacing_and_removing_documents_drops_unused_terms():
+    index = FullTextIndex()
+    doc = Doc("doc")
+    index.add(doc, "alpha beta")
+    index.add(doc, "gamma")
+    assert index.search("alpha") == []
+    assert index.search("gamma") == [doc]
+    assert len(index) == 1 and doc in index
+    index.remove(doc)
+    assert len(index) == 0 and doc not in index
+    assert index.postings == {} and index.grams == {}
+
+
+def test_event_search_text_includes_merge_info():
+    event = GitEvent()
+    event.title = "Release"
+    event.merged_branches = ["feature/login"]
+    event.merged_branches_info = [{'name': "feature/login", 'commit_id': "3f2a9c1"}]
+    text = event_search_text(event)
+    assert "Release" in text and "feature/login" in text and "3f2a9c1" in text
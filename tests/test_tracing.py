@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from tracing import TracedGit, TracedRepo, Tracer, tracer
+
+
+def test_spans_nest_and_record_errors():
+    spans = Tracer()
+
+    @spans.traced(category="ui")
+    def render():
+        with spans.span("inner", "git", command="status"):
+            pass
+
+    render()
+    with pytest.raises(ValueError):
+        with spans.span("failing"):
+            raise ValueError("boom")
+    inner, outer, failing = spans.snapshot()
+    assert (inner.name, inner.depth, inner.args) == ("inner", 1, {'command': "status"})
+    assert (outer.name, outer.category, outer.depth) == ("render", "ui", 0)
+    assert outer.start <= inner.start and inner.duration <= outer.duration
+    assert failing.error == "boom" and failing.depth == 0
+
+
+def test_buffer_is_bounded_and_summarized_by_name():
+    spans = Tracer(max_spans=3)
+    for _ in range(4):
+        with spans.span("refresh"):
+            pass
+    spans.enabled = False
+    with spans.span("ignored") as span:
+        assert span is None
+    [row] = spans.summary()
+    assert (row['name'], row['count']) == ("refresh", 3)
+    assert row['max'] >= row['mean'] > 0
+
+
+def test_chrome_trace_export(tmp_path):
+    spans = Tracer()
+    with spans.span("fetch", "git", remote="origin"):
+        pass
+    path = str(tmp_path / "trace.json")
+    spans.export_chrome_trace(path)
+    with open(path, encoding='utf-8') as f:
+        events = json.load(f)['traceEvents']
+    complete = [event for event in events if event['ph'] == 'X']
+    assert [(event['name'], event['cat'], event['args']) for event in complete] == [
+        ("fetch", "git", {'remote': "origin"})]
+    assert [event['args']['name'] for event in events if event['ph'] == 'M'] == ["MainThread"]
+
+
+def test_git_commands_are_traced(scratch_repo):
+    tracer.clear()
+    assert TracedGit(scratch_repo).rev_parse('--abbrev-ref', 'HEAD') == "main"
+    TracedRepo(scratch_repo).git.status()
+    names = [span.name for span in tracer.snapshot() if span.category == "git"]
+    assert names == ["git rev-parse", "git status"]
+    assert "--abbrev-ref HEAD" in tracer.snapshot()[0].args['command']
@@ -0,0 +1,53 @@
+from conftest import commit, git
+from fetch_coordinator import FetchCoordinator
+from tracing import TracedRepo
+from transfer_progress import TransferProgress, format_size, parse_size
+
+
+def feed(progress, *lines):
+    handler = progress.new_message_handler()
+    for line in lines:
+        handler(line)
+
+
+def test_phases_are_attributed_to_where_they_run():
+    progress = TransferProgress("fetch", "origin")
+    feed(progress,
+         "remote: Enumerating objects: 10, done.",
+         "remote: Counting objects:  50% (5/10)",
+         "remote: Counting objects: 100% (10/10), done.",
+         "Receiving objects:  40% (4/10), 1.00 MiB | 512.00 KiB/s",
+         "Receiving objects: 100% (10/10), 2.50 MiB | 1.00 MiB/s, done.",
+         "Resolving deltas: 100% (3/3), done.")
+    progress.finish()
+    assert [(phase.name, phase.location) for phase in progress.phases] == [
+        ("Counting objects", "server"), ("Receiving objects", "network"), ("Resolving deltas", "client")]
+    receiving = progress.phases[1]
+    assert (receiving.current, receiving.total) == (10, 10)
+    assert receiving.bytes == parse_size("2.50", "MiB") and receiving.rate == 1024 ** 2
+    summary = progress.summary()
+    assert summary.startswith("Fetch origin: ") and "2.50 MiB" in summary
+    assert "Receiving objects [network]: 10/10, 2.50 MiB at 1.00 MiB/s" in summary
+
+
+def test_current_reports_connecting_until_the_first_line():
+    progress = TransferProgress("push", "origin")
+    text, percent = progress.current()
+    assert text.startswith("Push: connecting") and percent is None
+    feed(progress, "Writing objects:  25% (1/4)")
+    text, percent = progress.current()
+    assert text.startswith("Writing objects [network]: 1/4") and percent == 25.0
+    assert format_size(512) == "512 B" and format_size(3 * 1024 ** 3) == "3.00 GiB"
+
+
+def test_fetch_progress_streams_from_git(remote_and_clones):
+    bare, (clone_a, clone_b) = remote_and_clones
+    for number in range(3):
+        commit(clone_b, f"Change {number}", {f'file{number}.txt': f"{number}\n"})
+    git(clone_b, 'push', '-q', 'origin', 'HEAD')
+    progress = TransferProgress("fetch")
+    result = FetchCoordinator().fetch(TracedRepo(clone_a), progress=progress)
+    assert result.from_network and progress.remote_name == "origin"
+    assert progress.first_progress_at is not None
+    # Small transfers finish before git reports receiving, the server's phases always come
+    assert ("Counting objects", "server") in [(phase.name, phase.location) for phase in progress.phases]
@@ -0,0 +1,81 @@
+import os
+
+from conftest import commit, git
+from fetch_coordinator import FetchCoordinator
+from workspace import PipelineSpec, Workspace
+
+
+def tag_spec(**fields):
+    spec = PipelineSpec.from_dict({'create_branch': True, 'branch_prefix': "release",
+                                   'create_tag': True, 'tag_prefix': "v1", 'push_tag': False})
+    for key, value in fields.items():
+        setattr(spec, key, value)
+    return spec
+
+
+def test_event_scope_records_the_created_names(scratch_repo):
+    workspace = Workspace(FetchCoordinator())
+    context = workspace.open(scratch_repo)
+    git(scratch_repo, 'branch', 'release')  # Taken, the run picks the next name
+    result = workspace.run_pipeline(context, tag_spec())
+    assert result.success, result.error
+    assert result.created_branch != "release"
+    assert context.event_scope['created_branch'] == result.created_branch
+    assert context.event_scope['created_tag'] == result.created_tag
+    assert git(scratch_repo, 'tag', '--list') == result.created_tag
+    assert context.event_scope['current_base_branch'] == "main"
+    assert git(scratch_repo, 'rev-parse', '--abbrev-ref', 'HEAD') == result.created_branch
+    workspace.handles.close_all()
+
+
+def test_isolated_runs_without_a_branch_merge_on_the_base(scratch_repo):
+    git(scratch_repo, 'checkout', '-q', '-b', 'feature')
+    commit(scratch_repo, "Feature", {'feature.txt': "feature\n"})
+    git(scratch_repo, 'checkout', '-q', 'main')
+    commit(scratch_repo, "Main moved on", {'main.txt': "main\n"})
+    workspace = Workspace(FetchCoordinator(), worktree_pool_size=1)
+    context = workspace.open(scratch_repo)
+    # The pooled worktree was left detached at the old main
+    with workspace.worktrees(context).acquire() as repo:
+        repo.git.checkout('-q', '--detach', 'main~1')
+
+    result = workspace.run_pipeline(context, tag_spec(create_branch=False, merge_branches=["feature"]), True)
+    assert result.success, result.error
+    assert [info['name'] for info in result.merged] == ["feature"]
+    tagged = git(scratch_repo, 'rev-parse', f"{result.created_tag}^{{commit}}")
+    assert git(scratch_repo, 'rev-parse', f"{tagged}^1") == git(scratch_repo, 'rev-parse', 'main')
+    assert git(scratch_repo, 'rev-parse', f"{tagged}^2") == git(scratch_repo, 'rev-parse', 'feature')
+
+    # Without a branch or tag the merges would be unreachable
+    rejected = workspace.run_pipeline(context, tag_spec(create_branch=False, create_tag=False,
+                                                        merge_branches=["feature"]), True)
+    assert not rejected.success and "new branch or tag" in rejected.error
+    workspace.worktrees(context).close()
+    workspace.handles.close_all()
+
+
+def test_other_remotes_are_fetched_in_the_background(tmp_path, remote_and_clones):
+    bare, (clone_a, clone_b) = remote_and_clones
+    mirror, slow = str(tmp_path / "mirror.git"), str(tmp_path / "slow.git")
+    for path in (mirror, slow):
+        git(str(tmp_path), 'clone', '-q', '--bare', bare, path)
+    commit(clone_b, "Mirrored change")
+    git(clone_b, 'tag', 'mirror-only')
+    git(clone_b, 'push', '-q', mirror, 'HEAD:main', 'mirror-only')
+    git(clone_a, 'remote', 'add', 'mirror', mirror)
+    git(clone_a, 'remote', 'add', 'slow', slow)
+
+    workspace = Workspace(FetchCoordinator())
+    context = workspace.open(clone_a)
+    context.skipped_remotes.add('slow')
+    futures = workspace.fetch_other_remotes(context)
+    assert set(futures) == {'mirror'}
+    assert futures['mirror'].result(timeout=30).from_network
+    assert git(clone_a, 'rev-parse', 'mirror/main') == git(clone_b, 'rev-parse', 'HEAD')
+    # Tags only come from the default remote, background fetches leave FETCH_HEAD alone
+    assert git(clone_a, 'tag', '--list') == ""
+    assert not os.path.exists(os.path.join(clone_a, '.git', 'FETCH_HEAD'))
+    # The pool thread closed the handle it opened
+    assert not [row for row in workspace.handles.stats()['handles'] if row['thread'].startswith("remote-fetch")]
+    workspace.remote_executor.shutdown()
+    workspace.handles.close_all()
@@ -0,0 +1,81 @@
+import os
+import threading
+
+from conftest import commit, git
+from repo_handles import RepoHandleManager
+from worktree_pool import POOL_DIR, WorktreePool
+
+
+def registered_worktrees(path):
+    return [line[len('worktree '):] for line in git(path, 'worktree', 'list', '--porcelain').splitlines()
+            if line.startswith('worktree ')]
+
+
+def test_worktrees_are_reused_and_leave_the_checkout_alone(scratch_repo):
+    handles = RepoHandleManager()
+    pool = WorktreePool(scratch_repo, handles, max_idle=1)
+    head = git(scratch_repo, 'rev-parse', 'HEAD')
+    with pool.acquire() as repo:
+        first = repo.working_dir
+        assert repo.head.is_detached and repo.head.commit.hexsha == head
+        repo.git.checkout('-q', '-b', 'job-branch')
+        commit(first, "Job commit", {'job.txt': "job\n"})
+        with open(os.path.join(first, 'untracked.txt'), 'w') as f:
+            f.write("left behind\n")
+    assert pool.stats() == {'idle': 1, 'busy': 0, 'created': 1, 'reused': 0}
+    # The user's checkout did not move
+    assert git(scratch_repo, 'rev-parse', '--abbrev-ref', 'HEAD') == "main"
+    assert git(scratch_repo, 'rev-parse', 'HEAD') == head
+
+    with pool.acquire() as repo:
+        assert repo.working_dir == first
+        assert repo.head.is_detached
+        assert not os.path.exists(os.path.join(first, 'untracked.txt'))
+    assert pool.stats()['reused'] == 1
+    # The job's branch is not held checked out by the pool
+    git(scratch_repo, 'checkout', '-q', 'job-branch')
+    pool.close()
+    handles.close_all()
+
+
+def test_parallel_jobs_get_their_own_worktrees(scratch_repo):
+    handles = RepoHandleManager()
+    pool = WorktreePool(scratch_repo, handles, max_idle=1)
+    inside = threading.Barrier(2)
+    paths = []
+
+    def job():
+        with pool.acquire() as repo:
+            paths.append(repo.working_dir)
+            inside.wait(timeout=10)
+
+    threads = [threading.Thread(target=job) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(paths)) == 2
+    # Only max_idle are kept
+    assert pool.stats()['idle'] == 1
+    assert len(registered_worktrees(scratch_repo)) == 2
+    pool.close()
+    assert registered_worktrees(scratch_repo) == [os.path.realpath(scratch_repo)]
+    handles.close_all()
+
+
+def test_a_new_pool_takes_over_left_worktrees(scratch_repo):
+    handles = RepoHandleManager()
+    pool = WorktreePool(scratch_repo, handles)
+    with pool.acquire() as repo:
+        left = repo.working_dir
+    stale = os.path.join(os.path.dirname(left), "wt-7")
+    os.makedirs(stale)  # Not a registered worktree
+
+    second = WorktreePool(scratch_repo, handles)
+    assert second.stats()['idle'] == 1
+    assert not os.path.exists(stale)
+    with second.acquire() as repo:
+        assert repo.working_dir == left
+    assert os.path.basename(os.path.dirname(left)) == POOL_DIR
+    second.close()
+    handles.close_all()
@@ -0,0 +1,148 @@
+import re
+import threading
+
+# Terms are runs of word characters plus the punctuation used in branch
+# names, versions, dates and e-mail addresses, so 'feature/x_2024.01.05'
+# and 'v1.2.3' stay single terms
+TERM_PATTERN = re.compile(r"[\w./@:+-]+")
+
+
+def trigrams(term):
+    return {term[i:i + 3] for i in range(len(term) - 2)}
+
+
+def query_words(query):
+    return TERM_PATTERN.findall(query.lower())
+
+
+def event_search_text(event):
+    """Return every searchable field of an event, including the nested merge info, as one string"""
+    parts = [event.title, event.date, event.description, event.created_branch, event.created_tag,
+             event.base_branch, event.notes, getattr(event, 'repo_name', "")]
+    parts.extend(event.merged_branches or [])
+    for info in event.merged_branches_info or []:
+        parts.extend(str(value) for value in info.values())
+    return " ".join(part for part in parts if part)
+
+
+class FullTextIndex:
+    """Inverted index from terms to documents, with a trigram index over the terms
+
+    A query matches documents containing every query word as a substring
+    of one of their terms. Words of three or more characters are looked up
+    through the trigram index of the vocabulary, so finding a commit id
+    prefix among a few hundred thousand events takes milliseconds.
+    Documents are added and removed one at a time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.postings = {}    # Term -> set of document ids
+        self.grams = {}       # Trigram -> set of terms
+        self.doc_terms = {}   # Document id -> terms
+        self.docs = {}        # Document id -> document
+        self.ids = {}         # id(document) -> document id
+        self._next_id = 0
+
+    def __len__(self):
+        return len(self.docs)
+
+    def __contains__(self, doc):
+        return id(doc) in self.ids
+
+    def documents(self):
+        with self._lock:
+            return list(self.docs.values())
+
+    def add(self, doc, text):
+        """Index a document, replacing its previous text"""
+        self.add_many([(doc, text)])
+
+    def add_many(self, items):
+        """Index (document, text) pairs, with the trigrams of new terms added in one pass"""
+        postings = self.postings
+        findall = TERM_PATTERN.findall
+        new_terms = []
+        with self._lock:
+            for doc, text in items:
+                self._remove(doc)
+                doc_id = self._next_id
+                self._next_id += 1
+                terms = set(findall(text.lower()))
+                self.docs[doc_id] = doc
+                self.ids[id(doc)] = doc_id
+                self.doc_terms[doc_id] = terms
+                for term in terms:
+                    documents = postings.get(term)
+                    if documents is None:
+                        postings[term] = {doc_id}
+                        new_terms.append(term)
+                    else:
+                        documents.add(doc_id)
+            grams = self.grams
+            for term in new_terms:
+                # A term may have been dropped again by a later replacement
+                if term in postings:
+                    for gram in trigrams(term):
+                        terms = grams.get(gram)
+                        if terms is None:
+                            grams[gram] = {term}
+                        else:
+                            terms.add(term)
+
+    def remove(self, doc):
+        with self._lock:
+            self._remove(doc)
+
+    def _remove(self, doc):
+        doc_id = self.ids.pop(id(doc), None)
+        if doc_id is None:
+            return
+        del self.docs[doc_id]
+        for term in self.doc_terms.pop(doc_id):
+            documents = self.postings[term]
+            documents.discard(doc_id)
+            if not documents:
+                # Drop terms no document uses any more
+                del self.postings[term]
+                for gram in trigrams(term):
+                    terms = self.grams[gram]
+                    terms.discard(term)
+                    if not terms:
+                        del self.grams[gram]
+
+    def _matching_terms(self, word):
+        if len(word) < 3:
+            return [term for term in self.postings if word in term]
+        candidates = None
+        # Intersect the rarest trigrams first
+        for gram in sorted(trigrams(word), key=lambda g: len(self.grams.get(g, ()))):
+            terms = self.grams.get(gram)
+            if not terms:
+                return []
+            candidates = set(terms) if candidates is None else candidates & terms
+            if not candidates:
+                return []
+        return [term for term in candidates if word in term]
+
+    def search(self, query):
+        """Return the documents matching every word of the query, None if it has no words"""
+        words = query_words(query)
+        if not words:
+            return None
+        with self._lock:
+            result = None
+            # Longer words are more selective
+            for word in sorted(words, key=len, reverse=True):
+                if result is not None and len(word) < 3 and len(result) < len(self.postings) // 8:
+                    # Checking the few remaining documents beats scanning the vocabulary
+                    result = {doc_id for doc_id in result
+                              if any(word in term for term in self.doc_terms[doc_id])}
+                else:
+                    matches = set()
+                    for term in self._matching_terms(word):
+                        matches |= self.postings[term]
+                    result = matches if result is None else result & matches
+                if not result:
+                    return []
+            return [self.docs[doc_id] for doc_id in result]
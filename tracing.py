@@ -0,0 +1,179 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import git
+
+from git_supervisor import supervisor, subcommand
+
+
+class Span:
+    """One timed operation"""
+
+    def __init__(self, name, category, start, thread_id, thread_name, depth, args):
+        self.name = name
+        self.category = category
+        self.start = start          # Seconds since the tracer was created
+        self.duration = 0.0         # Seconds
+        self.thread_id = thread_id
+        self.thread_name = thread_name
+        self.depth = depth
+        self.args = args
+        self.error = ""
+
+
+class Tracer:
+    """Collects timing spans from all threads into a bounded buffer"""
+
+    def __init__(self, max_spans=20000):
+        self.enabled = True
+        self.origin = time.perf_counter()
+        self.spans = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def span(self, name, category="app", **args):
+        """Context manager timing the enclosed block"""
+        return _SpanContext(self, name, category, args)
+
+    def traced(self, name=None, category="app"):
+        """Decorator timing every call of a function"""
+        def decorator(func):
+            span_name = name or func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name, category):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _depth(self):
+        return getattr(self._local, 'depth', 0)
+
+    def _record(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def clear(self):
+        with self._lock:
+            self.spans.clear()
+
+    def snapshot(self):
+        """Return a list copy of the recorded spans"""
+        with self._lock:
+            return list(self.spans)
+
+    def summary(self):
+        """Aggregate spans by name: count, total, mean and max seconds"""
+        totals = {}
+        for span in self.snapshot():
+            entry = totals.setdefault((span.category, span.name),
+                                      {'count': 0, 'total': 0.0, 'max': 0.0})
+            entry['count'] += 1
+            entry['total'] += span.duration
+            entry['max'] = max(entry['max'], span.duration)
+        rows = []
+        for (category, name), entry in totals.items():
+            rows.append({
+                'category': category,
+                'name': name,
+                'count': entry['count'],
+                'total': entry['total'],
+                'mean': entry['total'] / entry['count'],
+                'max': entry['max']
+            })
+        rows.sort(key=lambda row: row['total'], reverse=True)
+        return rows
+
+    def to_chrome_trace(self):
+        """Return the spans in Chrome trace event format (chrome://tracing, Perfetto)"""
+        pid = os.getpid()
+        events = []
+        thread_names = {}
+        for span in self.snapshot():
+            thread_names[span.thread_id] = span.thread_name
+            args = {key: str(value) for key, value in span.args.items()}
+            if span.error:
+                args['error'] = span.error
+            events.append({
+                'name': span.name,
+                'cat': span.category,
+                'ph': 'X',
+                'ts': round(span.start * 1e6, 3),
+                'dur': round(span.duration * 1e6, 3),
+                'pid': pid,
+                'tid': span.thread_id,
+                'args': args
+            })
+        for thread_id, thread_name in thread_names.items():
+            events.append({
+                'name': 'thread_name',
+                'ph': 'M',
+                'pid': pid,
+                'tid': thread_id,
+                'args': {'name': thread_name}
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def export_chrome_trace(self, file_path):
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_chrome_trace(), f)
+
+
+class _SpanContext:
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.span = None
+
+    def __enter__(self):
+        tracer = self.tracer
+        if not tracer.enabled:
+            return None
+        thread = threading.current_thread()
+        depth = tracer._depth()
+        tracer._local.depth = depth + 1
+        self.span = Span(self.name, self.category, time.perf_counter() - tracer.origin,
+                         thread.ident, thread.name, depth, self.args)
+        return self.span
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        span = self.span
+        if span is None:
+            return False
+        span.duration = time.perf_counter() - self.tracer.origin - span.start
+        if exc_value is not None:
+            span.error = str(exc_value)
+        self.tracer._local.depth = span.depth
+        self.tracer._record(span)
+        return False
+
+
+# Process wide tracer used by the application
+tracer = Tracer()
+
+
+class TracedGit(git.Git):
+    """git.Git wrapper recording a span for every git subprocess, run under the supervisor"""
+
+    def execute(self, command, *args, **kwargs):
+        if isinstance(command, (list, tuple)):
+            name = "git " + subcommand(command)
+            detail = " ".join(str(c) for c in command)
+        else:
+            name = detail = str(command)
+        with tracer.span(name, "git", command=detail):
+            # Timeouts and cancellation, see git_supervisor
+            return supervisor.execute(super().execute, command, args, kwargs)
+
+
+class TracedRepo(git.Repo):
+    """git.Repo whose git commands are traced"""
+
+    GitCommandWrapperType = TracedGit
@@ -0,0 +1,156 @@
+"""Progress and throughput of fetch and push transfers
+
+git fetch and git push run with --progress, and their progress lines are
+parsed by GitPython's RemoteProgress. Each phase records its object
+counts, the transferred bytes and rate git reports, and its duration.
+Phases are attributed to where the work happens, so the summary shows
+whether a slow transfer waits on the server, the network or this machine.
+"""
+import re
+import threading
+import time
+
+from git import RemoteProgress
+
+PHASE_NAMES = {
+    RemoteProgress.COUNTING: "Counting objects",
+    RemoteProgress.COMPRESSING: "Compressing objects",
+    RemoteProgress.WRITING: "Writing objects",
+    RemoteProgress.RECEIVING: "Receiving objects",
+    RemoteProgress.RESOLVING: "Resolving deltas",
+    RemoteProgress.FINDING_SOURCES: "Finding sources",
+    RemoteProgress.CHECKING_OUT: "Checking out files"
+}
+
+# Sizes and rates as git prints them, e.g. "1.20 MiB | 2.00 MiB/s"
+SIZE_PATTERN = re.compile(r'([\d.]+) ([KMGT]?i?B)(?!/s)')
+RATE_PATTERN = re.compile(r'([\d.]+) ([KMGT]?i?B)/s')
+UNITS = {'B': 1, 'KiB': 1024, 'MiB': 1024 ** 2, 'GiB': 1024 ** 3, 'TiB': 1024 ** 4}
+
+
+def parse_size(value, unit):
+    return float(value) * UNITS.get(unit, 1)
+
+
+def format_size(size):
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if size < 1024 or unit == 'GiB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.2f} {unit}"
+        size /= 1024
+
+
+class TransferPhase:
+    """One phase of a transfer, e.g. receiving objects"""
+
+    def __init__(self, name, location, started_at):
+        self.name = name
+        self.location = location   # "server", "network" or "client"
+        self.started_at = started_at
+        self.finished_at = None
+        self.current = 0
+        self.total = None
+        self.bytes = 0.0
+        self.rate = None           # Bytes per second as last reported by git
+
+    @property
+    def duration(self):
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    def describe(self):
+        text = f"{self.name} [{self.location}]: {self.current:.0f}"
+        if self.total:
+            text += f"/{self.total:.0f}"
+        if self.bytes:
+            text += f", {format_size(self.bytes)}"
+        if self.rate:
+            text += f" at {format_size(self.rate)}/s"
+        return text + f" in {self.duration:.1f}s"
+
+
+class TransferProgress(RemoteProgress):
+    """Progress of one fetch or push, updated from the git output reader thread"""
+
+    def __init__(self, direction, remote_name=""):
+        super().__init__()
+        self.direction = direction     # "fetch" or "push"
+        self.remote_name = remote_name
+        self.phases = []
+        self.started_at = time.monotonic()
+        self.first_progress_at = None  # Time to the first progress line covers connecting and negotiation
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def phase_location(self, op, remote):
+        """Return where a phase runs, lines prefixed with 'remote:' come from the server"""
+        if remote:
+            return "server"
+        if op in (RemoteProgress.RECEIVING, RemoteProgress.WRITING):
+            return "network"
+        if self.direction == "fetch" and op in (RemoteProgress.COUNTING, RemoteProgress.COMPRESSING):
+            return "server"
+        return "client"
+
+    def update(self, op_code, cur_count, max_count=None, message=''):
+        op = op_code & RemoteProgress.OP_MASK
+        remote = (self._cur_line or "").startswith("remote:")
+        now = time.monotonic()
+        with self._lock:
+            if self.first_progress_at is None:
+                self.first_progress_at = now
+            phase = self.phases[-1] if self.phases else None
+            name = PHASE_NAMES.get(op, "Transfer")
+            if phase is None or phase.name != name or op_code & RemoteProgress.BEGIN:
+                if phase is not None and phase.finished_at is None:
+                    phase.finished_at = now
+                phase = TransferPhase(name, self.phase_location(op, remote), now)
+                self.phases.append(phase)
+            phase.current = cur_count or 0
+            phase.total = max_count or None
+            size = SIZE_PATTERN.search(message or "")
+            if size:
+                phase.bytes = parse_size(*size.groups())
+            rate = RATE_PATTERN.search(message or "")
+            if rate:
+                phase.rate = parse_size(*rate.groups())
+            if op_code & RemoteProgress.END:
+                phase.finished_at = now
+
+    def finish(self):
+        with self._lock:
+            self.finished_at = time.monotonic()
+            for phase in self.phases:
+                if phase.finished_at is None:
+                    phase.finished_at = self.finished_at
+
+    def current(self):
+        """Return (text, percent or None) for the progress display"""
+        with self._lock:
+            if not self.phases:
+                waited = time.monotonic() - self.started_at
+                return f"{self.direction.capitalize()}: connecting ({waited:.0f}s)", None
+            phase = self.phases[-1]
+            percent = phase.current * 100.0 / phase.total if phase.total else None
+            return phase.describe(), percent
+
+    def summary(self):
+        """Describe the transfer for the operation log, with time spent per location"""
+        with self._lock:
+            end = self.finished_at or time.monotonic()
+            transferred = sum(phase.bytes for phase in self.phases if phase.location == "network")
+            network_time = sum(phase.duration for phase in self.phases if phase.location == "network")
+            text = f"{self.direction.capitalize()} {self.remote_name}".rstrip()
+            text += f": {end - self.started_at:.1f}s total"
+            if transferred:
+                text += f", {format_size(transferred)}"
+                if network_time:
+                    text += f" at {format_size(transferred / network_time)}/s"
+            if self.first_progress_at is not None:
+                text += f", {self.first_progress_at - self.started_at:.1f}s connecting"
+            totals = {}
+            for phase in self.phases:
+                totals[phase.location] = totals.get(phase.location, 0.0) + phase.duration
+            if totals:
+                text += " (" + ", ".join(f"{location} {seconds:.1f}s"
+                                         for location, seconds in totals.items()) + ")"
+            lines = [text] + ["  " + phase.describe() for phase in self.phases]
+            return "\n".join(lines)
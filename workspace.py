@@ -0,0 +1,520 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import pipeline
+from event_store import EventIndex, repo_identity
+from naming import build_base_name, next_available_name
+from ref_snapshot import RefSnapshot
+from repo_handles import RepoHandleManager
+from tracing import tracer
+from worktree_pool import WorktreePool
+
+
+class RepoContext:
+    """One open repository with its own ref snapshot and event scope"""
+
+    def __init__(self, path, handles, repo_id_cache=None):
+        self.path = path
+        self.name = os.path.basename(os.path.normpath(path))
+        self.handles = handles
+        self.repo_id_cache = repo_id_cache
+        self._repo_id = None
+        self.snapshot = None
+        self.last_error = ""
+        # Operations on one repository never run concurrently
+        self.lock = threading.RLock()
+        # Event scope: created names, merge and base branch info pending for the next saved event
+        self.event_scope = {'current_base_branch': None, 'last_merged_info': None,
+                            'created_branch': "", 'created_tag': ""}
+        # Names handed to pipelines still running, so parallel ones never pick the same
+        self.reserved_names = {'branch': set(), 'tag': set()}
+        self.running_jobs = 0
+        # Remotes the user chose not to refresh, e.g. a slow mirror
+        self.skipped_remotes = set()
+        # Events of this repository's partition
+        self.event_index = EventIndex()
+
+    @property
+    def repo(self):
+        """Repository handle owned by the calling thread"""
+        return self.handles.get(self.path)
+
+    def reserve_name(self, kind, base_name, taken):
+        """Return the next free branch or tag name and reserve it"""
+        with self.lock:
+            name = next_available_name(base_name, set(taken) | self.reserved_names[kind])
+            self.reserved_names[kind].add(name)
+            return name
+
+    def start_job(self):
+        with self.lock:
+            self.running_jobs += 1
+
+    def finish_job(self):
+        """Release the reserved names once no pipeline is left running
+
+        A job that started before another one created its branch still
+        works from the older snapshot, so names are only released when the
+        last job has refreshed the snapshot.
+        """
+        with self.lock:
+            self.running_jobs -= 1
+            if not self.running_jobs:
+                for names in self.reserved_names.values():
+                    names.clear()
+
+    @property
+    def repo_id(self):
+        """Stable repository id used to partition the event store"""
+        if self._repo_id is None:
+            self._repo_id = repo_identity(self.repo, self.repo_id_cache)
+        return self._repo_id
+
+
+class PipelineSpec:
+    """Branch/merge/tag pipeline description applied to each repository"""
+
+    def __init__(self):
+        self.base_item = ""          # Empty means the current branch
+        self.create_branch = False
+        self.branch_prefix = ""
+        self.branch_custom_suffix = ""
+        self.branch_date_suffix = ""
+        self.merge_branches = []
+        self.merge_tags = []
+        self.create_tag = False
+        self.tag_prefix = ""
+        self.tag_custom_suffix = ""
+        self.tag_date_suffix = ""
+        self.push_tag = True
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a spec from a dict of its fields, e.g. one entry of a batch file"""
+        spec = cls()
+        for key, value in data.items():
+            if not hasattr(spec, key):
+                raise ValueError(f"Unknown pipeline spec field: {key}")
+            setattr(spec, key, value)
+        return spec
+
+    def merge_candidates(self, snapshot):
+        """Return ([(merge list entry, is tag)], skipped names) of the refs a snapshot has"""
+        candidates = []
+        skipped = []
+        for name in self.merge_branches:
+            plain_name, remote_name = pipeline.split_remote_suffix(name)
+            if remote_name not in (None, pipeline.LEGACY_REMOTE, snapshot.remote_name):
+                # A branch of another remote, only that remote's copy will do
+                if f"refs/remotes/{remote_name}/{plain_name}" in snapshot.ref_shas:
+                    candidates.append((name, False))
+                else:
+                    skipped.append(name)
+            elif f"refs/heads/{plain_name}" in snapshot.ref_shas:
+                candidates.append((plain_name, False))
+            elif snapshot.branch_sha(plain_name) is not None:
+                candidates.append((pipeline.remote_display_name(plain_name, snapshot.remote_name), False))
+            else:
+                skipped.append(name)
+        for tag in self.merge_tags:
+            if snapshot.tag_sha(tag) is None:
+                skipped.append(f"tag:{tag}")
+            else:
+                candidates.append((tag, True))
+        return candidates, skipped
+
+
+class RepoResult:
+    """Result of a workspace operation for a single repository"""
+
+    def __init__(self, context):
+        self.repo_name = context.name
+        self.repo_path = context.path
+        self.success = True
+        self.created_branch = ""
+        self.merged = []
+        self.skipped = []
+        self.created_tag = ""
+        self.error = ""
+        self.duration = 0.0
+        # Created names, base branch and merge info the run would put in the next saved event
+        self.event_scope = {'current_base_branch': None, 'last_merged_info': None,
+                            'created_branch': "", 'created_tag': ""}
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+
+class WorkspaceReport:
+    """Combined report of a workspace operation across repositories"""
+
+    def __init__(self, title):
+        self.title = title
+        self.date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.results = []
+
+    @property
+    def failed(self):
+        return [r for r in self.results if not r.success]
+
+    def to_dict(self):
+        return {
+            'title': self.title,
+            'date': self.date,
+            'results': [r.to_dict() for r in self.results]
+        }
+
+    def to_text(self):
+        """Format the report as plain text"""
+        lines = [f"{self.title} - {self.date}",
+                 f"{len(self.results) - len(self.failed)}/{len(self.results)} repositories succeeded",
+                 ""]
+        for result in sorted(self.results, key=lambda r: r.repo_name):
+            status = "OK" if result.success else "FAILED"
+            lines.append(f"[{status}] {result.repo_name} ({result.duration:.1f}s)")
+            if result.created_branch:
+                lines.append(f"    Created branch: {result.created_branch}")
+            if result.merged:
+                lines.append(f"    Merged: {', '.join(info['name'] for info in result.merged)}")
+            if result.skipped:
+                lines.append(f"    Skipped (not found): {', '.join(result.skipped)}")
+            if result.created_tag:
+                lines.append(f"    Created tag: {result.created_tag}")
+            if result.error:
+                lines.append(f"    Error: {result.error}")
+        return "\n".join(lines)
+
+
+class Workspace:
+    """Set of open repositories refreshed and operated on concurrently"""
+
+    def __init__(self, fetch_coordinator, max_workers=8, handles=None, repo_id_cache=None,
+                 worktree_pool_size=2, remote_fetch_workers=4):
+        self.fetch_coordinator = fetch_coordinator
+        self.max_workers = max_workers
+        # Bounded pool fetching remotes other than the default one
+        self.remote_executor = ThreadPoolExecutor(max_workers=remote_fetch_workers,
+                                                  thread_name_prefix="remote-fetch")
+        self._remote_fetches = {}  # (path, remote name) -> future of the running fetch
+        self.worktree_pool_size = worktree_pool_size
+        self.worktree_pools = {}  # Normalized path -> WorktreePool, for isolated pipelines
+        self.handles = handles or RepoHandleManager()
+        self.repo_id_cache = repo_id_cache
+        self.contexts = {}  # Normalized path -> RepoContext, in opening order
+        self._lock = threading.Lock()
+
+    def open(self, path):
+        """Open a repository, reusing its context if it is already open"""
+        key = os.path.normpath(os.path.abspath(path))
+        with self._lock:
+            context = self.contexts.get(key)
+            if context is None:
+                # Opening the handle validates the repository
+                self.handles.get(key)
+                context = RepoContext(key, self.handles, self.repo_id_cache)
+                self.contexts[key] = context
+            return context
+
+    def get(self, path):
+        return self.contexts.get(os.path.normpath(os.path.abspath(path)))
+
+    def close(self, path):
+        """Close a repository and drop its caches"""
+        key = os.path.normpath(os.path.abspath(path))
+        with self._lock:
+            self.contexts.pop(key, None)
+            pool = self.worktree_pools.pop(key, None)
+        if pool is not None:
+            pool.close()
+        self.handles.release(key)
+
+    def refresh(self, context, fetch=True, force=False, progress=None):
+        """Fetch a repository's remote and take a new ref snapshot
+
+        Returns the fetch result, or None if no fetch was done.
+        """
+        with context.lock, tracer.span("refresh", "workspace", repo=context.name):
+            result = None
+            repo = context.repo
+            if fetch and repo.remotes and repo.remote().name not in context.skipped_remotes:
+                result = self.fetch_coordinator.fetch(repo, force=force, progress=progress)
+            context.snapshot = RefSnapshot.capture(context.repo)
+            context.last_error = ""
+            return result
+
+    def fetch_other_remotes(self, context, force=False):
+        """Fetch a repository's remotes besides the default one in the bounded remote pool
+
+        Returns {remote name: future of its FetchResult} of the fetches
+        started; a remote still being fetched is left to its running fetch.
+        Every remote has its own worker and fetch timeout, so a slow mirror
+        delays neither the default remote nor the other remotes. Branches
+        land in refs/remotes/<remote>; tags are only fetched from the
+        default remote, so a mirror's tags never clash with the local ones.
+        """
+        repo = context.repo
+        if not repo.remotes:
+            return {}
+        default = repo.remote().name
+        started = {}
+        with self._lock:
+            for remote in repo.remotes:
+                if remote.name == default or remote.name in context.skipped_remotes:
+                    continue
+                key = (context.path, remote.name)
+                future = self._remote_fetches.get(key)
+                if future is not None and not future.done():
+                    continue
+                future = self.remote_executor.submit(self._fetch_other_remote, context, remote.name, force)
+                self._remote_fetches[key] = started[remote.name] = future
+        return started
+
+    def _fetch_other_remote(self, context, remote_name, force):
+        try:
+            with tracer.span("fetch remote", "workspace", repo=context.name, remote=remote_name):
+                return self.fetch_coordinator.fetch(context.repo, remote_name, force=force, tags=False,
+                                                    background=True)
+        finally:
+            # Remote pool threads outlive the fetch, close the handle it opened
+            self.handles.release_thread()
+
+    def refresh_all(self, contexts=None, fetch=True, force=False):
+        """Refresh several repositories concurrently
+
+        Returns a dict mapping each context to its fetch result or exception.
+        """
+        contexts = list(self.contexts.values()) if contexts is None else contexts
+        outcomes = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.refresh, c, fetch, force): c for c in contexts}
+            for future in as_completed(futures):
+                context = futures[future]
+                try:
+                    outcomes[context] = future.result()
+                except Exception as e:
+                    context.last_error = str(e)
+                    outcomes[context] = e
+        # Worker threads are gone, close their handles
+        self.handles.reap()
+        return outcomes
+
+    def run_pipeline(self, context, spec, isolated=False):
+        """Run the create/merge/tag pipeline in one repository
+
+        Isolated runs work in a worktree of the repository's pool instead
+        of the user's checkout, and do not hold the repository lock while
+        they run, so several can run at once. Only runs in the user's
+        checkout update the repository's event scope.
+        """
+        result = RepoResult(context)
+        start = time.time()
+        context.start_job()
+        try:
+            with tracer.span("run_pipeline", "workspace", repo=context.name, isolated=isolated):
+                if isolated:
+                    with context.lock:
+                        if context.snapshot is None:
+                            context.snapshot = RefSnapshot.capture(context.repo)
+                        snapshot = context.snapshot
+                    with self.worktrees(context).acquire() as repo:
+                        self.run_steps(context, repo, snapshot, spec, result, isolated)
+                    with context.lock:
+                        context.snapshot = RefSnapshot.capture(context.repo)
+                else:
+                    with context.lock:
+                        repo = context.repo
+                        if context.snapshot is None:
+                            context.snapshot = RefSnapshot.capture(repo)
+                        try:
+                            self.run_steps(context, repo, context.snapshot, spec, result, isolated)
+                        finally:
+                            context.event_scope.update(
+                                (key, value) for key, value in result.event_scope.items() if value)
+                        context.snapshot = RefSnapshot.capture(repo)
+        except Exception as e:
+            result.success = False
+            result.error = str(e)
+            context.last_error = result.error
+        finally:
+            context.finish_job()
+        result.duration = time.time() - start
+        return result
+
+    def run_steps(self, context, repo, snapshot, spec, result, isolated=False):
+        """Create the branch, merge and tag in a repository's working tree
+
+        Isolated runs start from a pool worktree's detached HEAD, which is
+        no base at all: without a new branch they merge on the base ref
+        detached, and need a new tag to keep the merges reachable.
+        """
+        if spec.create_branch or isolated:
+            base_item = pipeline.base_revision(repo, spec.base_item) if spec.base_item else snapshot.current_branch
+        # 1. Create branch
+        if spec.create_branch:
+            base_name = build_base_name(spec.branch_prefix, spec.branch_date_suffix,
+                                        spec.branch_custom_suffix)
+            if not base_name:
+                raise ValueError("Branch name cannot be empty")
+            branch_name = context.reserve_name('branch', base_name, snapshot.all_branch_names())
+            if isolated:
+                # The base may be checked out in the user's working tree, start from its ref
+                pipeline.create_branch_at(repo, self.base_ref(snapshot, base_item), branch_name)
+            else:
+                pipeline.create_branch(repo, base_item, branch_name)
+            result.created_branch = branch_name
+            result.event_scope['created_branch'] = branch_name
+            result.event_scope['current_base_branch'] = base_item
+        elif isolated:
+            if not spec.create_tag:
+                raise ValueError("Isolated runs need a new branch or tag to keep their merges")
+            repo.git.checkout('--detach', self.base_ref(snapshot, base_item))
+
+        # 2. Merge the refs this repository has
+        candidates, result.skipped = spec.merge_candidates(snapshot)
+        for name, is_tag in candidates:
+            result.merged.append(pipeline.merge_ref(repo, name, is_tag=is_tag))
+        if result.merged:
+            result.event_scope['last_merged_info'] = result.merged
+
+        # 3. Create tag
+        if spec.create_tag:
+            base_name = build_base_name(spec.tag_prefix, spec.tag_date_suffix,
+                                        spec.tag_custom_suffix)
+            if not base_name:
+                raise ValueError("Tag name cannot be empty")
+            tag_name = context.reserve_name('tag', base_name, snapshot.tags)
+            pipeline.create_tag(repo, tag_name, push=spec.push_tag)
+            result.created_tag = tag_name
+            result.event_scope['created_tag'] = tag_name
+
+    def worktrees(self, context):
+        """Return the worktree pool of a repository, created on first use"""
+        with self._lock:
+            pool = self.worktree_pools.get(context.path)
+            if pool is None:
+                pool = WorktreePool(context.path, self.handles, self.worktree_pool_size)
+                self.worktree_pools[context.path] = pool
+            return pool
+
+    def run_jobs(self, context, specs):
+        """Run independent pipelines in one repository in parallel, each in its own worktree"""
+        report = WorkspaceReport(f"Parallel pipelines in {context.name}")
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.run_pipeline, context, spec, True): number
+                       for number, spec in enumerate(specs, 1)}
+            for future in as_completed(futures):
+                result = future.result()
+                result.repo_name = f"{context.name} #{futures[future]}"
+                report.results.append(result)
+        self.handles.reap()
+        return report
+
+    def run_batch(self, context, specs, fetch=True, push=True, progress=None):
+        """Run the pipeline for several specs, e.g. one per base ref, in one pass
+
+        One fetch and one ref snapshot serve every spec. Nothing is checked
+        out: merges are built with git merge-tree on top of each base
+        commit. The branches and tags of all specs that succeeded are
+        created in one update-ref transaction and pushed with one git push.
+        Returns a report with one result per spec.
+        """
+        report = WorkspaceReport(f"Batch pipeline in {context.name}")
+        with context.lock, tracer.span("run_batch", "workspace", repo=context.name, specs=len(specs)):
+            repo = context.repo
+            if fetch and repo.remotes:
+                self.fetch_coordinator.fetch(repo, progress=progress)
+            snapshot = RefSnapshot.capture(repo)
+            # Names taken by earlier specs of the batch count as taken
+            branch_names = snapshot.all_branch_names()
+            tag_names = set(snapshot.tags)
+            updates = []
+            pushed = []
+            planned = []
+            for spec in specs:
+                result = RepoResult(context)
+                base_item = (pipeline.base_revision(repo, spec.base_item) if spec.base_item
+                             else snapshot.current_branch)
+                result.repo_name = f"{context.name} [{base_item}]"
+                start = time.time()
+                try:
+                    refs = self.plan_batch_spec(repo, snapshot, spec, base_item, result,
+                                                branch_names, tag_names)
+                    updates.extend(refs)
+                    pushed.extend(ref for ref, sha in refs
+                                  if ref.startswith('refs/heads/') or spec.push_tag)
+                    planned.append(result)
+                except Exception as e:
+                    result.success = False
+                    result.error = str(e)
+                result.duration = time.time() - start
+                report.results.append(result)
+
+            try:
+                if updates:
+                    pipeline.update_refs(repo, updates)
+                if push and pushed and repo.remotes:
+                    pipeline.push_refs(repo, pushed, progress)
+            except Exception as e:
+                # The transaction creates all refs or none, a failed push leaves them local
+                created = bool(updates) and all(repo.git.rev_parse('--verify', '-q', ref,
+                                                                   with_exceptions=False)
+                                                for ref, sha in updates)
+                for result in planned:
+                    result.success = False
+                    result.error = f"{'Push' if created else 'Creating refs'} failed: {str(e)}"
+                    if not created:
+                        result.created_branch = result.created_tag = ""
+            context.snapshot = RefSnapshot.capture(repo)
+            context.last_error = "" if not report.failed else report.failed[0].error
+        return report
+
+    def plan_batch_spec(self, repo, snapshot, spec, base_item, result, branch_names, tag_names):
+        """Build the commits of one batch spec and return the (ref, sha) pairs to create"""
+        if spec.merge_branches or spec.merge_tags:
+            if not spec.create_branch:
+                raise ValueError("Merging needs a new branch in batch mode")
+        head_sha = pipeline.resolve_commit(repo, self.base_ref(snapshot, base_item))
+        refs = []
+        if spec.create_branch:
+            base_name = build_base_name(spec.branch_prefix, spec.branch_date_suffix, spec.branch_custom_suffix)
+            if not base_name:
+                raise ValueError("Branch name cannot be empty")
+            branch_name = next_available_name(base_name, branch_names)
+            candidates, result.skipped = spec.merge_candidates(snapshot)
+            for name, is_tag in candidates:
+                head_sha = pipeline.merge_commit(repo, head_sha, name, is_tag=is_tag)
+                result.merged.append(pipeline.commit_info(repo, name, is_tag=is_tag))
+            branch_names.add(branch_name)
+            refs.append((f"refs/heads/{branch_name}", head_sha))
+            result.created_branch = branch_name
+        if spec.create_tag:
+            base_name = build_base_name(spec.tag_prefix, spec.tag_date_suffix, spec.tag_custom_suffix)
+            if not base_name:
+                raise ValueError("Tag name cannot be empty")
+            tag_name = next_available_name(base_name, tag_names)
+            tag_names.add(tag_name)
+            refs.append((f"refs/tags/{tag_name}", head_sha))
+            result.created_tag = tag_name
+        return refs
+
+    def base_ref(self, snapshot, base_item):
+        """Return the full ref name of a base revision: a local or remote branch, or a tag"""
+        for ref in (f"refs/heads/{base_item}", f"refs/remotes/{snapshot.remote_name}/{base_item}",
+                    f"refs/remotes/{base_item}", f"refs/tags/{base_item}"):
+            if ref in snapshot.ref_shas:
+                return ref
+        raise ValueError(f"Base ref not found: {base_item}")
+
+    def run_pipeline_all(self, spec, contexts=None, isolated=False):
+        """Run the pipeline in several repositories in parallel and combine the results"""
+        contexts = list(self.contexts.values()) if contexts is None else contexts
+        report = WorkspaceReport("Workspace pipeline")
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self.run_pipeline, c, spec, isolated) for c in contexts]
+            for future in as_completed(futures):
+                report.results.append(future.result())
+        self.handles.reap()
+        return report
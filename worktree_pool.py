@@ -0,0 +1,138 @@
+"""Pool of app-managed git worktrees for running pipelines off the user's checkout
+
+Pipelines run in isolated mode check out, merge and tag in a worktree of
+their own instead of the user's working directory, so several can run at
+once and none of them disturbs what the user has checked out. Worktrees
+live below <git dir>/branch-manager-worktrees. After a job its worktree is
+cleaned and detached, so the branch it created can be checked out
+anywhere, and kept warm for the next job; only max_idle are kept, and
+worktrees left by an earlier run are reused.
+"""
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+
+from git.exc import GitCommandError
+
+POOL_DIR = "branch-manager-worktrees"
+
+
+class WorktreePool:
+    """Worktrees of one repository, handed out to one job at a time"""
+
+    def __init__(self, path, handles, max_idle=2):
+        self.path = path          # Main working tree, git worktree commands run there
+        self.handles = handles
+        self.max_idle = max_idle
+        self.root = os.path.realpath(os.path.join(handles.get(path).common_dir, POOL_DIR))
+        self._lock = threading.Lock()
+        self._idle = []
+        self._busy = set()
+        self._next = 0
+        self.created = 0
+        self.reused = 0
+        self.discover()
+
+    def main_git(self):
+        """Return the calling thread's git command object of the main working tree"""
+        return self.handles.get(self.path).git
+
+    def discover(self):
+        """Take over the worktrees an earlier run left in the pool directory"""
+        with self._lock:
+            self.main_git().worktree('prune')
+            registered = set()
+            for line in self.main_git().worktree('list', '--porcelain').splitlines():
+                if line.startswith('worktree '):
+                    registered.add(os.path.realpath(line[len('worktree '):]))
+            if not os.path.isdir(self.root):
+                return
+            for name in sorted(os.listdir(self.root)):
+                path = os.path.join(self.root, name)
+                if path in registered and len(self._idle) < self.max_idle:
+                    self._idle.append(path)
+                elif path in registered:
+                    self._remove(path)
+                else:
+                    # Not a worktree any more, e.g. its metadata was pruned
+                    shutil.rmtree(path, ignore_errors=True)
+            numbers = [int(name[3:]) for name in os.listdir(self.root)
+                       if name.startswith('wt-') and name[3:].isdigit()]
+            self._next = max(numbers, default=-1) + 1
+
+    @contextmanager
+    def acquire(self):
+        """Lend a clean, detached worktree to the calling thread and yield its repository handle"""
+        path = self._take()
+        repo = self.handles.get(path)
+        try:
+            yield repo
+        finally:
+            # Failed jobs leave their worktree reusable too, unless it cannot be cleaned
+            clean = self._reset(repo)
+            self.handles.release(path, current_thread_only=True)
+            self._give_back(path, clean)
+
+    def _take(self):
+        with self._lock:
+            if self._idle:
+                path = self._idle.pop()
+                self._busy.add(path)
+                self.reused += 1
+                return path
+            path = os.path.join(self.root, f"wt-{self._next}")
+            self._next += 1
+            self._busy.add(path)
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            # Detached at HEAD, jobs check out their own base
+            self.main_git().worktree('add', '--detach', path, 'HEAD')
+        except Exception:
+            with self._lock:
+                self._busy.discard(path)
+            raise
+        with self._lock:
+            self.created += 1
+        return path
+
+    def _reset(self, repo):
+        """Drop what a job left in a worktree, return False if it cannot be reused"""
+        try:
+            if os.path.exists(os.path.join(repo.git_dir, 'MERGE_HEAD')):
+                repo.git.merge('--abort')
+            # Detach, so the job's branch is not held checked out here
+            repo.git.checkout('--detach', '--force')
+            repo.git.clean('-ffdx')
+            return True
+        except GitCommandError as e:
+            print(f"Error resetting worktree {repo.working_dir}: {str(e)}")
+            return False
+
+    def _give_back(self, path, clean):
+        with self._lock:
+            self._busy.discard(path)
+            if clean and len(self._idle) < self.max_idle:
+                self._idle.append(path)
+                return
+            self._remove(path)
+
+    def _remove(self, path):
+        try:
+            self.main_git().worktree('remove', '--force', path)
+        except GitCommandError:
+            shutil.rmtree(path, ignore_errors=True)
+            self.main_git().worktree('prune')
+
+    def close(self):
+        """Remove the idle worktrees, busy ones are removed when their job ends"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self.max_idle = 0
+            for path in idle:
+                self._remove(path)
+
+    def stats(self):
+        with self._lock:
+            return {'idle': len(self._idle), 'busy': len(self._busy),
+                    'created': self.created, 'reused': self.reused}